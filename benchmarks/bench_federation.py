@@ -0,0 +1,76 @@
+"""
+Benchmark of federation routing as the number of mount points grows
+
+Compares trying each path_to_hosts regexp in turn with re.match, as
+PyWebHdfsClient._resolve_federation used to, with
+pywebhdfs.federation.FederationRouter, with and without its cache of
+recent resolutions. Above the size of the re module's pattern cache (512
+on CPython 3.11) re.match recompiles patterns on every call and the linear
+scan becomes several orders of magnitude slower, so sizes stop below it.
+
+    python benchmarks/bench_federation.py [--number N]
+"""
+import argparse
+import random
+import re
+import timeit
+
+from pywebhdfs.federation import FederationRouter
+
+
+def mount_points(count):
+    """
+    count literal mount points, one in ten of them a regexp, and a catch-all
+    """
+    patterns = []
+    for i in range(count):
+        if i % 10 == 9:
+            patterns.append(r'warehouse/db{0}/tbl\d+/.*'.format(i))
+        else:
+            patterns.append('warehouse/db{0}/.*'.format(i))
+    patterns.append('.*')
+    return patterns
+
+
+def linear_match(patterns, path):
+    for index, pattern in enumerate(patterns):
+        if re.match(pattern, path):
+            return index
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--number', type=int, default=20000)
+    args = parser.parse_args()
+
+    rand = random.Random(0)
+    print('{0:>7} {1:>12} {2:>12} {3:>12}'.format(
+        'mounts', 're.match', 'router', 'cached'))
+    for count in (1, 10, 50, 200, 400):
+        patterns = mount_points(count)
+        paths = ['warehouse/db{0}/tbl{1}/part-{2:05d}'.format(
+            rand.randrange(count + count // 10 + 1), rand.randrange(10), i)
+            for i in range(1000)]
+        router = FederationRouter(patterns, cache_size=0)
+        cached = FederationRouter(patterns)
+        for path in paths:
+            assert linear_match(patterns, path) == router.resolve(path)
+
+        def run(resolve):
+            def loop():
+                for path in paths:
+                    resolve(path)
+            number = max(1, args.number // len(paths))
+            seconds = min(timeit.repeat(loop, number=number, repeat=3))
+            return seconds / (number * len(paths)) * 1e6
+
+        print('{0:>7} {1:>9.2f} us {2:>9.2f} us {3:>9.2f} us'.format(
+            count,
+            run(lambda path: linear_match(patterns, path)),
+            run(router._match),
+            run(cached.resolve)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+"""
+Microbenchmark of the per-request cost of building WebHDFS uris
+
+Compares the string formatting previously done by
+PyWebHdfsClient._create_uri, followed by formatting the host in, with
+pywebhdfs.uri.UriBuilder.
+
+    python benchmarks/bench_uri.py [--number N]
+"""
+import argparse
+import timeit
+
+try:
+    from urllib.parse import quote, quote_plus
+except ImportError:
+    from urllib import quote, quote_plus
+
+from pywebhdfs.uri import UriBuilder
+
+BASE_URI_PATTERN = 'http://{host}:50070/webhdfs/v1/'
+USER_NAME = 'hdfs'
+HOST = 'namenode1.example.com'
+PATH = 'user/hdfs/warehouse/events/dt=2016-01-01/part-00000'
+KWARGS = {'overwrite': True, 'permission': 644, 'buffersize': 65536}
+
+
+def legacy_uri(host, path, operation, **kwargs):
+    no_root_path = (path[1:] if path[0] == '/' else path)
+    path_param = quote(no_root_path.encode('utf8'))
+    operation_param = '?op={operation}'.format(operation=operation)
+    auth_param = str()
+    if USER_NAME:
+        auth_param = '&user.name={user_name}'.format(user_name=USER_NAME)
+    keyword_params = str()
+    for key in kwargs:
+        try:
+            value = quote_plus(kwargs[key].encode('utf8'))
+        except:  # noqa: E722
+            value = str(kwargs[key]).lower()
+        keyword_params = '{params}&{key}={value}'.format(
+            params=keyword_params, key=key, value=value)
+    base_uri = BASE_URI_PATTERN.format(host="{host}")
+    uri = '{base_uri}{path}{operation}{keyword_args}{auth}'.format(
+        base_uri=base_uri, path=path_param,
+        operation=operation_param, keyword_args=keyword_params,
+        auth=auth_param)
+    return uri.format(host=host)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--number', type=int, default=100000)
+    args = parser.parse_args()
+
+    builder = UriBuilder(BASE_URI_PATTERN, USER_NAME)
+    cases = [
+        ('legacy, no params',
+         lambda: legacy_uri(HOST, PATH, 'GETFILESTATUS')),
+        ('builder, no params',
+         lambda: builder.prefix(HOST) +
+         builder.request(PATH, 'GETFILESTATUS', {})),
+        ('legacy, 3 params',
+         lambda: legacy_uri(HOST, PATH, 'CREATE', **KWARGS)),
+        ('builder, 3 params',
+         lambda: builder.prefix(HOST) +
+         builder.request(PATH, 'CREATE', KWARGS)),
+    ]
+    assert cases[0][1]() == cases[1][1]()
+    assert cases[2][1]() == cases[3][1]()
+
+    for name, func in cases:
+        seconds = min(timeit.repeat(func, number=args.number, repeat=3))
+        print('{0:<20} {1:8.3f} us/request'.format(
+            name, seconds / args.number * 1e6))
+
+
+if __name__ == '__main__':
+    main()
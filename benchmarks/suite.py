@@ -0,0 +1,274 @@
+"""
+Benchmark suite of the client's read, write, listing and failover paths
+
+Runs against pywebhdfs.testing.FakeWebHdfs on the local machine, so results
+measure the client (and the loopback HTTP stack) rather than a cluster.
+Results are written as JSON, and a previous run can be compared with:
+
+    python benchmarks/suite.py [--quick] [--output new.json]
+    python benchmarks/suite.py --compare old.json new.json
+
+Measured:
+
+- read_file and stream_file throughput across chunk sizes
+- create_file and append_file of small files, in operations per second
+- list_dir time, and the JSON decoding part of it, against directory size
+- _create_uri and _resolve_federation cost per call
+- time for a request to succeed after a namenode failover
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import timeit
+
+from pywebhdfs.testing import FakeWebHdfs
+
+HIGHER = 'higher'
+LOWER = 'lower'
+
+MiB = 1024 * 1024
+
+
+class Results(object):
+
+    def __init__(self):
+        self.results = []
+
+    def add(self, name, value, unit, better, **params):
+        self.results.append({'name': name, 'params': params,
+                             'value': value, 'unit': unit,
+                             'better': better})
+        # progress goes to stderr, keeping stdout for the JSON results
+        sys.stderr.write('{0:<24} {1:<36} {2:>12.3f} {3}\n'.format(
+            name, _format_params(params), value, unit))
+
+
+def best_of(repeat, func):
+    """
+    returns the shortest of repeat timings of func
+    """
+    timings = []
+    for _ in range(repeat):
+        started = timeit.default_timer()
+        func()
+        timings.append(timeit.default_timer() - started)
+    return min(timings)
+
+
+def bench_reads(cluster, results, args):
+    hdfs = cluster.client()
+    path = 'bench/read.bin'
+    size = args.read_size
+    with open(_local_file(cluster, path), 'wb') as local_file:
+        local_file.write(os.urandom(size))
+
+    seconds = best_of(args.repeat, lambda: hdfs.read_file(path))
+    results.add('read_file', size / seconds / MiB, 'MB/s', HIGHER,
+                size=size)
+    for chunk_size in (64 * 1024, MiB, 4 * MiB):
+        def stream():
+            for _ in hdfs.stream_file(path, chunk_size=chunk_size):
+                pass
+        seconds = best_of(args.repeat, stream)
+        results.add('stream_file', size / seconds / MiB, 'MB/s', HIGHER,
+                    size=size, chunk_size=chunk_size)
+    hdfs.close()
+
+
+def bench_small_writes(cluster, results, args):
+    hdfs = cluster.client()
+    data = b'x' * 1024
+    count = args.files
+
+    def create():
+        for i in range(count):
+            hdfs.create_file('bench/small/{0}'.format(i), data,
+                             overwrite=True)
+
+    def create_pipelined():
+        hdfs.create_files((('bench/small/{0}'.format(i), data)
+                           for i in range(count)), overwrite=True)
+
+    def append():
+        for _ in range(count):
+            hdfs.append_file('bench/small/0', data)
+
+    for name, func in (('create_file', create),
+                       ('create_files', create_pipelined),
+                       ('append_file', append)):
+        seconds = best_of(args.repeat, func)
+        results.add(name, count / seconds, 'ops/s', HIGHER,
+                    file_size=len(data))
+    hdfs.close()
+
+
+def bench_listing(cluster, results, args):
+    hdfs = cluster.client()
+    for size in args.dir_sizes:
+        path = 'bench/list{0}'.format(size)
+        directory = _local_file(cluster, path + '/x')
+        directory = os.path.dirname(directory)
+        for i in range(size):
+            open(os.path.join(directory, 'part-{0:06d}'.format(i)),
+                 'w').close()
+
+        seconds = best_of(args.repeat, lambda: hdfs.list_dir(path))
+        results.add('list_dir', seconds * 1e3, 'ms', LOWER, entries=size)
+
+        response = hdfs._resolve_host(hdfs.session.get, True, path,
+                                      'LISTSTATUS')
+        body = response.content
+        seconds = best_of(args.repeat, lambda: json.loads(body.decode()))
+        results.add('list_dir_decode', seconds * 1e3, 'ms', LOWER,
+                    entries=size)
+    hdfs.close()
+
+
+def bench_uris(cluster, results, args):
+    hdfs = cluster.client(path_to_hosts=[
+        ('warehouse/db{0}/.*'.format(i), ['nn{0}:50070'.format(i)])
+        for i in range(args.mounts)] + [('.*', cluster.namenode_hosts)])
+    path = 'warehouse/db{0}/tbl/part-00000'.format(args.mounts // 2)
+    number = args.number
+
+    seconds = min(timeit.repeat(
+        lambda: hdfs._create_uri(path, 'OPEN', offset=0, length=4096),
+        number=number, repeat=args.repeat))
+    results.add('_create_uri', seconds / number * 1e6, 'us', LOWER,
+                params=2)
+    seconds = min(timeit.repeat(
+        lambda: hdfs._resolve_federation(path),
+        number=number, repeat=args.repeat))
+    results.add('_resolve_federation', seconds / number * 1e6, 'us', LOWER,
+                mounts=args.mounts)
+    hdfs.close()
+
+
+def bench_failover(results, args):
+    with FakeWebHdfs(namenodes=2) as cluster:
+        hdfs = cluster.client()
+        hdfs.make_dir('bench')
+        timings = []
+        for _ in range(args.failovers):
+            hdfs.get_file_dir_status('bench')
+            cluster.failover()
+            started = timeit.default_timer()
+            hdfs.get_file_dir_status('bench')
+            timings.append(timeit.default_timer() - started)
+        hdfs.close()
+    results.add('failover_recovery', sum(timings) / len(timings) * 1e3, 'ms',
+                LOWER, namenodes=2, statistic='mean')
+    results.add('failover_recovery', max(timings) * 1e3, 'ms', LOWER,
+                namenodes=2, statistic='max')
+
+
+def run(args):
+    results = Results()
+    with FakeWebHdfs() as cluster:
+        bench_reads(cluster, results, args)
+        bench_small_writes(cluster, results, args)
+        bench_listing(cluster, results, args)
+        bench_uris(cluster, results, args)
+    bench_failover(results, args)
+
+    document = {'meta': _meta(args), 'results': results.results}
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump(document, output, indent=2, sort_keys=True)
+    else:
+        print(json.dumps(document, indent=2, sort_keys=True))
+
+
+def compare(old_path, new_path):
+    """
+    print the change of every result between two runs, positive when the
+    new run is better
+    """
+    with open(old_path) as old_file:
+        old = json.load(old_file)
+    with open(new_path) as new_file:
+        new = json.load(new_file)
+    previous = dict((_key(result), result) for result in old['results'])
+    print('{0:<24} {1:<36} {2:>12} {3:>12} {4:>8}'.format(
+        'benchmark', 'params', 'old', 'new', 'change'))
+    for result in new['results']:
+        before = previous.get(_key(result))
+        if before is None or not before['value']:
+            continue
+        change = result['value'] / before['value'] - 1
+        if result['better'] == LOWER:
+            change = before['value'] / result['value'] - 1
+        print('{0:<24} {1:<36} {2:>12.3f} {3:>12.3f} {4:>+7.1%}'.format(
+            result['name'], _format_params(result['params']),
+            before['value'], result['value'], change))
+
+
+def _key(result):
+    return result['name'], json.dumps(result['params'], sort_keys=True)
+
+
+def _format_params(params):
+    return ' '.join('{0}={1}'.format(key, value)
+                    for key, value in sorted(params.items()))
+
+
+def _local_file(cluster, path):
+    local_path = cluster.local_path(path)
+    if not os.path.isdir(os.path.dirname(local_path)):
+        os.makedirs(os.path.dirname(local_path))
+    return local_path
+
+
+def _meta(args):
+    try:
+        commit = subprocess.check_output(
+            ['git', 'rev-parse', 'HEAD'], stderr=subprocess.STDOUT,
+            cwd=os.path.dirname(os.path.abspath(__file__))).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'commit': commit,
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'platform': platform.platform(),
+        'time': int(time.time()),
+        'args': vars(args),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--output', help='file the JSON results go to')
+    parser.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'),
+                        help='compare two result files instead of running')
+    parser.add_argument('--quick', action='store_true',
+                        help='smaller sizes, for checking the suite runs')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--read-size', type=int, default=64 * MiB)
+    parser.add_argument('--files', type=int, default=200)
+    parser.add_argument('--dir-sizes', type=int, nargs='+',
+                        default=[100, 1000, 10000])
+    parser.add_argument('--mounts', type=int, default=50)
+    parser.add_argument('--number', type=int, default=20000)
+    parser.add_argument('--failovers', type=int, default=20)
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+    if args.quick:
+        args.repeat = 1
+        args.read_size = 4 * MiB
+        args.files = 20
+        args.dir_sizes = [10, 100]
+        args.number = 1000
+        args.failovers = 3
+    run(args)
+
+
+if __name__ == '__main__':
+    main()
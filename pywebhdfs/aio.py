@@ -0,0 +1,522 @@
+"""
+asyncio client for the Hadoop WebHDFS REST API
+
+Requires Python 3.6+ and the aiohttp library.
+"""
+import asyncio
+from http import client as http_client
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+from pywebhdfs import errors, operations
+from pywebhdfs.federation import FederationRouter
+from pywebhdfs.ha import NamenodeState
+from pywebhdfs.retry import RetryPolicy
+from pywebhdfs.streams import UploadSource
+from pywebhdfs.uri import UriBuilder
+from pywebhdfs.webhdfs import PyWebHdfsClient, _raise_pywebhdfs_exception
+
+_END = object()
+
+_RETRY_ERRORS = (aiohttp.ClientError, asyncio.TimeoutError) if aiohttp \
+    else ()
+
+
+class AsyncPyWebHdfsClient(object):
+    """
+    AsyncPyWebHdfsClient is an asyncio version of PyWebHdfsClient
+
+    It offers the same methods as coroutines, with the same URI
+    construction, federation and HA handling, so a single event loop can
+    drive many concurrent requests without a thread per request.
+
+    To use this client:
+
+    >>> from pywebhdfs.aio import AsyncPyWebHdfsClient
+    >>> async with AsyncPyWebHdfsClient(host='host', port='50070',
+    >>>                                 user_name='hdfs') as hdfs:
+    >>>     await hdfs.list_dir('user/hdfs')
+    """
+
+    def __init__(self, host='localhost', port='50070', user_name=None,
+                 path_to_hosts=None, max_tries=3, timeout=None,
+                 base_uri_pattern="http://{host}:{port}/webhdfs/v1/",
+                 request_extra_opts={}, connection_limit=100, session=None,
+                 upload_chunk_size=1024 * 1024, retry_policy=None):
+        """
+        Create a new asyncio client for interacting with WebHDFS
+
+        :param host: the ip address or hostname of the HDFS namenode
+        :param port: the port number for WebHDFS on the namenode
+        :param user_name: WebHDFS user.name used for authentication
+        :param path_to_hosts: mapping paths to hostnames for federation
+        :param max_tries: maximum number of retries
+        :param timeout: timeout in seconds for connecting and for each read
+          of the underlying HTTP request, as with PyWebHdfsClient; there is
+          no limit on the total duration of a request
+        :param base_uri_pattern: format string for base URI
+        :param request_extra_opts: dictionary of extra options to pass
+          to aiohttp requests (e.g., ssl, auth, etc.)
+        :param connection_limit: maximum number of simultaneous connections
+          of the session created by the client
+        :param session: an aiohttp.ClientSession to use instead of creating
+          one on first use
+        :param upload_chunk_size: size of the chunks sent when uploading
+          from file-like objects
+        :param retry_policy: a pywebhdfs.retry.RetryPolicy, see
+          PyWebHdfsClient
+        """
+        if aiohttp is None:
+            raise ImportError("AsyncPyWebHdfsClient requires aiohttp")
+
+        self.host = host
+        self.port = port
+        self.user_name = user_name
+        self.max_tries = int(max_tries)
+        self.timeout = timeout
+        self.retry_policy = retry_policy
+        if self.retry_policy is None:
+            self.retry_policy = RetryPolicy(max_tries=self.max_tries)
+        self.path_to_hosts = path_to_hosts
+        if self.path_to_hosts is None:
+            self.path_to_hosts = [('.*', [self.host])]
+        self.namenodes = NamenodeState(self.path_to_hosts)
+        self.federation = FederationRouter(
+            [path_regexp for path_regexp, _ in self.path_to_hosts])
+
+        self.base_uri_pattern = base_uri_pattern.format(
+            host="{host}", port=port)
+        self._uri_builder = UriBuilder(self.base_uri_pattern, user_name)
+        self.request_extra_opts = request_extra_opts
+        self.connection_limit = connection_limit
+        self.upload_chunk_size = upload_chunk_size
+        self._session = session
+
+    # URI construction and federation resolution are shared with the
+    # synchronous client
+    _create_uri = PyWebHdfsClient._create_uri
+    _resolve_federation = PyWebHdfsClient._resolve_federation
+    _resolve_nameservice = PyWebHdfsClient._resolve_nameservice
+
+    @property
+    def session(self):
+        if self._session is None:
+            # aiohttp limits requests to 5 minutes by default, which would
+            # fail long transfers
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.connection_limit),
+                timeout=aiohttp.ClientTimeout(total=None))
+        return self._session
+
+    async def close(self):
+        """
+        Close the underlying aiohttp session
+        """
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def create_file(self, path, file_data, **kwargs):
+        """
+        Creates a new file on HDFS, see PyWebHdfsClient.create_file
+
+        :param path: the HDFS file path
+        :param file_data: the initial data to write to the new file, as a
+          string, a file-like object or an async iterable of chunks
+
+        File-like objects and iterators are read in the default executor of
+        the event loop, so slow reads do not block it. Async iterables are
+        streamed as they are and can not be sent again if the datanode
+        request fails.
+        """
+        return await self._upload(path, file_data, operations.CREATE,
+                                  **kwargs)
+
+    async def append_file(self, path, file_data, **kwargs):
+        """
+        Appends to an existing file on HDFS, see PyWebHdfsClient.append_file
+
+        :param path: the HDFS file path
+        :param file_data: data to append to existing file, as for
+          create_file
+        """
+        return await self._upload(path, file_data, operations.APPEND,
+                                  **kwargs)
+
+    async def read_file(self, path, **kwargs):
+        """
+        Reads from a file on HDFS and returns the content, see
+        PyWebHdfsClient.read_file
+        """
+        response = await self._resolve_host(self.session.get, True,
+                                            path, operations.OPEN, **kwargs)
+        return await _read_ok(response)
+
+    async def stream_file(self, path, chunk_size=1024 * 1024, **kwargs):
+        """
+        Reads from a file on HDFS as an async iterator of chunks, see
+        PyWebHdfsClient.stream_file
+
+        >>> async for chunk in hdfs.stream_file('user/hdfs/myfile.txt'):
+        >>>     process(chunk)
+        """
+        response = await self._resolve_host(self.session.get, True,
+                                            path, operations.OPEN, **kwargs)
+        try:
+            if not response.status == http_client.OK:
+                _raise_pywebhdfs_exception(response.status,
+                                           await response.read())
+            async for chunk in response.content.iter_chunked(chunk_size):
+                yield chunk
+        finally:
+            response.release()
+
+    async def make_dir(self, path, **kwargs):
+        """
+        Create a new directory on HDFS, see PyWebHdfsClient.make_dir
+        """
+        response = await self._resolve_host(self.session.put, True,
+                                            path, operations.MKDIRS,
+                                            **kwargs)
+        await _read_ok(response)
+        return True
+
+    async def rename_file_dir(self, path, destination_path):
+        """
+        Rename an existing directory or file on HDFS, see
+        PyWebHdfsClient.rename_file_dir
+        """
+        destination_path = '/' + destination_path.lstrip('/')
+
+        response = await self._resolve_host(self.session.put, True,
+                                            path, operations.RENAME,
+                                            destination=destination_path)
+        return await _json_ok(response)
+
+    async def delete_file_dir(self, path, recursive=False):
+        """
+        Delete an existing file or directory from HDFS, see
+        PyWebHdfsClient.delete_file_dir
+        """
+        response = await self._resolve_host(self.session.delete, True,
+                                            path, operations.DELETE,
+                                            recursive=recursive)
+        await _read_ok(response)
+        return True
+
+    async def concat_files(self, path, sources):
+        """
+        Concatenates existing files on HDFS into a target file, see
+        PyWebHdfsClient.concat_files
+        """
+        sources = ','.join('/' + source.lstrip('/') for source in sources)
+
+        response = await self._resolve_host(self.session.post, True,
+                                            path, operations.CONCAT,
+                                            sources=sources)
+        await _read_ok(response)
+        return True
+
+    async def get_file_dir_status(self, path):
+        """
+        Get the file_status of a single file or directory on HDFS, see
+        PyWebHdfsClient.get_file_dir_status
+        """
+        response = await self._resolve_host(self.session.get, True,
+                                            path, operations.GETFILESTATUS)
+        return await _json_ok(response)
+
+    async def get_content_summary(self, path):
+        """
+        Get the content summary of a directory on HDFS, see
+        PyWebHdfsClient.get_content_summary
+        """
+        response = await self._resolve_host(self.session.get, True,
+                                            path, operations.GETCONTENTSUMMARY)
+        return await _json_ok(response)
+
+    async def get_file_checksum(self, path):
+        """
+        Get the file_checksum of a single file on HDFS, see
+        PyWebHdfsClient.get_file_checksum
+        """
+        response = await self._resolve_host(self.session.get, True,
+                                            path, operations.GETFILECHECKSUM)
+        return await _json_ok(response)
+
+    async def list_dir(self, path):
+        """
+        Get a list of file_status for all files and directories inside an
+        HDFS directory, see PyWebHdfsClient.list_dir
+        """
+        response = await self._resolve_host(self.session.get, True,
+                                            path, operations.LISTSTATUS)
+        return await _json_ok(response)
+
+    async def iter_dir(self, path):
+        """
+        Lazily iterate over the file_status of all files and directories
+        inside an HDFS directory, see PyWebHdfsClient.iter_dir
+
+        >>> async for file_status in hdfs.iter_dir('user/hdfs'):
+        >>>     print(file_status['pathSuffix'])
+        """
+        start_after = None
+
+        while True:
+            kwd_params = {}
+            if start_after is not None:
+                kwd_params['startAfter'] = start_after
+
+            response = await self._resolve_host(
+                self.session.get, True, path, operations.LISTSTATUS_BATCH,
+                **kwd_params)
+            if response.status == http_client.BAD_REQUEST and \
+                    start_after is None:
+                response.release()
+                listing = await self.list_dir(path)
+                for file_status in listing['FileStatuses']['FileStatus']:
+                    yield file_status
+                return
+
+            listing = (await _json_ok(response))['DirectoryListing']
+            file_statuses = \
+                listing['partialListing']['FileStatuses']['FileStatus']
+            for file_status in file_statuses:
+                yield file_status
+
+            if not listing['remainingEntries'] or not file_statuses:
+                return
+            start_after = file_statuses[-1]['pathSuffix']
+
+    async def exists_file_dir(self, path):
+        """
+        Checks whether a file or directory exists on HDFS, see
+        PyWebHdfsClient.exists_file_dir
+        """
+        response = await self._resolve_host(self.session.get, True,
+                                            path, operations.GETFILESTATUS)
+        content = await response.read()
+        if response.status == http_client.OK:
+            return True
+        elif response.status == http_client.NOT_FOUND:
+            return False
+        _raise_pywebhdfs_exception(response.status, content)
+
+    async def get_xattr(self, path, xattr=None):
+        """
+        Get extended attributes set on an HDFS path, see
+        PyWebHdfsClient.get_xattr
+        """
+        kwd_params = {}
+        if xattr:
+            kwd_params['xattr.name'] = xattr
+
+        response = await self._resolve_host(self.session.get, True,
+                                            path, operations.GETXATTRS,
+                                            **kwd_params)
+        return await _json_ok(response)
+
+    async def set_xattr(self, path, xattr, value, replace=False):
+        """
+        Set an extended attribute on an HDFS path, see
+        PyWebHdfsClient.set_xattr
+        """
+        kwd_params = {
+            'xattr.name': xattr,
+            'xattr.value': value,
+            'flag': "REPLACE" if replace else "CREATE"
+        }
+
+        response = await self._resolve_host(self.session.put, True,
+                                            path, operations.SETXATTR,
+                                            **kwd_params)
+        await _read_ok(response)
+        return True
+
+    async def list_xattrs(self, path):
+        """
+        List all the extended attributes set on an HDFS path, see
+        PyWebHdfsClient.list_xattrs
+        """
+        response = await self._resolve_host(self.session.get, True,
+                                            path, operations.LISTXATTRS)
+        return await _json_ok(response)
+
+    async def delete_xattr(self, path, xattr):
+        """
+        Delete the extended attribute set on an HDFS path, see
+        PyWebHdfsClient.delete_xattr
+        """
+        response = await self._resolve_host(self.session.put, True,
+                                            path, operations.REMOVEXATTR,
+                                            **{'xattr.name': xattr})
+        await _read_ok(response)
+        return True
+
+    async def _upload(self, path, file_data, operation, **kwargs):
+        """
+        internal function used to CREATE or APPEND to a file with the two
+        step namenode/datanode calls, retrying datanode failures
+        """
+        source = None
+        if not hasattr(file_data, '__aiter__'):
+            source = UploadSource(file_data, self.upload_chunk_size)
+
+        if operation == operations.CREATE:
+            req_func = self.session.put
+            expected_status = http_client.CREATED
+        else:
+            req_func = self.session.post
+            expected_status = http_client.OK
+
+        attempts = self.retry_policy.begin()
+        while True:
+            init_response = await self._resolve_host(req_func, False,
+                                                     path, operation,
+                                                     **kwargs)
+            content = await init_response.read()
+            if not init_response.status == http_client.TEMPORARY_REDIRECT:
+                _raise_pywebhdfs_exception(init_response.status, content)
+
+            uri = init_response.headers['location']
+
+            if source is None:
+                data = file_data
+            else:
+                data = source.body()
+                if not isinstance(data, (bytes, str, bytearray)):
+                    data = _aiter(data)
+
+            try:
+                response = await req_func(
+                    uri, data=data,
+                    headers={'content-type': 'application/octet-stream'},
+                    **self._request_opts())
+                content = await response.read()
+                if not response.status == expected_status:
+                    _raise_pywebhdfs_exception(response.status, content)
+
+                return True
+            except _RETRY_ERRORS:
+                if source is None or not source.rewindable:
+                    raise
+                delay = attempts.backoff()
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+
+    async def _resolve_host(self, req_func, allow_redirect,
+                            path, operation, **kwargs):
+        """
+        internal function used to resolve federation and HA and
+        return response of resolved host.
+        """
+        request_uri = self._uri_builder.request(path, operation, kwargs)
+        nameservice = self._resolve_nameservice(path)
+        hosts = self.namenodes.hosts(nameservice)
+
+        policy = self.retry_policy
+        attempts = policy.begin()
+        last_error = None
+        failed_response = None
+        for host in hosts:
+            if attempts.expired():
+                break
+            if not policy.allow(host):
+                continue
+            attempts.restart()
+            uri = self._uri_builder.prefix(host) + request_uri
+            while True:
+                try:
+                    response = await req_func(uri,
+                                              allow_redirects=allow_redirect,
+                                              **self._request_opts())
+                except _RETRY_ERRORS as e:
+                    policy.record_failure(host)
+                    last_error = e
+                else:
+                    last_error = None
+                    if await _is_standby_exception(response):
+                        policy.record_success(host)
+                        response.release()
+                        break
+                    if not policy.is_retryable_status(response.status):
+                        policy.record_success(host)
+                        self.namenodes.mark_active(nameservice, host)
+                        if failed_response is not None:
+                            failed_response.release()
+                        return response
+                    policy.record_failure(host)
+                    if failed_response is not None:
+                        failed_response.release()
+                    failed_response = response
+
+                delay = attempts.backoff()
+                if delay is None:
+                    break
+                await asyncio.sleep(delay)
+
+        if last_error:
+            raise last_error
+
+        if failed_response is not None:
+            return failed_response
+
+        raise errors.ActiveHostNotFound(msg="Could not find active host")
+
+    def _request_opts(self):
+        opts = dict(self.request_extra_opts)
+        if self.timeout is not None:
+            opts.setdefault('timeout', aiohttp.ClientTimeout(
+                total=None, sock_connect=self.timeout,
+                sock_read=self.timeout))
+        return opts
+
+
+async def _read_ok(response):
+    content = await response.read()
+    if not response.status == http_client.OK:
+        _raise_pywebhdfs_exception(response.status, content)
+    return content
+
+
+async def _json_ok(response):
+    await _read_ok(response)
+    return await response.json(content_type=None)
+
+
+async def _is_standby_exception(response):
+    """
+    check whether response is StandbyException or not.
+    """
+    if response.status == http_client.FORBIDDEN:
+        try:
+            body = await response.json(content_type=None)
+            return body["RemoteException"]["exception"] == "StandbyException"
+        except Exception:
+            pass
+    return False
+
+
+async def _aiter(chunks):
+    """
+    iterate over chunks read with blocking calls, such as those of a file,
+    in the default executor
+    """
+    loop = asyncio.get_event_loop()
+    chunks = iter(chunks)
+    while True:
+        chunk = await loop.run_in_executor(None, next, chunks, _END)
+        if chunk is _END:
+            return
+        yield chunk
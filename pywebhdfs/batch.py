@@ -0,0 +1,119 @@
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import time
+
+
+class BatchResult(object):
+    """
+    The outcome of one operation of a Batch
+    """
+
+    def __init__(self, method, args, result=None, exception=None):
+        self.method = method
+        self.args = args
+        self.result = result
+        self.exception = exception
+
+    @property
+    def ok(self):
+        return self.exception is None
+
+    def __repr__(self):
+        return 'BatchResult({0}{1}, result={2!r}, exception={3!r})'.format(
+            self.method, self.args, self.result, self.exception)
+
+
+class Batch(object):
+    """
+    A list of metadata operations run concurrently over a client's pooled
+    session
+
+    Operations are queued with chainable methods and run by execute, which
+    returns one BatchResult per operation, in order. A failing operation
+    does not stop the others.
+
+    >>> results = hdfs.batch() \\
+    >>>     .delete('user/hdfs/old', recursive=True) \\
+    >>>     .set_xattr('user/hdfs/data.txt', 'user.important', 'very') \\
+    >>>     .mkdir('user/hdfs/new') \\
+    >>>     .execute(max_workers=16, max_rate=500)
+    >>> [r.exception for r in results if not r.ok]
+    []
+    """
+
+    def __init__(self, client):
+        self.client = client
+        self._calls = []
+
+    def __len__(self):
+        return len(self._calls)
+
+    def delete(self, path, recursive=False):
+        return self._add('delete_file_dir', path, recursive=recursive)
+
+    def mkdir(self, path, **kwargs):
+        return self._add('make_dir', path, **kwargs)
+
+    def rename(self, path, destination_path):
+        return self._add('rename_file_dir', path, destination_path)
+
+    def status(self, path):
+        return self._add('get_file_dir_status', path)
+
+    def exists(self, path):
+        return self._add('exists_file_dir', path)
+
+    def set_xattr(self, path, xattr, value, replace=False):
+        return self._add('set_xattr', path, xattr, value, replace=replace)
+
+    def delete_xattr(self, path, xattr):
+        return self._add('delete_xattr', path, xattr)
+
+    def execute(self, max_workers=8, max_rate=None):
+        """
+        Run all queued operations and return their results in order
+
+        :param max_workers: number of operations run concurrently
+        :param max_rate: maximum number of operations started per second,
+          unlimited by default
+        """
+        limiter = RateLimiter(max_rate) if max_rate else None
+
+        def run(call):
+            method, args, kwargs = call
+            if limiter is not None:
+                limiter.acquire()
+            try:
+                result = getattr(self.client, method)(*args, **kwargs)
+            except Exception as e:
+                return BatchResult(method, args, exception=e)
+            return BatchResult(method, args, result=result)
+
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+            return list(executor.map(run, self._calls))
+
+    def _add(self, method, *args, **kwargs):
+        self._calls.append((method, args, kwargs))
+        return self
+
+
+class RateLimiter(object):
+    """
+    Spaces calls to acquire evenly so that at most rate of them return per
+    second, across all threads
+    """
+
+    def __init__(self, rate, clock=time.time, sleep=time.sleep):
+        self.interval = 1.0 / rate
+        self._clock = clock
+        self._sleep = sleep
+        self._next = 0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        with self._lock:
+            now = self._clock()
+            slot = max(now, self._next)
+            self._next = slot + self.interval
+        if slot > now:
+            self._sleep(slot - now)
@@ -0,0 +1,179 @@
+from collections import OrderedDict
+import hashlib
+import mmap
+import os
+import re
+import tempfile
+import threading
+import uuid
+
+from pywebhdfs.cache import normalize_path
+
+_replace = getattr(os, 'replace', os.rename)
+_BLOCK_NAME = re.compile('^[0-9a-f]{40}$')
+_TEMP_NAME = re.compile(r'^\.[0-9a-f]{32}\.tmp$')
+
+
+class BlockCache(object):
+    """
+    A thread-safe on-disk LRU cache of fixed-size blocks of HDFS files
+
+    Blocks are keyed by path, modification time, length and block index,
+    so a file that changes on HDFS never matches its old blocks, which age
+    out. Hits are served from memory mapped files. The least recently used
+    blocks are removed once the cache grows over max_bytes.
+
+    Blocks left in directory by a previous process are reused, oldest
+    first in line for eviction.
+
+    >>> from pywebhdfs.blockcache import BlockCache
+    >>> hdfs = PyWebHdfsClient(host='host', port='50070',
+    >>>                        block_cache=BlockCache('/var/cache/hdfs',
+    >>>                                               max_bytes=10 * 2 ** 30))
+    >>> hdfs.block_cache.stats()
+    """
+
+    def __init__(self, directory=None, max_bytes=1024 ** 3,
+                 block_size=4 * 1024 * 1024):
+        """
+        :param directory: where blocks are stored, a new temporary
+          directory by default
+        :param max_bytes: maximum total size of the cached blocks
+        :param block_size: size of the cached blocks, the last block of a
+          file being shorter
+        """
+        if directory is None:
+            directory = tempfile.mkdtemp(prefix='pywebhdfs-blocks-')
+        elif not os.path.isdir(directory):
+            os.makedirs(directory)
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.block_size = block_size
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._load()
+
+    def key(self, path, modification_time, length, block):
+        """
+        returns the name of the file holding a block
+        """
+        key = '{0}\0{1}\0{2}\0{3}\0{4}'.format(
+            normalize_path(path), modification_time, length,
+            self.block_size, block)
+        return hashlib.sha1(key.encode('utf8')).hexdigest()
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def get(self, key):
+        """
+        returns the block stored under key as a read-only mmap, which the
+        caller closes, or None on a miss
+        """
+        with self._lock:
+            size = self._entries.pop(key, None)
+            if size is None:
+                self.misses += 1
+                return None
+            self._entries[key] = size
+        try:
+            with open(self._path(key), 'rb') as block_file:
+                block = mmap.mmap(block_file.fileno(), 0,
+                                  access=mmap.ACCESS_READ)
+        except (IOError, OSError, ValueError):
+            # removed by another thread or process
+            with self._lock:
+                if self._entries.pop(key, None) is not None:
+                    self.size -= size
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return block
+
+    def put(self, key, data):
+        """
+        store a block under key
+        """
+        size = len(data)
+        if not size or size > self.max_bytes:
+            return
+        temp_path = os.path.join(self.directory,
+                                 '.{0}.tmp'.format(uuid.uuid4().hex))
+        try:
+            with open(temp_path, 'wb') as block_file:
+                block_file.write(data)
+            _replace(temp_path, self._path(key))
+        except (IOError, OSError):
+            # a full disk or a vanished directory only costs the caching
+            self._remove(os.path.basename(temp_path))
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.size -= previous
+            self._entries[key] = size
+            self.size += size
+            self._evict()
+
+    def record_saved(self, nbytes):
+        with self._lock:
+            self.bytes_saved += nbytes
+
+    def clear(self):
+        with self._lock:
+            keys = list(self._entries)
+            self._entries.clear()
+            self.size = 0
+        for key in keys:
+            self._remove(key)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'blocks': len(self._entries),
+                'bytes': self.size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': float(self.hits) / lookups if lookups else 0.0,
+                'bytes_saved': self.bytes_saved,
+                'evictions': self.evictions,
+            }
+
+    def _evict(self):
+        while self.size > self.max_bytes and self._entries:
+            key, size = self._entries.popitem(last=False)
+            self.size -= size
+            self.evictions += 1
+            self._remove(key)
+
+    def _remove(self, key):
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+    def _path(self, key):
+        return os.path.join(self.directory, key)
+
+    def _load(self):
+        blocks = []
+        for name in os.listdir(self.directory):
+            if _TEMP_NAME.match(name):
+                # a block left half written
+                self._remove(name)
+                continue
+            if not _BLOCK_NAME.match(name):
+                continue
+            stat = os.stat(self._path(name))
+            blocks.append((stat.st_mtime, name, stat.st_size))
+        for _, name, size in sorted(blocks):
+            self._entries[name] = size
+            self.size += size
+        self._evict()
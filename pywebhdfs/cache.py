@@ -0,0 +1,136 @@
+from collections import OrderedDict
+import posixpath
+import threading
+import time
+
+STATUS = 'status'
+LISTING = 'listing'
+
+_KINDS = (STATUS, LISTING)
+
+
+class MetadataCache(object):
+    """
+    A thread-safe LRU cache of WebHDFS metadata responses with a per-entry
+    time to live
+
+    Entries are keyed by kind (STATUS or LISTING) and normalized HDFS path.
+    Cached responses are shared between callers and should not be modified.
+
+    >>> from pywebhdfs.cache import MetadataCache
+    >>> hdfs = PyWebHdfsClient(host='host', port='50070',
+    >>>                        metadata_cache=MetadataCache(ttl=30))
+    >>> hdfs.metadata_cache.hits, hdfs.metadata_cache.misses
+    """
+
+    def __init__(self, max_entries=10000, ttl=60, clock=time.time):
+        """
+        :param max_entries: maximum number of cached responses
+        :param ttl: number of seconds an entry stays valid
+        :param clock: function returning the current time in seconds
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._clock = clock
+        self._entries = OrderedDict()
+        # directory path -> paths directly below it that have entries or
+        # descendants with entries, so that invalidating a directory only
+        # visits what is cached below it
+        self._children = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, kind, path):
+        """
+        returns the cached response, or None on a miss
+        """
+        key = (kind, normalize_path(path))
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None or entry[0] <= self._clock():
+                if entry is not None:
+                    self._prune(key[1])
+                self.misses += 1
+                return None
+            # re-insert to mark the entry as most recently used
+            self._entries[key] = entry
+            self.hits += 1
+            return entry[1]
+
+    def put(self, kind, path, value):
+        key = (kind, normalize_path(path))
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (self._clock() + self.ttl, value)
+            self._link(key[1])
+            while len(self._entries) > self.max_entries:
+                evicted, _ = self._entries.popitem(last=False)
+                self._prune(evicted[1])
+
+    def invalidate(self, path, recursive=False):
+        """
+        drops every entry for the path, and for everything below it when
+        recursive is True
+        """
+        path = normalize_path(path)
+        with self._lock:
+            for kind in _KINDS:
+                self._entries.pop((kind, path), None)
+            if recursive:
+                pending = [path]
+                while pending:
+                    children = self._children.pop(pending.pop(), ())
+                    for child in children:
+                        for kind in _KINDS:
+                            self._entries.pop((kind, child), None)
+                    pending.extend(children)
+            self._prune(path)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._children.clear()
+
+    def _link(self, path):
+        """
+        adds path and its ancestors to the children of their parents
+        """
+        while path != '/':
+            parent = posixpath.dirname(path)
+            children = self._children.setdefault(parent, set())
+            if path in children:
+                return
+            children.add(path)
+            path = parent
+
+    def _prune(self, path):
+        """
+        removes path, and the ancestors left without cached descendants,
+        from the children of their parents once nothing is cached for them
+        """
+        while path != '/' and path not in self._children and \
+                not any((kind, path) in self._entries for kind in _KINDS):
+            parent = posixpath.dirname(path)
+            children = self._children.get(parent)
+            if children is None:
+                return
+            children.discard(path)
+            if children:
+                return
+            del self._children[parent]
+            path = parent
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses,
+                'entries': len(self._entries)}
+
+
+def normalize_path(path):
+    """
+    returns the absolute form of an HDFS path, without a trailing '/'
+    """
+    return '/' + path.strip('/')
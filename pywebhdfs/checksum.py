@@ -0,0 +1,442 @@
+import binascii
+import hashlib
+import io
+import re
+import struct
+import zlib
+
+import six
+
+CRC32 = 'CRC32'
+CRC32C = 'CRC32C'
+
+# HDFS defaults, dfs.bytes-per-checksum and dfs.blocksize
+BYTES_PER_CRC = 512
+BLOCK_SIZE = 128 * 1024 * 1024
+
+_ALGORITHM = re.compile(r'^MD5-of-(\d+)MD5-of-(\d+)(\w+)$')
+_COMPOSITE_ALGORITHM = re.compile(r'^COMPOSITE-(\w+)$')
+
+# reflected Castagnoli polynomial
+_CRC32C_POLYNOMIAL = 0x82f63b78
+
+
+def _crc32c_table():
+    table = []
+    for byte in range(256):
+        crc = byte
+        for _ in range(8):
+            crc = (crc >> 1) ^ (_CRC32C_POLYNOMIAL if crc & 1 else 0)
+        table.append(crc)
+    return table
+
+
+_CRC32C_TABLE = _crc32c_table()
+
+
+def _crc32c_python(data, crc=0):
+    """
+    CRC32C one byte at a time, for when no CRC32C extension is installed
+    """
+    table = _CRC32C_TABLE
+    crc ^= 0xffffffff
+    for byte in bytearray(data):
+        crc = table[(crc ^ byte) & 0xff] ^ (crc >> 8)
+    return crc ^ 0xffffffff
+
+
+def _load_crc32c():
+    try:
+        import crc32c
+        return crc32c.crc32c
+    except ImportError:
+        pass
+    try:
+        import google_crc32c
+        return lambda data, crc=0: google_crc32c.extend(crc, bytes(data))
+    except ImportError:
+        pass
+    return _crc32c_python
+
+
+def _crc32(data, crc=0):
+    # python 2 returns signed values
+    return zlib.crc32(data, crc) & 0xffffffff
+
+
+# functions taking data and the CRC of the data before it, returning
+# unsigned values
+CRC_FUNCTIONS = {
+    CRC32: zlib.crc32 if six.PY3 else _crc32,
+    CRC32C: _load_crc32c(),
+}
+
+
+def _crc_function(crc_type):
+    try:
+        return CRC_FUNCTIONS[crc_type]
+    except KeyError:
+        raise ValueError("Unsupported CRC type {0!r}".format(crc_type))
+
+
+def _view(data):
+    """
+    returns data in a form that can be sliced without copying and given to
+    the CRC functions
+    """
+    if isinstance(data, six.text_type):
+        return data.encode('utf8')
+    if six.PY2:
+        if isinstance(data, memoryview):
+            return data.tobytes()
+        return bytes(data)
+    return memoryview(data)
+
+
+class _Checksum(object):
+
+    def hexdigest(self):
+        return binascii.hexlify(self.digest()).decode('ascii')
+
+    def file_checksum(self):
+        """
+        returns the checksum in the form of get_file_checksum's
+        FileChecksum
+        """
+        digest = self.digest()
+        return {'algorithm': self.algorithm(),
+                'bytes': binascii.hexlify(digest).decode('ascii'),
+                'length': len(digest)}
+
+    def matches(self, file_checksum):
+        """
+        checks whether the data given to update is the content of the HDFS
+        file whose get_file_checksum result is given
+        """
+        file_checksum = file_checksum.get('FileChecksum', file_checksum)
+        return file_checksum['algorithm'] == self.algorithm() and \
+            file_checksum['bytes'].lower() == self.hexdigest()
+
+
+class MD5MD5CRC32(_Checksum):
+    """
+    Computes the MD5-of-MD5-of-CRC32 (or CRC32C) checksum that
+    GETFILECHECKSUM returns for a file, from its content given in order to
+    update
+
+    HDFS stores a CRC of every bytes_per_crc bytes of a block. The
+    checksum of a block is the MD5 of its CRCs, and the checksum of the
+    file the MD5 of its block checksums, so the result depends on the
+    block size the file was written with. The CRC type is set by
+    dfs.checksum.type on the cluster, CRC32C by default since Hadoop 2.
+
+    Whole chunks are checksummed without copying and their CRCs packed
+    together, which with the zlib CRC32 or a CRC32C extension (crc32c or
+    google-crc32c) runs at several hundred megabytes per second, a third
+    of the speed of a single CRC over the data. Without an extension
+    CRC32C is computed in Python, at a few megabytes per second.
+
+    >>> from pywebhdfs.checksum import CRC32C, MD5MD5CRC32
+    >>> checksum = MD5MD5CRC32(block_size=128 * 1024 * 1024,
+    >>>                        crc_type=CRC32C)
+    >>> for chunk in chunks:
+    >>>     checksum.update(chunk)
+    >>> checksum.matches(hdfs.get_file_checksum(path))
+    True
+    """
+
+    def __init__(self, block_size=BLOCK_SIZE, bytes_per_crc=BYTES_PER_CRC,
+                 crc_type=CRC32):
+        """
+        :param block_size: HDFS block size of the file, None for a file
+          made of a single block
+        :param bytes_per_crc: number of bytes covered by each CRC
+        :param crc_type: CRC32 or CRC32C
+        """
+        if block_size is not None and block_size % bytes_per_crc:
+            raise ValueError("The block size must be a multiple of "
+                             "bytes_per_crc")
+        self.block_size = block_size
+        self.bytes_per_crc = bytes_per_crc
+        self.crc_type = crc_type
+        self.length = 0
+        self._crc_function = _crc_function(crc_type)
+        self._block_digests = []
+        self._block_md5 = hashlib.md5()
+        self._block_length = 0
+        self._crc = 0
+        self._crc_length = 0
+
+    def update(self, data):
+        view = _view(data)
+        length = len(view)
+        crc = self._crc_function
+        step = self.bytes_per_crc
+        position = 0
+
+        while position < length:
+            end = length
+            if self.block_size is not None:
+                end = min(end,
+                          position + self.block_size - self._block_length)
+
+            if self._crc_length:
+                # complete the chunk left partial by the previous update
+                take = min(end - position, step - self._crc_length)
+                self._crc = crc(view[position:position + take], self._crc)
+                self._crc_length += take
+                self._block_length += take
+                position += take
+                if self._crc_length == step:
+                    self._end_crc()
+            else:
+                full_end = position + (end - position) // step * step
+                if full_end > position:
+                    # map keeps the per chunk overhead of the
+                    # interpreter to a minimum
+                    crcs = list(map(crc, map(view.__getitem__, map(
+                        slice, range(position, full_end, step),
+                        range(position + step, full_end + step, step)))))
+                    self._block_md5.update(
+                        struct.pack('>{0}I'.format(len(crcs)), *crcs))
+                    self._block_length += full_end - position
+                    position = full_end
+                if position < end:
+                    self._crc = crc(view[position:end])
+                    self._crc_length = end - position
+                    self._block_length += end - position
+                    position = end
+
+            if self._block_length == self.block_size:
+                self._end_block()
+
+        self.length += length
+
+    def digest(self):
+        """
+        returns the checksum as the bytes HDFS encodes in hexadecimal
+        """
+        digests = list(self._block_digests)
+        if self._block_length:
+            md5 = self._block_md5.copy()
+            if self._crc_length:
+                md5.update(struct.pack('>I', self._crc & 0xffffffff))
+            digests.append(md5.digest())
+        return struct.pack('>iq', self.bytes_per_crc,
+                           self._crc_per_block(len(digests))) + \
+            hashlib.md5(b''.join(digests)).digest()
+
+    def algorithm(self):
+        return 'MD5-of-{0}MD5-of-{1}{2}'.format(
+            self._crc_per_block(len(self._block_digests) +
+                                bool(self._block_length)),
+            self.bytes_per_crc, self.crc_type)
+
+    def _crc_per_block(self, blocks):
+        # HDFS only reports it for files of more than one block
+        if blocks > 1:
+            return self.block_size // self.bytes_per_crc
+        return 0
+
+    def _end_crc(self):
+        self._block_md5.update(struct.pack('>I', self._crc & 0xffffffff))
+        self._crc = 0
+        self._crc_length = 0
+
+    def _end_block(self):
+        if self._crc_length:
+            self._end_crc()
+        self._block_digests.append(self._block_md5.digest())
+        self._block_md5 = hashlib.md5()
+        self._block_length = 0
+
+
+class CompositeCrc(_Checksum):
+    """
+    Computes the COMPOSITE-CRC32 (or CRC32C) checksum that GETFILECHECKSUM
+    returns for a file when dfs.checksum.combine.mode is COMPOSITE_CRC
+    (Hadoop 3.1+)
+
+    A composite CRC is the CRC of the whole content of the file, so unlike
+    MD5MD5CRC32 it does not depend on the block size, and files can be
+    compared across clusters with different block sizes.
+    """
+
+    def __init__(self, crc_type=CRC32C):
+        """
+        :param crc_type: CRC32 or CRC32C, as set by dfs.checksum.type
+        """
+        self.crc_type = crc_type
+        self.length = 0
+        self._crc_function = _crc_function(crc_type)
+        self._crc = 0
+
+    def update(self, data):
+        view = _view(data)
+        self._crc = self._crc_function(view, self._crc)
+        self.length += len(view)
+
+    def digest(self):
+        return struct.pack('>I', self._crc & 0xffffffff)
+
+    def algorithm(self):
+        return 'COMPOSITE-{0}'.format(self.crc_type)
+
+
+class ChecksumReader(object):
+    """
+    A file-like object reading from another one and giving what it reads
+    to checksums, to compute the HDFS checksum of a file while it is
+    uploaded
+
+    Seeking is passed through, so that create_file can rewind the file to
+    retry a failed upload. Bytes read again after seeking back are not
+    given to the checksums twice.
+
+    >>> checksum = MD5MD5CRC32(block_size=128 * 1024 * 1024,
+    >>>                        crc_type=CRC32C)
+    >>> with open('data.bin', 'rb') as data:
+    >>>     hdfs.create_file(path, ChecksumReader(data, checksum))
+    >>> checksum.matches(hdfs.get_file_checksum(path))
+    True
+    """
+
+    def __init__(self, data, *checksums):
+        """
+        :param data: a file-like object, read from its current position
+        :param checksums: objects with an update method, such as
+          MD5MD5CRC32 and CompositeCrc
+        """
+        self.checksums = checksums
+        self._data = data
+        self._position = 0
+        self._checksummed = 0
+        try:
+            self._start = data.tell()
+            if hasattr(data, 'seekable') and not data.seekable():
+                self._start = None
+        except (IOError, OSError, AttributeError):
+            self._start = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def seekable(self):
+        return self._start is not None
+
+    def tell(self):
+        if self._start is None:
+            raise io.UnsupportedOperation('The file is not seekable')
+        return self._position
+
+    def seek(self, pos, whence=io.SEEK_SET):
+        if self._start is None:
+            raise io.UnsupportedOperation('The file is not seekable')
+        if whence == io.SEEK_SET:
+            pos += self._start
+        self._data.seek(pos, whence)
+        self._position = self._data.tell() - self._start
+        return self._position
+
+    def read(self, size=-1):
+        chunk = self._data.read(size)
+        if isinstance(chunk, six.text_type):
+            chunk = chunk.encode('utf8')
+        end = self._position + len(chunk)
+        if end > self._checksummed:
+            if self._position > self._checksummed:
+                raise IOError('Bytes {0} to {1} were skipped and can not be '
+                              'checksummed'.format(self._checksummed,
+                                                   self._position))
+            new = chunk[self._checksummed - self._position:] \
+                if self._position < self._checksummed else chunk
+            for checksum in self.checksums:
+                checksum.update(new)
+            self._checksummed = end
+        self._position = end
+        return chunk
+
+    def close(self):
+        self._data.close()
+
+
+def parse_algorithm(algorithm):
+    """
+    returns the CRCs per block, bytes per CRC and CRC type of a checksum
+    algorithm name such as MD5-of-262144MD5-of-512CRC32
+    """
+    match = _ALGORITHM.match(algorithm)
+    if match is None:
+        raise ValueError("Unsupported checksum algorithm {0!r}".format(
+            algorithm))
+    return int(match.group(1)), int(match.group(2)), match.group(3)
+
+
+def for_algorithm(algorithm, block_size=None):
+    """
+    returns an empty checksum computing the given HDFS algorithm
+
+    :param algorithm: the algorithm of a get_file_checksum result
+    :param block_size: the HDFS block size, only needed for MD5-of-MD5
+      algorithms that do not imply it (files of a single block)
+    """
+    match = _COMPOSITE_ALGORITHM.match(algorithm)
+    if match is not None:
+        return CompositeCrc(match.group(1))
+    crc_per_block, bytes_per_crc, crc_type = parse_algorithm(algorithm)
+    if crc_per_block:
+        block_size = crc_per_block * bytes_per_crc
+    return MD5MD5CRC32(block_size, bytes_per_crc, crc_type)
+
+
+def local_file_checksum(local_path, algorithm='MD5-of-0MD5-of-512CRC32',
+                        block_size=None, chunk_size=1024 * 1024,
+                        allow_slow=False):
+    """
+    returns the checksum of a local file as get_file_checksum would once
+    the file is on HDFS, as a FileChecksum dict
+
+    :param local_path: the local file
+    :param algorithm: the algorithm of the HDFS checksum to match
+    :param block_size: the HDFS block size, only needed when the algorithm
+      does not imply it (files of a single block)
+    :param allow_slow: compute CRC32C checksums even when no CRC32C
+      extension is installed, at a few megabytes per second; otherwise
+      they raise ValueError
+
+    Raises ValueError if the algorithm is not supported.
+    """
+    checksum = for_algorithm(algorithm, block_size)
+    if not allow_slow and \
+            CRC_FUNCTIONS[checksum.crc_type] is _crc32c_python:
+        raise ValueError(
+            "Computing {0} checksums needs the crc32c or google-crc32c "
+            "package".format(algorithm))
+    with open(local_path, 'rb') as local_file:
+        buf = bytearray(chunk_size)
+        view = memoryview(buf)
+        while True:
+            read = local_file.readinto(buf)
+            if not read:
+                break
+            checksum.update(view[:read])
+    return checksum.file_checksum()
+
+
+def checksum_matches(local_path, file_checksum, allow_slow=False):
+    """
+    checks whether a local file has the content of the HDFS file whose
+    get_file_checksum result is given, without reading the HDFS file
+
+    Raises ValueError if the algorithm of the HDFS checksum is not
+    supported, or is CRC32C based without a CRC32C extension installed
+    and allow_slow, see local_file_checksum.
+    """
+    file_checksum = file_checksum.get('FileChecksum', file_checksum)
+    local = local_file_checksum(local_path, file_checksum['algorithm'],
+                                allow_slow=allow_slow)
+    return local['algorithm'] == file_checksum['algorithm'] and \
+        local['bytes'] == file_checksum['bytes'].lower()
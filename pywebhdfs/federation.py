@@ -0,0 +1,93 @@
+import re
+
+_REGEX_CHARS = frozenset('.^$*+?{}[]\\|()')
+
+
+class FederationRouter(object):
+    """
+    Finds the first of a list of path regexps that matches a path, as
+    re.match would, without trying each of them in turn
+
+    Patterns made of literal characters, optionally followed by .*, only
+    match paths starting with that literal prefix, and are looked up in a
+    character trie. The other patterns are tried with re.match, and only
+    when they come before the best literal match. Recent resolutions are
+    cached.
+    """
+
+    def __init__(self, patterns, cache_size=4096):
+        """
+        :param patterns: path regexps, in order of precedence
+        :param cache_size: number of resolved paths remembered
+        """
+        self.cache_size = cache_size
+        self._trie = {}
+        self._regexps = []
+        self._cache = {}
+        for index, pattern in enumerate(patterns):
+            prefix = literal_prefix(pattern)
+            if prefix is None:
+                self._regexps.append((index, re.compile(pattern)))
+                continue
+            node = self._trie
+            for char in prefix:
+                node = node.setdefault(char, {})
+            # only the first pattern with a given prefix can ever match
+            node.setdefault(None, index)
+
+    def resolve(self, path):
+        """
+        returns the index of the first pattern matching path, or None
+        """
+        try:
+            return self._cache[path]
+        except KeyError:
+            pass
+        index = self._match(path)
+        if len(self._cache) >= self.cache_size:
+            self._cache.clear()
+        self._cache[path] = index
+        return index
+
+    def _match(self, path):
+        node = self._trie
+        best = node.get(None)
+        for char in path:
+            node = node.get(char)
+            if node is None:
+                break
+            index = node.get(None)
+            if index is not None and (best is None or index < best):
+                best = index
+
+        for index, regexp in self._regexps:
+            if best is not None and index > best:
+                break
+            if regexp.match(path):
+                return index
+        return best
+
+
+def literal_prefix(pattern):
+    """
+    returns the literal prefix that pattern is equivalent to when used with
+    re.match, or None if it is not a literal optionally followed by .*
+    """
+    prefix = []
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if char == '\\':
+            if i + 1 == len(pattern) or pattern[i + 1].isalnum():
+                # escapes like \d are character classes
+                return None
+            prefix.append(pattern[i + 1])
+            i += 2
+            continue
+        if char in _REGEX_CHARS:
+            if pattern[i:] == '.*':
+                break
+            return None
+        prefix.append(char)
+        i += 1
+    return ''.join(prefix)
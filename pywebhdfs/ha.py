@@ -0,0 +1,85 @@
+import threading
+
+
+class NamenodeState(object):
+    """
+    A thread-safe view of the namenodes of each nameservice, active
+    namenode first
+
+    Nameservices are the entries of a client's path_to_hosts, by index.
+    Each one is held as an immutable tuple that is replaced as a whole, so
+    request threads read it without locking. It can be kept up to date in
+    the background with start_probing, so that an HA failover is noticed
+    within one probe interval instead of through failed requests.
+    """
+
+    def __init__(self, path_to_hosts):
+        """
+        :param path_to_hosts: list of (path regexp, hosts) tuples
+        """
+        self._hosts = [tuple(hosts) for _, hosts in path_to_hosts]
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def hosts(self, nameservice):
+        """
+        returns the hosts of a nameservice, the last known active one first
+        """
+        return self._hosts[nameservice]
+
+    def mark_active(self, nameservice, host):
+        """
+        moves host to the head of the hosts of a nameservice
+        """
+        if self._hosts[nameservice][0] == host:
+            return
+        with self._lock:
+            hosts = self._hosts[nameservice]
+            self._hosts[nameservice] = (host,) + tuple(
+                other for other in hosts if other != host)
+
+    def probe(self, is_active):
+        """
+        asks every namenode of the nameservices with several of them
+        whether it is active, and marks the first one that is
+
+        :param is_active: function called with a host, returning True if
+          it is an active namenode
+        """
+        for nameservice, hosts in enumerate(self._hosts):
+            if len(hosts) < 2:
+                continue
+            for host in hosts:
+                try:
+                    active = is_active(host)
+                except Exception:
+                    # an unreachable namenode is not the active one
+                    continue
+                if active:
+                    self.mark_active(nameservice, host)
+                    break
+
+    def start_probing(self, is_active, interval):
+        """
+        probe the namenodes every interval seconds in a daemon thread
+        """
+        if self._thread is not None:
+            return
+
+        def run():
+            while not self._stop.wait(interval):
+                self.probe(is_active)
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=run,
+                                        name='pywebhdfs-namenode-probe')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop_probing(self):
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
@@ -0,0 +1,254 @@
+from bisect import bisect_left
+import threading
+
+# kinds of events
+REQUEST = 'request'
+DATANODE = 'datanode'
+RETRY = 'retry'
+STANDBY = 'standby'
+TRANSFER = 'transfer'
+
+# directions of transfers
+SENT = 'sent'
+RECEIVED = 'received'
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0,
+                   10.0, 30.0, 60.0)
+
+
+class Event(object):
+    """
+    Something a client did, as passed to metrics listeners
+
+    kind is one of:
+
+    - REQUEST, a request sent by _resolve_host to a namenode, timed until
+      its response headers
+    - DATANODE, the request to the datanode a namenode redirected to, when
+      the redirect is followed, timed until its response headers
+    - STANDBY, a namenode answered that it is a standby
+    - RETRY, a failed request will be retried after seconds
+    - TRANSFER, data sent to or received from a datanode, for CREATE,
+      APPEND and OPEN, timed from the first to the last byte
+
+    attempt counts the requests made for one operation to one host,
+    starting at 1. error is the exception that failed the request, if any.
+    """
+
+    __slots__ = ('kind', 'operation', 'host', 'seconds', 'status',
+                 'attempt', 'nbytes', 'direction', 'error')
+
+    def __init__(self, kind, operation, host=None, seconds=None, status=None,
+                 attempt=None, nbytes=None, direction=None, error=None):
+        self.kind = kind
+        self.operation = operation
+        self.host = host
+        self.seconds = seconds
+        self.status = status
+        self.attempt = attempt
+        self.nbytes = nbytes
+        self.direction = direction
+        self.error = error
+
+    def __repr__(self):
+        return 'Event({0})'.format(', '.join(
+            '{0}={1!r}'.format(name, getattr(self, name))
+            for name in self.__slots__ if getattr(self, name) is not None))
+
+
+class Histogram(object):
+    """
+    Counts of observations per bucket upper bound, with their sum
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def cumulative(self):
+        """
+        returns (upper bound, count of observations below it) pairs, the
+        last bound being infinity
+        """
+        total = 0
+        result = []
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            total += count
+            result.append((bound, total))
+        return result
+
+    def quantile(self, q):
+        """
+        returns the upper bound of the bucket holding the q quantile
+        """
+        if not self.count:
+            return None
+        rank = q * self.count
+        for bound, total in self.cumulative():
+            if total >= rank:
+                return bound
+
+
+class MetricsAggregator(object):
+    """
+    A metrics listener keeping counters and latency histograms in memory
+
+    >>> from pywebhdfs.metrics import MetricsAggregator, prometheus_text
+    >>> metrics = MetricsAggregator()
+    >>> hdfs = PyWebHdfsClient(host='host', port='50070',
+    >>>                        metrics_listeners=[metrics])
+    >>> metrics.snapshot()['requests']
+    >>> print(prometheus_text(metrics))
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.request_seconds = {}
+        self.datanode_seconds = {}
+        self.transfer_seconds = {}
+        self.requests = {}
+        self.errors = {}
+        self.retries = {}
+        self.standbys = {}
+        self.transfer_bytes = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, event):
+        with self._lock:
+            if event.kind in (REQUEST, DATANODE):
+                self._observe(self.request_seconds if event.kind == REQUEST
+                              else self.datanode_seconds, event.operation,
+                              event.seconds)
+                if event.error is not None:
+                    _increment(self.errors, (event.operation, event.host,
+                                             type(event.error).__name__))
+                else:
+                    _increment(self.requests, (event.operation, event.host,
+                                               event.status))
+            elif event.kind == RETRY:
+                _increment(self.retries, event.operation)
+            elif event.kind == STANDBY:
+                _increment(self.standbys, event.host)
+            elif event.kind == TRANSFER:
+                self._observe(self.transfer_seconds, event.operation,
+                              event.seconds)
+                _increment(self.transfer_bytes,
+                           (event.operation, event.direction), event.nbytes)
+
+    def snapshot(self):
+        """
+        returns the current counters, and the count, sum and 50th and 99th
+        percentiles (as bucket upper bounds) of each histogram
+        """
+        def summarize(histograms):
+            return dict((operation, {
+                'count': histogram.count,
+                'sum': histogram.sum,
+                'p50': histogram.quantile(0.5),
+                'p99': histogram.quantile(0.99),
+            }) for operation, histogram in histograms.items())
+
+        with self._lock:
+            return {
+                'request_seconds': summarize(self.request_seconds),
+                'datanode_seconds': summarize(self.datanode_seconds),
+                'transfer_seconds': summarize(self.transfer_seconds),
+                'requests': dict(self.requests),
+                'errors': dict(self.errors),
+                'retries': dict(self.retries),
+                'standbys': dict(self.standbys),
+                'transfer_bytes': dict(self.transfer_bytes),
+            }
+
+    def _observe(self, histograms, operation, seconds):
+        histogram = histograms.get(operation)
+        if histogram is None:
+            histogram = histograms[operation] = Histogram(self.buckets)
+        histogram.observe(seconds)
+
+
+def prometheus_text(aggregator, prefix='pywebhdfs'):
+    """
+    returns the metrics of a MetricsAggregator in the Prometheus text
+    exposition format, to be served on a metrics endpoint
+    """
+    lines = []
+
+    def header(name, kind, help_text):
+        lines.append('# HELP {0}_{1} {2}'.format(prefix, name, help_text))
+        lines.append('# TYPE {0}_{1} {2}'.format(prefix, name, kind))
+
+    def sample(name, labels, value):
+        lines.append('{0}_{1}{{{2}}} {3}'.format(
+            prefix, name, ','.join(
+                '{0}="{1}"'.format(key, _escape(label))
+                for key, label in labels), _format_value(value)))
+
+    def histograms(name, help_text, values):
+        header(name, 'histogram', help_text)
+        for operation, histogram in sorted(values.items()):
+            for bound, total in histogram.cumulative():
+                sample(name + '_bucket',
+                       [('operation', operation), ('le', bound)], total)
+            sample(name + '_sum', [('operation', operation)], histogram.sum)
+            sample(name + '_count', [('operation', operation)],
+                   histogram.count)
+
+    def counters(name, help_text, label_names, values):
+        header(name, 'counter', help_text)
+        for key, value in sorted(values.items(), key=_sort_key):
+            if not isinstance(key, tuple):
+                key = (key,)
+            sample(name, list(zip(label_names, key)), value)
+
+    with aggregator._lock:
+        histograms('request_seconds',
+                   'Time from sending a namenode request to its response',
+                   aggregator.request_seconds)
+        histograms('datanode_request_seconds',
+                   'Time from following a namenode redirect to the datanode '
+                   'response', aggregator.datanode_seconds)
+        histograms('transfer_seconds', 'Time spent sending or receiving data',
+                   aggregator.transfer_seconds)
+        counters('requests_total',
+                 'Namenode and datanode requests by response status',
+                 ('operation', 'host', 'code'), aggregator.requests)
+        counters('request_errors_total', 'Namenode requests that failed',
+                 ('operation', 'host', 'error'), aggregator.errors)
+        counters('retries_total', 'Requests retried after a failure',
+                 ('operation',), aggregator.retries)
+        counters('standby_total', 'Answers from standby namenodes',
+                 ('host',), aggregator.standbys)
+        counters('transfer_bytes_total', 'Bytes sent to or read from HDFS',
+                 ('operation', 'direction'), aggregator.transfer_bytes)
+
+    return '\n'.join(lines) + '\n'
+
+
+def _increment(counters, key, amount=1):
+    counters[key] = counters.get(key, 0) + (amount or 0)
+
+
+def _escape(value):
+    if value == float('inf'):
+        return '+Inf'
+    return str(value).replace('\\', '\\\\').replace('"', '\\"') \
+        .replace('\n', '\\n')
+
+
+def _format_value(value):
+    if isinstance(value, float):
+        return repr(value)
+    return str(value)
+
+
+def _sort_key(item):
+    return tuple(str(part) for part in (
+        item[0] if isinstance(item[0], tuple) else (item[0],)))
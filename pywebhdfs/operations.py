@@ -12,3 +12,5 @@ GETXATTRS = 'GETXATTRS'
 LISTXATTRS = 'LISTXATTRS'
 REMOVEXATTR = 'REMOVEXATTR'
 SETXATTR = 'SETXATTR'
+CONCAT = 'CONCAT'
+LISTSTATUS_BATCH = 'LISTSTATUS_BATCH'
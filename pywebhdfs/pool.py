@@ -0,0 +1,166 @@
+import threading
+import time
+
+from requests.adapters import HTTPAdapter
+from urllib3.poolmanager import PoolManager
+
+NAMENODE = 'namenode'
+DATANODE = 'datanode'
+
+
+class HdfsPoolManager(PoolManager):
+    """
+    A urllib3 PoolManager that sizes connection pools differently for
+    namenode and datanode hosts and closes pools left idle
+    """
+
+    def __init__(self, namenode_hosts=(), namenode_maxsize=None,
+                 idle_timeout=None, clock=time.time, **kwargs):
+        """
+        :param namenode_hosts: host:port of the namenodes, every other host
+          is considered a datanode; a hostname alone matches every port of
+          the host, datanodes running on the same machine included
+        :param namenode_maxsize: number of connections kept per namenode,
+          defaults to maxsize
+        :param idle_timeout: number of seconds after which a pool that has
+          not been used is closed, never by default
+        """
+        super(HdfsPoolManager, self).__init__(**kwargs)
+        self.namenode_hosts = frozenset(namenode_hosts)
+        self.namenode_maxsize = namenode_maxsize
+        self.idle_timeout = idle_timeout
+        self._clock = clock
+        self._last_used = {}
+        self._last_reap = clock()
+        self._reaped = {NAMENODE: [0, 0], DATANODE: [0, 0]}
+        self._stats_lock = threading.Lock()
+
+    def host_kind(self, host, port=None):
+        if '{0}:{1}'.format(host, port) in self.namenode_hosts or \
+                host in self.namenode_hosts:
+            return NAMENODE
+        return DATANODE
+
+    def _new_pool(self, scheme, host, port, request_context=None):
+        if request_context is None:
+            request_context = self.connection_pool_kw
+        request_context = request_context.copy()
+        if self.namenode_maxsize and self.host_kind(host, port) == NAMENODE:
+            request_context['maxsize'] = self.namenode_maxsize
+        return super(HdfsPoolManager, self)._new_pool(
+            scheme, host, port, request_context=request_context)
+
+    def connection_from_pool_key(self, pool_key, request_context=None):
+        pool = super(HdfsPoolManager, self).connection_from_pool_key(
+            pool_key, request_context=request_context)
+        now = self._clock()
+        self._last_used[pool_key] = now
+        if self.idle_timeout is not None and \
+                now - self._last_reap >= self.idle_timeout / 2.0:
+            self.reap_idle(now)
+        return pool
+
+    def reap_idle(self, now=None):
+        """
+        close the pools that have not been used for idle_timeout seconds and
+        return how many were closed
+        """
+        if self.idle_timeout is None:
+            return 0
+        if now is None:
+            now = self._clock()
+        self._last_reap = now
+        reaped = 0
+        with self.pools.lock:
+            for pool_key in list(self.pools.keys()):
+                last_used = self._last_used.get(pool_key, now)
+                if now - last_used < self.idle_timeout:
+                    continue
+                pool = self.pools.get(pool_key)
+                if pool is not None:
+                    self._count_reaped(pool)
+                    # removing the pool from the container closes it
+                    del self.pools[pool_key]
+                    reaped += 1
+                self._last_used.pop(pool_key, None)
+        return reaped
+
+    def stats(self):
+        """
+        return the number of pools, connections opened and requests made
+        for namenode and datanode hosts, including closed pools
+        """
+        with self._stats_lock:
+            stats = dict(
+                (kind, {'pools': 0, 'connections': connections,
+                        'requests': requests})
+                for kind, (connections, requests) in self._reaped.items())
+        with self.pools.lock:
+            pools = [self.pools.get(key) for key in self.pools.keys()]
+        for pool in pools:
+            if pool is None:
+                continue
+            kind_stats = stats[self.host_kind(pool.host, pool.port)]
+            kind_stats['pools'] += 1
+            kind_stats['connections'] += pool.num_connections
+            kind_stats['requests'] += pool.num_requests
+        for kind_stats in stats.values():
+            kind_stats['reused'] = max(
+                0, kind_stats['requests'] - kind_stats['connections'])
+        return stats
+
+    def _count_reaped(self, pool):
+        with self._stats_lock:
+            counts = self._reaped[self.host_kind(pool.host, pool.port)]
+            counts[0] += pool.num_connections
+            counts[1] += pool.num_requests
+
+
+class HdfsHTTPAdapter(HTTPAdapter):
+    """
+    A requests transport adapter backed by an HdfsPoolManager
+
+    >>> from pywebhdfs.pool import HdfsHTTPAdapter
+    >>> adapter = HdfsHTTPAdapter(namenode_hosts=['nn1:50070', 'nn2:50070'],
+    >>>                           pool_connections=64, pool_maxsize=32)
+    >>> session.mount('http://', adapter)
+    >>> adapter.stats()
+    """
+
+    __attrs__ = HTTPAdapter.__attrs__ + ['namenode_hosts', 'namenode_maxsize',
+                                         'idle_timeout']
+
+    def __init__(self, namenode_hosts=(), namenode_maxsize=None,
+                 idle_timeout=None, **kwargs):
+        """
+        :param namenode_hosts: host:port of the namenodes, see
+          HdfsPoolManager
+        :param namenode_maxsize: number of connections kept per namenode,
+          defaults to pool_maxsize
+        :param idle_timeout: number of seconds after which an unused pool is
+          closed
+
+        The remaining arguments (pool_connections, pool_maxsize,
+        pool_block, max_retries) are those of requests' HTTPAdapter.
+        """
+        self.namenode_hosts = list(namenode_hosts)
+        self.namenode_maxsize = namenode_maxsize
+        self.idle_timeout = idle_timeout
+        super(HdfsHTTPAdapter, self).__init__(**kwargs)
+
+    def init_poolmanager(self, connections, maxsize, block=False,
+                         **pool_kwargs):
+        self._pool_connections = connections
+        self._pool_maxsize = maxsize
+        self._pool_block = block
+        self.poolmanager = HdfsPoolManager(
+            namenode_hosts=self.namenode_hosts,
+            namenode_maxsize=self.namenode_maxsize,
+            idle_timeout=self.idle_timeout, num_pools=connections,
+            maxsize=maxsize, block=block, **pool_kwargs)
+
+    def stats(self):
+        return self.poolmanager.stats()
+
+    def reap_idle(self):
+        return self.poolmanager.reap_idle()
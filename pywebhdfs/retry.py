@@ -0,0 +1,183 @@
+import random
+import threading
+import time
+
+import requests
+from six.moves import http_client
+
+# errors that will not go away by sending the same request again
+_NON_RETRYABLE_ERRORS = (
+    requests.exceptions.InvalidURL,
+    requests.exceptions.InvalidSchema,
+    requests.exceptions.MissingSchema,
+    requests.exceptions.URLRequired,
+    requests.exceptions.TooManyRedirects,
+)
+
+
+class RetryPolicy(object):
+    """
+    Decides which failed requests are retried, and how long to wait before
+    retrying them
+
+    Waits grow with decorrelated jitter (each one random between base_delay
+    and three times the previous one) so that clients failing together do
+    not retry together. An optional deadline bounds the time spent on an
+    operation across all of its tries, and an optional CircuitBreaker stops
+    sending requests to namenodes that keep failing.
+
+    >>> from pywebhdfs.retry import CircuitBreaker, RetryPolicy
+    >>> policy = RetryPolicy(max_tries=5, deadline=30,
+    >>>                      circuit_breaker=CircuitBreaker())
+    >>> hdfs = PyWebHdfsClient(host='host', port='50070',
+    >>>                        retry_policy=policy)
+    """
+
+    def __init__(self, max_tries=3, deadline=None, base_delay=1.0,
+                 max_delay=30.0,
+                 retry_statuses=(http_client.SERVICE_UNAVAILABLE,),
+                 circuit_breaker=None, clock=time.time,
+                 uniform=random.uniform):
+        """
+        :param max_tries: maximum number of tries of a request to one host
+        :param deadline: maximum number of seconds spent on an operation,
+          including waits, unlimited by default
+        :param base_delay: minimum number of seconds waited before a retry
+        :param max_delay: maximum number of seconds waited before a retry
+        :param retry_statuses: HTTP status codes of responses that are
+          retried like connection errors
+        :param circuit_breaker: a CircuitBreaker tracking failing hosts
+        """
+        self.max_tries = int(max_tries)
+        self.deadline = deadline
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.retry_statuses = frozenset(retry_statuses)
+        self.circuit_breaker = circuit_breaker
+        self._clock = clock
+        self._uniform = uniform
+
+    def begin(self):
+        """
+        returns the RetryState of a new operation
+        """
+        return RetryState(self)
+
+    def is_retryable(self, error):
+        return isinstance(error, requests.exceptions.RequestException) and \
+            not isinstance(error, _NON_RETRYABLE_ERRORS)
+
+    def is_retryable_status(self, status_code):
+        return status_code in self.retry_statuses
+
+    def allow(self, host):
+        return self.circuit_breaker is None or \
+            self.circuit_breaker.allow(host)
+
+    def record_success(self, host):
+        if self.circuit_breaker is not None:
+            self.circuit_breaker.record_success(host)
+
+    def record_failure(self, host):
+        if self.circuit_breaker is not None:
+            self.circuit_breaker.record_failure(host)
+
+
+class RetryState(object):
+    """
+    The tries made so far by one operation under a RetryPolicy
+    """
+
+    def __init__(self, policy):
+        self.policy = policy
+        self.started = policy._clock()
+        self.tries = 0
+        self._delay = policy.base_delay
+
+    def backoff(self):
+        """
+        count a failed try and return the number of seconds to wait before
+        the next one, or None if the operation should give up
+        """
+        policy = self.policy
+        self.tries += 1
+        if self.tries >= policy.max_tries:
+            return None
+        self._delay = min(policy.max_delay, policy._uniform(
+            policy.base_delay, self._delay * 3))
+        remaining = self.remaining()
+        if remaining is not None and remaining < self._delay:
+            return None
+        return self._delay
+
+    def restart(self):
+        """
+        start counting tries again, for another host, keeping the deadline
+        """
+        self.tries = 0
+        self._delay = self.policy.base_delay
+
+    def remaining(self):
+        """
+        returns the number of seconds left before the deadline, or None
+        """
+        if self.policy.deadline is None:
+            return None
+        return self.started + self.policy.deadline - self.policy._clock()
+
+    def expired(self):
+        remaining = self.remaining()
+        return remaining is not None and remaining <= 0
+
+
+class CircuitBreaker(object):
+    """
+    Stops sending requests to a host after failure_threshold consecutive
+    failures, for reset_timeout seconds, after which one request is let
+    through to find out whether the host recovered
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0,
+                 clock=time.time):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._failures = {}
+        self._opened = {}
+        self._lock = threading.Lock()
+
+    def allow(self, host):
+        with self._lock:
+            opened = self._opened.get(host)
+            if opened is None:
+                return True
+            now = self._clock()
+            if now - opened < self.reset_timeout:
+                return False
+            # half open: let one request through, the others stay out for
+            # another reset_timeout unless it succeeds
+            self._opened[host] = now
+            return True
+
+    def record_success(self, host):
+        with self._lock:
+            self._failures.pop(host, None)
+            self._opened.pop(host, None)
+
+    def record_failure(self, host):
+        with self._lock:
+            failures = self._failures.get(host, 0) + 1
+            self._failures[host] = failures
+            if failures >= self.failure_threshold:
+                self._opened[host] = self._clock()
+
+    def is_open(self, host):
+        with self._lock:
+            opened = self._opened.get(host)
+            return opened is not None and \
+                self._clock() - opened < self.reset_timeout
+
+    def stats(self):
+        with self._lock:
+            return {'failures': dict(self._failures),
+                    'open': sorted(self._opened)}
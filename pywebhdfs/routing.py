@@ -0,0 +1,115 @@
+from collections import deque
+import threading
+
+from pywebhdfs import operations
+
+# read-only operations that can safely be sent twice; OPEN is always sent
+# with stream=True, so that only its response headers are raced
+HEDGED_OPERATIONS = frozenset([
+    operations.OPEN,
+    operations.GETFILESTATUS,
+    operations.LISTSTATUS,
+    operations.LISTSTATUS_BATCH,
+    operations.GETCONTENTSUMMARY,
+    operations.GETFILECHECKSUM,
+    operations.GETXATTRS,
+    operations.LISTXATTRS,
+])
+
+
+class HostLatencyTracker(object):
+    """
+    Tracks the latency of requests to each namenode, as an exponentially
+    weighted moving average and a window of recent samples per operation
+
+    The average is used to try the fastest hosts first and a percentile of
+    the recent samples of an operation decides how long to wait before
+    hedging it. OPEN requests, which include a datanode transfer, only count
+    towards their own samples.
+    """
+
+    def __init__(self, alpha=0.2, window=100, percentile=95,
+                 default_delay=0.05, min_delay=0.005, min_samples=10,
+                 standby_penalty=10.0):
+        """
+        :param alpha: weight of each new sample in the moving average
+        :param window: number of recent samples kept per host
+        :param percentile: percentile of the recent samples used as the
+          hedging delay
+        :param default_delay: hedging delay in seconds until a host has
+          min_samples samples
+        :param min_delay: lower bound of the hedging delay in seconds
+        :param min_samples: number of samples needed to compute a percentile
+        :param standby_penalty: latency in seconds recorded when a host
+          answers as a standby namenode, so it sorts after active ones
+        """
+        self.alpha = alpha
+        self.window = window
+        self.percentile = percentile
+        self.default_delay = default_delay
+        self.min_delay = min_delay
+        self.min_samples = min_samples
+        self.standby_penalty = standby_penalty
+        self.hedges = 0
+        self.hedges_won = 0
+        self._ewma = {}
+        self._samples = {}
+        self._lock = threading.Lock()
+
+    def record(self, host, operation, seconds):
+        with self._lock:
+            if operation != operations.OPEN:
+                previous = self._ewma.get(host)
+                if previous is None:
+                    self._ewma[host] = seconds
+                else:
+                    self._ewma[host] = \
+                        previous + self.alpha * (seconds - previous)
+            samples = self._samples.get((host, operation))
+            if samples is None:
+                samples = self._samples[(host, operation)] = \
+                    deque(maxlen=self.window)
+            samples.append(seconds)
+
+    def record_standby(self, host):
+        with self._lock:
+            self._ewma[host] = self.standby_penalty
+
+    def record_hedge(self):
+        with self._lock:
+            self.hedges += 1
+
+    def record_hedge_won(self):
+        with self._lock:
+            self.hedges_won += 1
+
+    def ewma(self, host):
+        return self._ewma.get(host)
+
+    def hedge_delay(self, host, operation):
+        """
+        returns the number of seconds to wait for a request to host before
+        sending a backup request
+        """
+        with self._lock:
+            samples = sorted(self._samples.get((host, operation), ()))
+        if len(samples) < self.min_samples:
+            return self.default_delay
+        index = min(len(samples) - 1,
+                    int(len(samples) * self.percentile / 100.0))
+        return max(self.min_delay, samples[index])
+
+    def order(self, hosts):
+        """
+        returns the hosts sorted by average latency, hosts without samples
+        first and in their original order
+        """
+        return sorted(hosts, key=lambda host: self._ewma.get(host, 0))
+
+    def stats(self):
+        with self._lock:
+            return {
+                'hedges': self.hedges,
+                'hedges_won': self.hedges_won,
+                'ewma': dict(self._ewma),
+            }
@@ -0,0 +1,204 @@
+from array import array
+import importlib
+import json
+import sys
+
+import six
+from six.moves import intern, zip
+
+# fastest first
+DECODERS = ('orjson', 'ujson', 'json')
+
+# json.loads only accepts bytes from Python 3.6
+_JSON_LOADS_BYTES = six.PY2 or sys.version_info >= (3, 6)
+
+try:
+    array('q')
+    _INT64 = 'q'
+except ValueError:
+    # python 2, where long is 64 bits on the platforms HDFS runs on
+    _INT64 = 'l'
+
+
+def get_decoder(decoder):
+    """
+    returns a function decoding JSON documents from bytes
+
+    :param decoder: the name of a module among orjson, ujson and json,
+      'auto' for the fastest of them that is installed, or a function
+    """
+    if callable(decoder):
+        return decoder
+    if decoder == 'auto':
+        for name in DECODERS:
+            try:
+                return get_decoder(name)
+            except ImportError:
+                continue
+    if decoder not in DECODERS:
+        raise ValueError("Unknown JSON decoder {0!r}".format(decoder))
+    if decoder == 'json':
+        if _JSON_LOADS_BYTES:
+            return json.loads
+        return _json_loads_text
+    return importlib.import_module(decoder).loads
+
+
+def _json_loads_text(content):
+    return json.loads(content.decode('utf-8'))
+
+
+class FileStatus(object):
+    """
+    A WebHDFS FileStatus held in slots rather than in a dict
+
+    Fields are attributes named in snake case (path_suffix, length,
+    modification_time...). The WebHDFS names can still be used as keys, so
+    that code written for status dicts keeps working:
+
+    >>> status.length == status['length']
+    True
+    >>> status.modification_time == status['modificationTime']
+    True
+
+    Fields the namenode sends that are not listed here are kept in extra.
+    """
+
+    __slots__ = ('access_time', 'block_size', 'children_num', 'file_id',
+                 'group', 'length', 'modification_time', 'owner',
+                 'path_suffix', 'permission', 'replication',
+                 'storage_policy', 'symlink', 'type', 'extra')
+
+    # WebHDFS name, attribute name, whether repeated values are interned
+    _FIELDS = (
+        ('accessTime', 'access_time', False),
+        ('blockSize', 'block_size', False),
+        ('childrenNum', 'children_num', False),
+        ('fileId', 'file_id', False),
+        ('group', 'group', True),
+        ('length', 'length', False),
+        ('modificationTime', 'modification_time', False),
+        ('owner', 'owner', True),
+        ('pathSuffix', 'path_suffix', False),
+        ('permission', 'permission', True),
+        ('replication', 'replication', False),
+        ('storagePolicy', 'storage_policy', False),
+        ('symlink', 'symlink', False),
+        ('type', 'type', True),
+    )
+    _ATTRIBUTES = dict((key, attribute) for key, attribute, _ in _FIELDS)
+
+    def __init__(self, **kwargs):
+        for attribute in self.__slots__:
+            setattr(self, attribute, kwargs.pop(attribute, None))
+        if kwargs:
+            raise TypeError("Unknown FileStatus fields {0}".format(
+                ', '.join(sorted(kwargs))))
+
+    @classmethod
+    def from_json(cls, status):
+        """
+        build a FileStatus from a status dict as decoded from WebHDFS
+        """
+        record = cls.__new__(cls)
+        for key, attribute, interned in cls._FIELDS:
+            value = status.get(key)
+            if interned and isinstance(value, str):
+                value = intern(value)
+            setattr(record, attribute, value)
+        record.extra = None
+        for key in status:
+            if key not in cls._ATTRIBUTES:
+                if record.extra is None:
+                    record.extra = {}
+                record.extra[key] = status[key]
+        return record
+
+    @property
+    def is_dir(self):
+        return self.type == 'DIRECTORY'
+
+    def __getitem__(self, key):
+        attribute = self._ATTRIBUTES.get(key)
+        if attribute is not None:
+            value = getattr(self, attribute)
+            if value is not None:
+                return value
+        elif self.extra and key in self.extra:
+            return self.extra[key]
+        raise KeyError(key)
+
+    def __contains__(self, key):
+        try:
+            self[key]
+        except KeyError:
+            return False
+        return True
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def to_dict(self):
+        """
+        returns the status as the dict WebHDFS sent
+        """
+        status = dict(self.extra or ())
+        for key, attribute, _ in self._FIELDS:
+            value = getattr(self, attribute)
+            if value is not None:
+                status[key] = value
+        return status
+
+    def __eq__(self, other):
+        if not isinstance(other, FileStatus):
+            return NotImplemented
+        return all(getattr(self, attribute) == getattr(other, attribute)
+                   for attribute in self.__slots__)
+
+    def __ne__(self, other):
+        equal = self.__eq__(other)
+        return equal if equal is NotImplemented else not equal
+
+    __hash__ = None
+
+    def __repr__(self):
+        return 'FileStatus(path_suffix={0!r}, type={1!r}, length={2!r})' \
+            .format(self.path_suffix, self.type, self.length)
+
+
+class StatusColumns(object):
+    """
+    The file statuses of a directory stored column by column: names in a
+    list, sizes, modification times and types in typed arrays, at about
+    a tenth of the memory of status dicts
+
+    The arrays support the buffer protocol, so NumPy can use them without
+    copying:
+
+    >>> lengths = numpy.frombuffer(columns.lengths, dtype=numpy.int64)
+    """
+
+    def __init__(self):
+        self.names = []
+        self.lengths = array(_INT64)
+        self.modification_times = array(_INT64)
+        self.is_dir = array('b')
+
+    def append(self, status):
+        """
+        add a status, either a dict or a FileStatus
+        """
+        self.names.append(status['pathSuffix'])
+        self.lengths.append(status['length'])
+        self.modification_times.append(status['modificationTime'])
+        self.is_dir.append(status['type'] == 'DIRECTORY')
+
+    def __len__(self):
+        return len(self.names)
+
+    def __iter__(self):
+        return zip(self.names, self.lengths, self.modification_times,
+                   (bool(is_dir) for is_dir in self.is_dir))
@@ -0,0 +1,227 @@
+from collections import deque
+import io
+
+import six
+
+
+class HdfsFileReader(io.RawIOBase):
+    """
+    A seekable, read-only raw stream over a file on HDFS
+
+    Every read is served by a ranged WebHDFS OPEN request, so only the bytes
+    asked for are transferred. Wrap it in an io.BufferedReader (as
+    PyWebHdfsClient.open_read does) so that small sequential reads are
+    turned into a few large requests.
+    """
+
+    def __init__(self, client, path, length=None):
+        """
+        :param client: the PyWebHdfsClient used to issue requests
+        :param path: the HDFS file path
+        :param length: the length of the file, looked up with GETFILESTATUS
+          when not provided
+        """
+        super(HdfsFileReader, self).__init__()
+        self.client = client
+        self.name = path
+        self.mode = 'rb'
+        if length is None:
+            status = client.get_file_dir_status(path)
+            length = status['FileStatus']['length']
+        self.length = length
+        self._pos = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        self._checkClosed()
+        return self._pos
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        self._checkClosed()
+        if whence == io.SEEK_SET:
+            pos = offset
+        elif whence == io.SEEK_CUR:
+            pos = self._pos + offset
+        elif whence == io.SEEK_END:
+            pos = self.length + offset
+        else:
+            raise ValueError("invalid whence ({0})".format(whence))
+        if pos < 0:
+            raise ValueError("negative seek position {0}".format(pos))
+        self._pos = pos
+        return self._pos
+
+    def readinto(self, b):
+        self._checkClosed()
+        size = min(len(b), self.length - self._pos)
+        if size <= 0:
+            return 0
+        size = self.client.stream_file_into(
+            self.name, memoryview(b)[:size], offset=self._pos, length=size)
+        self._pos += size
+        return size
+
+    def readall(self):
+        self._checkClosed()
+        size = self.length - self._pos
+        if size <= 0:
+            return b''
+        data = self.client.read_file(self.name, offset=self._pos,
+                                     length=size)
+        self._pos += len(data)
+        return data
+
+
+class UploadSource(object):
+    """
+    Wraps the data given to create_file or append_file so that it can be
+    sent again when a datanode request fails
+
+    Strings are sent as they are. File objects and iterators are sent with
+    chunked transfer encoding, so memory use is bounded by chunk_size
+    whatever the size of the upload. Seekable files are rewound on retry;
+    for other sources the most recent replay_size bytes are kept, so an
+    upload can resume from the length acknowledged by HDFS.
+    """
+
+    def __init__(self, data, chunk_size=1024 * 1024,
+                 replay_size=16 * 1024 * 1024):
+        """
+        :param data: a string, a file-like object or an iterator of chunks
+        :param chunk_size: size of the chunks read from file-like objects
+        :param replay_size: number of bytes kept to resume non-seekable
+          sources
+        """
+        self.chunk_size = chunk_size
+        self.replay_size = replay_size
+        self.sent = 0
+
+        self._data = data
+        self._start = None
+        self._iterator = None
+        self._replay = deque()
+        self._replay_bytes = 0
+        self._resume_at = 0
+
+        if isinstance(data, (six.binary_type, six.text_type, bytearray)):
+            self.rewindable = True
+        elif hasattr(data, 'read'):
+            self._start = _tell(data)
+            self.rewindable = self._start is not None
+            if not self.rewindable:
+                self._iterator = _read_chunks(data, chunk_size)
+        else:
+            self.rewindable = False
+            self._iterator = iter(data)
+
+    def body(self):
+        """
+        returns the request body for the next attempt
+        """
+        if self._start is not None:
+            self._data.seek(self._start)
+            return _read_chunks(self._data, self.chunk_size)
+        if self._iterator is not None:
+            return self._stream()
+        return self._data
+
+    def resume(self, acknowledged):
+        """
+        prepares the next body to start at the given number of bytes
+        acknowledged by HDFS and returns whether that is still possible
+        """
+        if self.rewindable:
+            return acknowledged == 0
+        window_start = self._replay[0][0] if self._replay else self.sent
+        if not window_start <= acknowledged <= self.sent:
+            return False
+        self._resume_at = acknowledged
+        return True
+
+    def _stream(self):
+        for offset, chunk in list(self._replay):
+            if offset + len(chunk) > self._resume_at:
+                yield chunk[max(0, self._resume_at - offset):]
+
+        for chunk in self._iterator:
+            if isinstance(chunk, six.text_type):
+                chunk = chunk.encode('utf8')
+            if not chunk:
+                continue
+            self._remember(chunk)
+            yield chunk
+
+    def _remember(self, chunk):
+        self._replay.append((self.sent, chunk))
+        self.sent += len(chunk)
+        self._replay_bytes += len(chunk)
+        while self._replay_bytes - len(self._replay[0][1]) >= \
+                self.replay_size:
+            self._replay_bytes -= len(self._replay.popleft()[1])
+
+
+def _tell(data):
+    """
+    returns the position of a file-like object, or None if it can not seek
+    """
+    try:
+        if hasattr(data, 'seekable') and not data.seekable():
+            return None
+        return data.tell()
+    except (IOError, OSError, AttributeError):
+        return None
+
+
+def _read_chunks(data, chunk_size):
+    while True:
+        chunk = data.read(chunk_size)
+        if not chunk:
+            return
+        if isinstance(chunk, six.text_type):
+            chunk = chunk.encode('utf8')
+        yield chunk
+
+
+class FileSlice(object):
+    """
+    A read-only, seekable file-like view over a byte range of a local file,
+    used to upload one part of a file
+    """
+
+    def __init__(self, path, offset, length):
+        self.offset = offset
+        self.length = length
+        self._file = open(path, 'rb')
+        self._file.seek(offset)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def tell(self):
+        return self._file.tell() - self.offset
+
+    def seek(self, pos, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            pos += self.tell()
+        elif whence == io.SEEK_END:
+            pos += self.length
+        pos = min(max(pos, 0), self.length)
+        self._file.seek(self.offset + pos)
+        return pos
+
+    def read(self, size=-1):
+        remaining = self.length - self.tell()
+        if size is None or size < 0 or size > remaining:
+            size = remaining
+        return self._file.read(size)
+
+    def close(self):
+        self._file.close()
@@ -0,0 +1,242 @@
+from concurrent.futures import ThreadPoolExecutor
+import os
+import posixpath
+import shutil
+import uuid
+
+from pywebhdfs import errors
+from pywebhdfs.cache import normalize_path
+from pywebhdfs.checksum import checksum_matches
+
+UPLOAD = 'upload'
+DOWNLOAD = 'download'
+
+_replace = getattr(os, 'replace', os.rename)
+
+
+class SyncResult(object):
+    """
+    What sync did, or would do with dry_run, as paths relative to the
+    synced directories
+    """
+
+    def __init__(self):
+        self.copied = []
+        self.deleted = []
+        self.created_dirs = []
+        self.unchanged = 0
+        self.bytes_copied = 0
+
+    def __repr__(self):
+        return ('SyncResult(copied={0}, deleted={1}, created_dirs={2}, '
+                'unchanged={3}, bytes_copied={4})').format(
+            len(self.copied), len(self.deleted), len(self.created_dirs),
+            self.unchanged, self.bytes_copied)
+
+
+def sync(client, local_dir, hdfs_dir, direction=UPLOAD, delete=False,
+         checksum=False, max_workers=8, dry_run=False):
+    """
+    Makes a directory tree on HDFS a copy of a local one, or the reverse,
+    transferring only the files that differ
+
+    :param client: a PyWebHdfsClient
+    :param local_dir: the local directory
+    :param hdfs_dir: the HDFS directory
+    :param direction: UPLOAD to copy local_dir to hdfs_dir, DOWNLOAD to
+      copy hdfs_dir to local_dir
+    :param delete: remove the files and directories of the destination
+      that the source does not have
+    :param checksum: compare files of the same size by checksum rather
+      than by modification time
+    :param max_workers: number of files compared or copied concurrently,
+      and of HDFS directories listed concurrently
+    :param dry_run: only compute what would be done
+
+    Both trees are listed concurrently, and the destination directory is
+    created if it does not exist. A file is copied when it is
+    missing from the destination, when its size differs, or when the
+    source is more recent than the destination. Downloaded files get the
+    modification time of their HDFS file, so that they compare as
+    unchanged on the next run. Uploaded files are newer than their local
+    file, unless the local file changes. With checksum, the HDFS checksum
+    of a file is compared with one computed from the local file, which
+    catches changes that keep the size and the modification time, and
+    does not depend on the local and namenode clocks. Files whose HDFS
+    checksum algorithm is not supported are compared by modification time,
+    as are CRC32C checksums, the default of Hadoop 2 and later, unless the
+    crc32c extra is installed.
+
+    Returns a SyncResult.
+    """
+    if direction not in (UPLOAD, DOWNLOAD):
+        raise ValueError("Unknown sync direction {0!r}".format(direction))
+    hdfs_dir = normalize_path(hdfs_dir)
+    result = SyncResult()
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        hdfs_tree = executor.submit(_hdfs_tree, client, hdfs_dir,
+                                    max_workers, direction == DOWNLOAD)
+        local_files, local_dirs = _local_tree(local_dir,
+                                              direction == UPLOAD)
+        hdfs_files, hdfs_dirs = hdfs_tree.result()
+
+        if direction == UPLOAD:
+            source, source_dirs = local_files, local_dirs
+            target, target_dirs = hdfs_files, hdfs_dirs
+        else:
+            source, source_dirs = hdfs_files, hdfs_dirs
+            target, target_dirs = local_files, local_dirs
+
+        def paths(relative_path):
+            return (os.path.join(local_dir, *relative_path.split('/')),
+                    posixpath.join(hdfs_dir, relative_path))
+
+        def differs(relative_path):
+            size, mtime = source[relative_path]
+            target_size, target_mtime = target[relative_path]
+            if size != target_size:
+                return True
+            if checksum:
+                local_path, hdfs_path = paths(relative_path)
+                try:
+                    return not checksum_matches(
+                        local_path, client.get_file_checksum(hdfs_path))
+                except ValueError:
+                    # an algorithm that can not be computed here, or only
+                    # too slowly
+                    pass
+            return mtime > target_mtime
+
+        common = sorted(set(source) & set(target))
+        copies = sorted(set(source) - set(target))
+        for relative_path, changed in zip(
+                common, list(executor.map(differs, common))):
+            if changed:
+                copies.append(relative_path)
+            else:
+                result.unchanged += 1
+        result.copied = sorted(copies)
+        result.bytes_copied = sum(source[path][0] for path in copies)
+        result.created_dirs = sorted(source_dirs - target_dirs)
+        if delete:
+            extra_dirs = target_dirs - source_dirs
+            result.deleted = sorted(
+                path for path in (set(target) - set(source)) | extra_dirs
+                if _parent(path) not in extra_dirs)
+
+        if dry_run:
+            return result
+
+        if delete:
+            _wait(executor.map(
+                lambda relative_path: _delete(client, direction,
+                                              *paths(relative_path)),
+                result.deleted))
+        # the destination itself first, as created_dirs only holds the
+        # directories under it
+        if direction == UPLOAD:
+            if not target and not target_dirs:
+                client.make_dir(hdfs_dir)
+        elif not os.path.isdir(local_dir):
+            os.makedirs(local_dir)
+        # parents first
+        for relative_path in result.created_dirs:
+            local_path, hdfs_path = paths(relative_path)
+            if direction == UPLOAD:
+                client.make_dir(hdfs_path)
+            elif not os.path.isdir(local_path):
+                os.makedirs(local_path)
+        _wait(executor.map(
+            lambda relative_path: _copy(client, direction,
+                                        source[relative_path][1],
+                                        *paths(relative_path)),
+            result.copied))
+
+    return result
+
+
+def _wait(results):
+    for _ in results:
+        pass
+
+
+def _parent(relative_path):
+    return posixpath.dirname(relative_path) or None
+
+
+def _local_tree(local_dir, must_exist):
+    """
+    returns {relative path: (size, mtime in milliseconds)} for the files
+    under local_dir, and the set of relative paths of its directories
+    """
+    files = {}
+    dirs = set()
+    if not os.path.isdir(local_dir):
+        if must_exist:
+            raise IOError("No such directory: {0}".format(local_dir))
+        return files, dirs
+    for dirpath, dirnames, filenames in os.walk(local_dir):
+        relative_dir = os.path.relpath(dirpath, local_dir)
+        relative_dir = '' if relative_dir == os.curdir else \
+            relative_dir.replace(os.sep, '/')
+        for name in dirnames:
+            dirs.add(posixpath.join(relative_dir, name))
+        for name in filenames:
+            stat = os.stat(os.path.join(dirpath, name))
+            files[posixpath.join(relative_dir, name)] = \
+                (stat.st_size, int(round(stat.st_mtime * 1000)))
+    return files, dirs
+
+
+def _hdfs_tree(client, hdfs_dir, max_workers, must_exist):
+    """
+    returns {relative path: (size, mtime in milliseconds)} for the files
+    under hdfs_dir, and the set of relative paths of its directories
+    """
+    files = {}
+    dirs = set()
+    prefix = len(hdfs_dir.rstrip('/')) + 1
+    try:
+        for dirpath, dirnames, filenames in client.walk(hdfs_dir,
+                                                        max_workers):
+            relative_dir = dirpath[prefix:]
+            for status in dirnames:
+                dirs.add(posixpath.join(relative_dir, status['pathSuffix']))
+            for status in filenames:
+                files[posixpath.join(relative_dir, status['pathSuffix'])] = \
+                    (status['length'], status['modificationTime'])
+    except errors.FileNotFound:
+        if must_exist:
+            raise
+    return files, dirs
+
+
+def _copy(client, direction, mtime, local_path, hdfs_path):
+    if direction == UPLOAD:
+        with open(local_path, 'rb') as local_file:
+            client.create_file(hdfs_path, local_file, overwrite=True)
+        return
+
+    # write next to the file and move it into place, so that an
+    # interrupted sync never leaves a truncated file looking current
+    temp_path = os.path.join(os.path.dirname(local_path),
+                             '.{0}.tmp'.format(uuid.uuid4().hex))
+    try:
+        with open(temp_path, 'wb') as local_file:
+            client.stream_file_into(hdfs_path, local_file)
+        os.utime(temp_path, (mtime / 1000.0, mtime / 1000.0))
+        _replace(temp_path, local_path)
+    except Exception:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+def _delete(client, direction, local_path, hdfs_path):
+    if direction == UPLOAD:
+        client.delete_file_dir(hdfs_path, recursive=True)
+    elif os.path.isdir(local_path):
+        shutil.rmtree(local_path)
+    else:
+        os.remove(local_path)
@@ -0,0 +1,798 @@
+from collections import deque
+import json
+import os
+import random
+import shutil
+import socket
+import tempfile
+import threading
+import time
+
+from six.moves import BaseHTTPServer, http_client, socketserver
+from six.moves.urllib.parse import parse_qsl, quote, unquote, urlencode, \
+    urlsplit
+
+from pywebhdfs import operations
+from pywebhdfs.checksum import CRC32, CompositeCrc, MD5MD5CRC32
+from pywebhdfs.webhdfs import PyWebHdfsClient
+
+NAMENODE = 'namenode'
+DATANODE = 'datanode'
+
+# a fault answering a request by closing its connection
+DROP = 'drop'
+
+# values of dfs.checksum.combine.mode
+MD5MD5CRC = 'MD5MD5CRC'
+COMPOSITE_CRC = 'COMPOSITE_CRC'
+
+_PREFIX = '/webhdfs/v1'
+_CHUNK_SIZE = 64 * 1024
+
+
+class FakeWebHdfs(object):
+    """
+    An in-process WebHDFS cluster of namenodes and a datanode, storing
+    files in a local directory, for tests and benchmarks that need real
+    HTTP without a Hadoop cluster
+
+    Every operation of pywebhdfs.operations is implemented. Namenodes
+    answer CREATE, APPEND, OPEN and GETFILECHECKSUM with a 307 redirect to
+    the datanode (or the Location document with noredirect=true), and all
+    namenodes but the active one answer with a StandbyException. Errors are
+    RemoteException documents with the status codes HDFS uses.
+
+    Faults can be injected: latency before each answer, a bandwidth limit
+    on datanode transfers, a rate of 503 answers, and scripted failures
+    with fail_next.
+
+    >>> from pywebhdfs.testing import FakeWebHdfs
+    >>> with FakeWebHdfs(namenodes=2) as cluster:
+    >>>     hdfs = cluster.client()
+    >>>     hdfs.create_file('user/hdfs/a.txt', b'0123')
+    >>>     cluster.failover()
+    >>>     hdfs.read_file('user/hdfs/a.txt')
+    """
+
+    def __init__(self, root=None, namenodes=1, host='127.0.0.1', latency=0.0,
+                 bandwidth=None, failure_rate=0.0, list_limit=1000,
+                 block_size=128 * 1024 * 1024, user_name='hdfs', seed=None,
+                 checksum_type=CRC32, checksum_combine_mode=MD5MD5CRC):
+        """
+        :param root: directory holding the files, a new temporary directory
+          removed by close by default
+        :param namenodes: number of namenodes, the first one being active
+        :param host: address the servers listen on
+        :param latency: seconds waited before answering each request
+        :param bandwidth: bytes per second of each datanode transfer, not
+          limited by default
+        :param failure_rate: probability of answering a request with a 503
+        :param list_limit: number of entries per LISTSTATUS_BATCH answer
+        :param block_size: default HDFS block size of created files
+        :param user_name: owner of all files
+        :param seed: seed of the random failures
+        :param checksum_type: CRC32 or CRC32C, as dfs.checksum.type
+        :param checksum_combine_mode: MD5MD5CRC or COMPOSITE_CRC, as
+          dfs.checksum.combine.mode
+        """
+        self._own_root = root is None
+        if root is None:
+            root = tempfile.mkdtemp(prefix='pywebhdfs-fake-')
+        if isinstance(root, bytes):
+            root = root.decode('utf8')
+        self.root = root
+        self.host = host
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.failure_rate = failure_rate
+        self.list_limit = list_limit
+        self.block_size = block_size
+        self.user_name = user_name
+        self.checksum_type = checksum_type
+        self.checksum_combine_mode = checksum_combine_mode
+        self.active = 0
+        self.log = []
+        self._namenode_count = namenodes
+        self._servers = []
+        self._threads = []
+        self._faults = {NAMENODE: deque(), DATANODE: deque()}
+        self._block_sizes = {}
+        self._xattrs = {}
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def start(self):
+        for index in range(self._namenode_count):
+            self._serve(NAMENODE, index)
+        self._serve(DATANODE, 0)
+        return self
+
+    def close(self):
+        for server in self._servers:
+            server.shutdown()
+            server.server_close()
+            server.close_connections()
+        for thread in self._threads:
+            thread.join()
+        self._servers = []
+        self._threads = []
+        if self._own_root:
+            shutil.rmtree(self.root, ignore_errors=True)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @property
+    def namenode_hosts(self):
+        """
+        the host:port of every namenode
+        """
+        return [_address(server) for server in self._servers
+                if server.role == NAMENODE]
+
+    @property
+    def datanode_host(self):
+        return [_address(server) for server in self._servers
+                if server.role == DATANODE][0]
+
+    # the host placeholder receives host:port
+    base_uri_pattern = 'http://{host}' + _PREFIX + '/'
+
+    def client(self, **kwargs):
+        """
+        returns a PyWebHdfsClient for the cluster, the keyword arguments
+        being passed to it
+        """
+        kwargs.setdefault('path_to_hosts', [('.*', self.namenode_hosts)])
+        kwargs.setdefault('base_uri_pattern', self.base_uri_pattern)
+        kwargs.setdefault('user_name', self.user_name)
+        return PyWebHdfsClient(**kwargs)
+
+    def failover(self, active=None):
+        """
+        make another namenode active, the next one by default
+        """
+        if active is None:
+            active = (self.active + 1) % self._namenode_count
+        self.active = active
+
+    def fail_next(self, count=1, status=http_client.SERVICE_UNAVAILABLE,
+                  role=NAMENODE):
+        """
+        answer the next count requests made to the namenodes (or the
+        datanode) with status, or by closing the connection when status is
+        DROP
+        """
+        with self._lock:
+            self._faults[role].extend([status] * count)
+
+    def requests(self, operation=None, role=None):
+        """
+        returns the (role, method, operation, path) of the requests served,
+        optionally only those for an operation or a role
+        """
+        with self._lock:
+            return [entry for entry in self.log
+                    if operation in (None, entry[2]) and
+                    role in (None, entry[0])]
+
+    def local_path(self, path):
+        """
+        returns the local file backing an HDFS path
+        """
+        parts = [part for part in path.split('/') if part]
+        if any(part in ('.', '..') for part in parts):
+            raise _RemoteException(http_client.BAD_REQUEST,
+                                   'IllegalArgumentException',
+                                   'Invalid path name ' + path)
+        return os.path.join(self.root, *parts)
+
+    def _serve(self, role, index):
+        server = _Server((self.host, 0), _Handler)
+        server.fake = self
+        server.role = role
+        server.index = index
+        thread = threading.Thread(target=server.serve_forever,
+                                  kwargs={'poll_interval': 0.05})
+        thread.daemon = True
+        thread.start()
+        self._servers.append(server)
+        self._threads.append(thread)
+
+    def _next_fault(self, role):
+        with self._lock:
+            if self._faults[role]:
+                return self._faults[role].popleft()
+            if self.failure_rate and \
+                    self._random.random() < self.failure_rate:
+                return http_client.SERVICE_UNAVAILABLE
+        return None
+
+    def _record(self, role, method, operation, path):
+        with self._lock:
+            self.log.append((role, method, operation, path))
+
+
+class _Server(socketserver.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def server_activate(self):
+        BaseHTTPServer.HTTPServer.server_activate(self)
+        self.connections = set()
+        self.connections_lock = threading.Lock()
+
+    def process_request_thread(self, request, client_address):
+        with self.connections_lock:
+            self.connections.add(request)
+        try:
+            socketserver.ThreadingMixIn.process_request_thread(
+                self, request, client_address)
+        finally:
+            with self.connections_lock:
+                self.connections.discard(request)
+
+    def close_connections(self):
+        """
+        end the kept alive connections, letting their threads finish
+        """
+        with self.connections_lock:
+            connections = list(self.connections)
+        for connection in connections:
+            try:
+                connection.shutdown(socket.SHUT_RDWR)
+            except (IOError, OSError):
+                pass
+
+
+class _RemoteException(Exception):
+
+    def __init__(self, status, exception, message):
+        super(_RemoteException, self).__init__(message)
+        self.status = status
+        self.exception = exception
+        self.message = message
+
+
+class _Handler(BaseHTTPServer.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # headers and bodies are written separately, which Nagle's algorithm
+    # would hold back until the client's delayed acknowledgement
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        self._dispatch('GET')
+
+    def do_PUT(self):
+        self._dispatch('PUT')
+
+    def do_POST(self):
+        self._dispatch('POST')
+
+    def do_DELETE(self):
+        self._dispatch('DELETE')
+
+    def log_message(self, format, *args):
+        pass
+
+    def _dispatch(self, method):
+        fake = self.server.fake
+        role = self.server.role
+        split = urlsplit(self.path)
+        self.params = dict((_text(key), _text(value)) for key, value in
+                           parse_qsl(split.query, keep_blank_values=True))
+        operation = self.params.get('op', '').upper()
+        path = _text(unquote(split.path))
+        fake._record(role, method, operation, path[len(_PREFIX):] or '/')
+
+        if fake.latency:
+            time.sleep(fake.latency)
+        self._drained = False
+        if role == NAMENODE or method == 'GET':
+            # only datanode writes take data
+            self._drain()
+
+        fault = fake._next_fault(role)
+        if fault == DROP:
+            self.close_connection = 1
+            return
+        try:
+            if fault is not None:
+                self._drain()
+                raise _RemoteException(fault, 'RetriableException',
+                                       'Injected failure')
+            if not path.startswith(_PREFIX):
+                raise _RemoteException(http_client.NOT_FOUND,
+                                       'FileNotFoundException',
+                                       'Not a WebHDFS path ' + path)
+            path = '/' + path[len(_PREFIX):].strip('/')
+            if role == NAMENODE:
+                if self.server.index != fake.active:
+                    raise _RemoteException(
+                        http_client.FORBIDDEN, 'StandbyException',
+                        'Operation category {0} is not supported in state '
+                        'standby'.format(
+                            'READ' if method == 'GET' else 'WRITE'))
+                handler = _NAMENODE_OPERATIONS.get((method, operation))
+            else:
+                handler = _DATANODE_OPERATIONS.get((method, operation))
+            if handler is None:
+                self._drain()
+                raise _RemoteException(
+                    http_client.BAD_REQUEST, 'IllegalArgumentException',
+                    'Invalid value for webhdfs parameter "op": {0} {1}'
+                    .format(method, operation))
+            handler(self, fake, path)
+        except _RemoteException as e:
+            if not self._drained:
+                self.close_connection = 1
+            self._send_json(e.status, {'RemoteException': {
+                'exception': e.exception,
+                'javaClassName': _JAVA_CLASSES.get(
+                    e.exception, 'java.io.IOException'),
+                'message': e.message}})
+        except (IOError, OSError) as e:
+            if not self._drained:
+                self.close_connection = 1
+            self._send_json(http_client.INTERNAL_SERVER_ERROR,
+                            {'RemoteException': {
+                                'exception': 'IOException',
+                                'javaClassName': 'java.io.IOException',
+                                'message': str(e)}})
+
+    def _send_json(self, status, document, headers=()):
+        body = json.dumps(document).encode('utf8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_empty(self, status, headers=()):
+        self.send_response(status)
+        self.send_header('Content-Length', '0')
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+
+    def _redirect(self, fake, path):
+        params = dict(self.params)
+        noredirect = params.pop('noredirect', 'false') == 'true'
+        location = 'http://{0}{1}{2}?{3}'.format(
+            fake.datanode_host, _PREFIX, quote(path.encode('utf8')),
+            urlencode(sorted((key, value.encode('utf8'))
+                             for key, value in params.items())))
+        if noredirect:
+            self._send_json(http_client.OK, {'Location': location})
+        else:
+            self._send_empty(http_client.TEMPORARY_REDIRECT,
+                             [('Location', location)])
+
+    def _read_chunks(self):
+        """
+        yields the request body, decoding chunked transfer encoding
+        """
+        fake = self.server.fake
+        started = time.time()
+        received = 0
+        for chunk in self._raw_chunks():
+            received += len(chunk)
+            _throttle(fake.bandwidth, started, received)
+            yield chunk
+
+    def _raw_chunks(self):
+        if self.headers.get('Transfer-Encoding', '').lower() == 'chunked':
+            while True:
+                size = int(self.rfile.readline().split(b';')[0].strip(), 16)
+                if not size:
+                    # skip trailers
+                    while self.rfile.readline().strip():
+                        pass
+                    return
+                for chunk in self._read_exactly(size):
+                    yield chunk
+                self.rfile.readline()
+        else:
+            length = int(self.headers.get('Content-Length') or 0)
+            for chunk in self._read_exactly(length):
+                yield chunk
+
+    def _read_exactly(self, length):
+        while length:
+            chunk = self.rfile.read(min(length, _CHUNK_SIZE))
+            if not chunk:
+                raise IOError('Connection closed in the request body')
+            length -= len(chunk)
+            yield chunk
+
+    def _drain(self):
+        if self._drained:
+            return
+        self._drained = True
+        for _ in self._raw_chunks():
+            pass
+
+
+def _address(server):
+    host, port = server.server_address[:2]
+    return '{0}:{1}'.format(host, port)
+
+
+def _text(value):
+    if isinstance(value, bytes):
+        return value.decode('utf8')
+    return value
+
+
+def _throttle(bandwidth, started, nbytes):
+    if bandwidth:
+        delay = started + float(nbytes) / bandwidth - time.time()
+        if delay > 0:
+            time.sleep(delay)
+
+
+def _boolean(params, name, default=False):
+    return params.get(name, 'true' if default else 'false').lower() == 'true'
+
+
+def _not_found(path):
+    return _RemoteException(http_client.NOT_FOUND, 'FileNotFoundException',
+                            'File does not exist: ' + path)
+
+
+def _existing(fake, path, directory=None):
+    local_path = fake.local_path(path)
+    if not os.path.exists(local_path):
+        raise _not_found(path)
+    if directory is not None and os.path.isdir(local_path) != directory:
+        if directory:
+            raise _RemoteException(
+                http_client.FORBIDDEN, 'FileNotFoundException',
+                'Not a directory: ' + path)
+        raise _RemoteException(
+            http_client.NOT_FOUND, 'FileNotFoundException',
+            'Path is not a file: ' + path)
+    return local_path
+
+
+def _file_status(fake, path, local_path, path_suffix=''):
+    stat = os.stat(local_path)
+    is_dir = os.path.isdir(local_path)
+    return {
+        'accessTime': 0 if is_dir else int(stat.st_atime * 1000),
+        'blockSize': 0 if is_dir else fake._block_sizes.get(
+            path, fake.block_size),
+        'childrenNum': len(os.listdir(local_path)) if is_dir else 0,
+        'fileId': stat.st_ino,
+        'group': 'supergroup',
+        'length': 0 if is_dir else stat.st_size,
+        'modificationTime': int(stat.st_mtime * 1000),
+        'owner': fake.user_name,
+        'pathSuffix': path_suffix,
+        'permission': '{0:o}'.format(stat.st_mode & 0o777),
+        'replication': 0 if is_dir else 3,
+        'storagePolicy': 0,
+        'type': 'DIRECTORY' if is_dir else 'FILE',
+    }
+
+
+def _children(fake, path, local_path):
+    if not os.path.isdir(local_path):
+        return [_file_status(fake, path, local_path)]
+    return [_file_status(fake, path.rstrip('/') + '/' + name,
+                         os.path.join(local_path, name), name)
+            for name in sorted(os.listdir(local_path))]
+
+
+def _file_checksum(fake, local_path, block_size):
+    if fake.checksum_combine_mode == COMPOSITE_CRC:
+        checksum = CompositeCrc(fake.checksum_type)
+    else:
+        checksum = MD5MD5CRC32(block_size, crc_type=fake.checksum_type)
+    with open(local_path, 'rb') as data:
+        for chunk in iter(lambda: data.read(_CHUNK_SIZE), b''):
+            checksum.update(chunk)
+    return {'FileChecksum': checksum.file_checksum()}
+
+
+def _get_file_status(handler, fake, path):
+    local_path = _existing(fake, path)
+    handler._send_json(http_client.OK, {
+        'FileStatus': _file_status(fake, path, local_path)})
+
+
+def _list_status(handler, fake, path):
+    local_path = _existing(fake, path)
+    handler._send_json(http_client.OK, {'FileStatuses': {
+        'FileStatus': _children(fake, path, local_path)}})
+
+
+def _list_status_batch(handler, fake, path):
+    local_path = _existing(fake, path)
+    statuses = _children(fake, path, local_path)
+    start_after = handler.params.get('startAfter')
+    if start_after is not None:
+        statuses = [status for status in statuses
+                    if status['pathSuffix'] > start_after]
+    handler._send_json(http_client.OK, {'DirectoryListing': {
+        'partialListing': {
+            'FileStatuses': {'FileStatus': statuses[:fake.list_limit]}},
+        'remainingEntries': max(0, len(statuses) - fake.list_limit)}})
+
+
+def _content_summary(handler, fake, path):
+    local_path = _existing(fake, path)
+    directories = files = length = 0
+    if os.path.isdir(local_path):
+        for dirpath, _, filenames in os.walk(local_path):
+            directories += 1
+            files += len(filenames)
+            length += sum(os.path.getsize(os.path.join(dirpath, name))
+                          for name in filenames)
+    else:
+        files = 1
+        length = os.path.getsize(local_path)
+    handler._send_json(http_client.OK, {'ContentSummary': {
+        'directoryCount': directories, 'fileCount': files,
+        'length': length, 'quota': -1, 'spaceConsumed': length * 3,
+        'spaceQuota': -1}})
+
+
+def _open(handler, fake, path):
+    _existing(fake, path, directory=False)
+    handler._redirect(fake, path)
+
+
+def _create(handler, fake, path):
+    local_path = fake.local_path(path)
+    if os.path.isdir(local_path):
+        raise _RemoteException(
+            http_client.FORBIDDEN, 'FileAlreadyExistsException',
+            '{0} already exists as a directory'.format(path))
+    if os.path.exists(local_path) and \
+            not _boolean(handler.params, 'overwrite'):
+        raise _RemoteException(
+            http_client.FORBIDDEN, 'FileAlreadyExistsException',
+            '{0} for client already exists'.format(path))
+    handler._redirect(fake, path)
+
+
+def _append(handler, fake, path):
+    _existing(fake, path, directory=False)
+    handler._redirect(fake, path)
+
+
+def _make_dirs(handler, fake, path):
+    local_path = fake.local_path(path)
+    if os.path.isfile(local_path):
+        raise _RemoteException(
+            http_client.FORBIDDEN, 'FileAlreadyExistsException',
+            'Path is not a directory: ' + path)
+    if not os.path.isdir(local_path):
+        os.makedirs(local_path)
+    if 'permission' in handler.params:
+        os.chmod(local_path, int(handler.params['permission'], 8))
+    handler._send_json(http_client.OK, {'boolean': True})
+
+
+def _rename(handler, fake, path):
+    local_path = fake.local_path(path)
+    destination = handler.params.get('destination', '')
+    target = fake.local_path(destination)
+    if 'OVERWRITE' in handler.params.get('renameoptions', '').upper():
+        # rename2: the destination is the new path itself, replaced in one
+        # step, and failures are exceptions
+        if not os.path.exists(local_path):
+            raise _not_found(path)
+        if os.path.isdir(target) and os.listdir(target):
+            raise _RemoteException(
+                http_client.FORBIDDEN, 'IOException',
+                'rename destination directory is not empty: ' + destination)
+        if os.path.isdir(target):
+            os.rmdir(target)
+        os.rename(local_path, target)
+        handler._send_empty(http_client.OK)
+        return
+    if os.path.isdir(target):
+        target = os.path.join(target, os.path.basename(local_path))
+    renamed = os.path.exists(local_path) and not os.path.exists(target) \
+        and os.path.isdir(os.path.dirname(target))
+    if renamed:
+        os.rename(local_path, target)
+    handler._send_json(http_client.OK, {'boolean': renamed})
+
+
+def _delete(handler, fake, path):
+    local_path = fake.local_path(path)
+    deleted = os.path.exists(local_path) and local_path != fake.root
+    if deleted and os.path.isdir(local_path):
+        if os.listdir(local_path) and \
+                not _boolean(handler.params, 'recursive'):
+            raise _RemoteException(
+                http_client.FORBIDDEN, 'PathIsNotEmptyDirectoryException',
+                '{0} is non empty'.format(path))
+        shutil.rmtree(local_path)
+    elif deleted:
+        os.remove(local_path)
+    handler._send_json(http_client.OK, {'boolean': deleted})
+
+
+def _concat(handler, fake, path):
+    local_path = _existing(fake, path, directory=False)
+    sources = [source for source in
+               handler.params.get('sources', '').split(',') if source]
+    source_paths = [_existing(fake, source, directory=False)
+                    for source in sources]
+    with open(local_path, 'ab') as target:
+        for source_path in source_paths:
+            with open(source_path, 'rb') as source:
+                shutil.copyfileobj(source, target)
+    for source_path in source_paths:
+        os.remove(source_path)
+    handler._send_empty(http_client.OK)
+
+
+def _get_xattrs(handler, fake, path):
+    _existing(fake, path)
+    with fake._lock:
+        xattrs = dict(fake._xattrs.get(path, {}))
+    name = handler.params.get('xattr.name')
+    if name is not None:
+        if name not in xattrs:
+            raise _RemoteException(
+                http_client.FORBIDDEN, 'IOException',
+                'At least one of the attributes provided was not found.')
+        xattrs = {name: xattrs[name]}
+    handler._send_json(http_client.OK, {'XAttrs': [
+        {'name': name, 'value': value}
+        for name, value in sorted(xattrs.items())]})
+
+
+def _list_xattrs(handler, fake, path):
+    _existing(fake, path)
+    with fake._lock:
+        names = sorted(fake._xattrs.get(path, {}))
+    handler._send_json(http_client.OK, {'XAttrNames': json.dumps(names)})
+
+
+def _set_xattr(handler, fake, path):
+    _existing(fake, path)
+    name = handler.params.get('xattr.name')
+    flag = handler.params.get('flag', 'CREATE').upper()
+    with fake._lock:
+        xattrs = fake._xattrs.setdefault(path, {})
+        if (name in xattrs) != (flag == 'REPLACE'):
+            raise _RemoteException(
+                http_client.FORBIDDEN, 'IOException',
+                'XAttr: {0} {1}'.format(
+                    name, 'already exists' if flag == 'CREATE'
+                    else 'does not exist'))
+        xattrs[name] = handler.params.get('xattr.value')
+    handler._send_json(http_client.OK, {})
+
+
+def _remove_xattr(handler, fake, path):
+    _existing(fake, path)
+    name = handler.params.get('xattr.name')
+    with fake._lock:
+        xattrs = fake._xattrs.get(path, {})
+        if name not in xattrs:
+            raise _RemoteException(
+                http_client.FORBIDDEN, 'IOException',
+                'No matching attributes found for remove operation')
+        del xattrs[name]
+    handler._send_json(http_client.OK, {})
+
+
+def _redirect_checksum(handler, fake, path):
+    _existing(fake, path, directory=False)
+    handler._redirect(fake, path)
+
+
+def _datanode_write(handler, fake, path):
+    local_path = fake.local_path(path)
+    create = handler.params.get('op', '').upper() == operations.CREATE
+    if create:
+        parent = os.path.dirname(local_path)
+        if not os.path.isdir(parent):
+            os.makedirs(parent)
+        with fake._lock:
+            fake._block_sizes[path] = int(
+                handler.params.get('blocksize') or fake.block_size)
+            fake._xattrs.pop(path, None)
+    elif not os.path.isfile(local_path):
+        handler._drain()
+        raise _not_found(path)
+    with open(local_path, 'wb' if create else 'ab') as target:
+        for chunk in handler._read_chunks():
+            target.write(chunk)
+    handler._drained = True
+    if create:
+        if 'permission' in handler.params:
+            os.chmod(local_path, int(handler.params['permission'], 8))
+        handler._send_empty(http_client.CREATED, [
+            ('Location', 'hdfs://{0}{1}'.format(
+                fake.namenode_hosts[fake.active], path))])
+    else:
+        handler._send_empty(http_client.OK)
+
+
+def _datanode_read(handler, fake, path):
+    local_path = _existing(fake, path, directory=False)
+    size = os.path.getsize(local_path)
+    offset = int(handler.params.get('offset') or 0)
+    if offset > size or offset < 0:
+        raise _RemoteException(
+            http_client.FORBIDDEN, 'IOException',
+            'Offset={0} out of the range [0, {1}); OPEN, path={2}'.format(
+                offset, size, path))
+    length = size - offset
+    if handler.params.get('length'):
+        length = min(length, int(handler.params['length']))
+
+    handler.send_response(http_client.OK)
+    handler.send_header('Content-Type', 'application/octet-stream')
+    handler.send_header('Content-Length', str(length))
+    handler.end_headers()
+    started = time.time()
+    sent = 0
+    with open(local_path, 'rb') as source:
+        source.seek(offset)
+        while sent < length:
+            chunk = source.read(min(_CHUNK_SIZE, length - sent))
+            if not chunk:
+                break
+            handler.wfile.write(chunk)
+            sent += len(chunk)
+            _throttle(fake.bandwidth, started, sent)
+
+
+def _datanode_checksum(handler, fake, path):
+    local_path = _existing(fake, path, directory=False)
+    with fake._lock:
+        block_size = fake._block_sizes.get(path, fake.block_size)
+    handler._send_json(http_client.OK,
+                       _file_checksum(fake, local_path, block_size))
+
+
+_NAMENODE_OPERATIONS = {
+    ('GET', operations.OPEN): _open,
+    ('GET', operations.GETFILESTATUS): _get_file_status,
+    ('GET', operations.LISTSTATUS): _list_status,
+    ('GET', operations.LISTSTATUS_BATCH): _list_status_batch,
+    ('GET', operations.GETCONTENTSUMMARY): _content_summary,
+    ('GET', operations.GETFILECHECKSUM): _redirect_checksum,
+    ('GET', operations.GETXATTRS): _get_xattrs,
+    ('GET', operations.LISTXATTRS): _list_xattrs,
+    ('PUT', operations.CREATE): _create,
+    ('PUT', operations.MKDIRS): _make_dirs,
+    ('PUT', operations.RENAME): _rename,
+    ('PUT', operations.SETXATTR): _set_xattr,
+    ('PUT', operations.REMOVEXATTR): _remove_xattr,
+    ('POST', operations.APPEND): _append,
+    ('POST', operations.CONCAT): _concat,
+    ('DELETE', operations.DELETE): _delete,
+}
+
+_DATANODE_OPERATIONS = {
+    ('GET', operations.OPEN): _datanode_read,
+    ('GET', operations.GETFILECHECKSUM): _datanode_checksum,
+    ('PUT', operations.CREATE): _datanode_write,
+    ('POST', operations.APPEND): _datanode_write,
+}
+
+_JAVA_CLASSES = {
+    'FileNotFoundException': 'java.io.FileNotFoundException',
+    'FileAlreadyExistsException':
+        'org.apache.hadoop.fs.FileAlreadyExistsException',
+    'IllegalArgumentException': 'java.lang.IllegalArgumentException',
+    'PathIsNotEmptyDirectoryException':
+        'org.apache.hadoop.fs.PathIsNotEmptyDirectoryException',
+    'RetriableException': 'org.apache.hadoop.ipc.RetriableException',
+    'StandbyException': 'org.apache.hadoop.ipc.StandbyException',
+}
@@ -0,0 +1,90 @@
+import six
+
+try:
+    from urllib.parse import quote, quote_plus
+except ImportError:
+    from urllib import quote, quote_plus
+
+
+class UriBuilder(object):
+    """
+    Builds WebHDFS request uris from parts computed once per client
+
+    A uri is the base uri of a host, cached per host, followed by the
+    request part: the quoted path, the operation, the optional parameters
+    and the authentication parameter, the last two being cached.
+
+    >>> builder = UriBuilder('http://{host}:50070/webhdfs/v1/', 'hdfs')
+    >>> builder.uri('nn1', 'user/hdfs', 'LISTSTATUS', {})
+    'http://nn1:50070/webhdfs/v1/user/hdfs?op=LISTSTATUS&user.name=hdfs'
+    """
+
+    def __init__(self, base_uri_pattern, user_name=None):
+        """
+        :param base_uri_pattern: base uri, with a {host} placeholder for
+          the host
+        :param user_name: WebHDFS user.name used for authentication
+        """
+        self.base_uri_pattern = base_uri_pattern
+        self.auth_param = ''
+        if user_name:
+            self.auth_param = '&user.name={0}'.format(user_name)
+        self._prefixes = {}
+        self._operations = {}
+
+    def prefix(self, host):
+        """
+        returns the base uri of host
+        """
+        prefix = self._prefixes.get(host)
+        if prefix is None:
+            prefix = self._prefixes[host] = \
+                self.base_uri_pattern.format(host=host)
+        return prefix
+
+    def request(self, path, operation, params):
+        """
+        returns the part of the uri of a request that follows the base uri
+        """
+        operation_param = self._operations.get(operation)
+        if operation_param is None:
+            operation_param = self._operations[operation] = \
+                '?op={0}'.format(operation)
+
+        if path.startswith('/'):
+            path = path[1:]
+        parts = [quote_path(path), operation_param]
+        for key, value in params.items():
+            parts.append('&')
+            parts.append(key)
+            parts.append('=')
+            parts.append(encode_param(value))
+        parts.append(self.auth_param)
+        return ''.join(parts)
+
+    def uri(self, host, path, operation, params):
+        """
+        returns the complete uri of a request to host
+        """
+        return self.prefix(host) + self.request(path, operation, params)
+
+
+def quote_path(path):
+    if isinstance(path, six.text_type):
+        path = path.encode('utf8')
+    return quote(path)
+
+
+def encode_param(value):
+    """
+    encode the value of a query parameter: strings are utf8 encoded and
+    quoted, booleans and other values are lowercased the way WebHDFS
+    expects them (true, false, 1024)
+    """
+    if isinstance(value, six.text_type):
+        return quote_plus(value.encode('utf8'))
+    if isinstance(value, six.binary_type):
+        return quote_plus(value)
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    return str(value).lower()
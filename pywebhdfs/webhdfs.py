@@ -1,14 +1,30 @@
+from contextlib import closing
+from concurrent.futures import (FIRST_COMPLETED, ThreadPoolExecutor,
+                                as_completed, wait)
+from functools import partial
 from six.moves import http_client
-import re
-from time import sleep
+from six.moves.urllib.parse import urlparse
+import io
+import os
+import posixpath
+import threading
+import uuid
+from time import sleep, time
 
 import requests
-try:
-    from urllib.parse import quote, quote_plus
-except ImportError:
-    from urllib import quote, quote_plus
+import six
 
-from pywebhdfs import errors, operations
+from pywebhdfs import errors, metrics, operations, sync
+from pywebhdfs.batch import Batch
+from pywebhdfs.cache import LISTING, STATUS, normalize_path
+from pywebhdfs.federation import FederationRouter
+from pywebhdfs.ha import NamenodeState
+from pywebhdfs.pool import HdfsHTTPAdapter
+from pywebhdfs.retry import RetryPolicy
+from pywebhdfs.routing import HEDGED_OPERATIONS, HostLatencyTracker
+from pywebhdfs.status import FileStatus, StatusColumns, get_decoder
+from pywebhdfs.streams import FileSlice, HdfsFileReader, UploadSource
+from pywebhdfs.uri import UriBuilder
 
 
 class PyWebHdfsClient(object):
@@ -23,7 +39,14 @@ class PyWebHdfsClient(object):
     def __init__(self, host='localhost', port='50070', user_name=None,
                  path_to_hosts=None, max_tries=3, timeout=None,
                  base_uri_pattern="http://{host}:{port}/webhdfs/v1/",
-                 request_extra_opts={}):
+                 request_extra_opts={}, upload_chunk_size=1024 * 1024,
+                 upload_replay_size=16 * 1024 * 1024, metadata_cache=None,
+                 pool_connections=10, pool_maxsize=10,
+                 namenode_pool_maxsize=None, pool_block=False,
+                 pool_idle_timeout=None, noredirect=False, hedge=False,
+                 hedge_workers=8, ha_probe_interval=None, retry_policy=None,
+                 json_decoder=None, block_cache=None,
+                 metrics_listeners=None, hedge_primary_workers=32):
         """
         Create a new client for interacting with WebHDFS
 
@@ -36,6 +59,55 @@ class PyWebHdfsClient(object):
         :param base_uri_pattern: format string for base URI
         :param request_extra_opts: dictionary of extra options to pass
           to the requests library (e.g., SSL, HTTP authentication, etc.)
+        :param upload_chunk_size: size of the chunks sent when uploading
+          from file-like objects
+        :param upload_replay_size: number of recently sent bytes kept to
+          resume uploads from non-seekable sources after a datanode failure
+        :param metadata_cache: optional pywebhdfs.cache.MetadataCache used
+          by get_file_dir_status, exists_file_dir and list_dir, and kept up
+          to date by the client's own modifications
+        :param pool_connections: number of hosts for which connections are
+          kept open
+        :param pool_maxsize: number of connections kept open per datanode
+        :param namenode_pool_maxsize: number of connections kept open per
+          namenode, defaults to pool_maxsize
+        :param pool_block: whether to wait for a free connection when all of
+          a host's connections are in use, instead of opening a new one
+          that is discarded after the request
+        :param pool_idle_timeout: number of seconds after which the
+          connections of an unused host are closed, never by default
+        :param noredirect: ask the namenode for the datanode location of
+          CREATE and APPEND calls in a JSON body (noredirect=true, Hadoop
+          2.8+) rather than through a 307 redirect; older namenodes ignore
+          the parameter and keep redirecting
+        :param hedge: for read-only operations, try namenodes in order of
+          their average latency and, when a request takes longer than the
+          usual latency of its host, send a backup request to the next
+          namenode (or again to the same one) and use the first answer
+        :param hedge_workers: number of threads sending backup requests
+        :param hedge_primary_workers: number of threads sending the first
+          request of hedged operations; when they are all busy, further
+          requests are sent on the calling thread without hedging
+        :param ha_probe_interval: number of seconds between background
+          checks of which namenode of each nameservice is active, so that
+          requests go to the active namenode first after a failover; off
+          by default, in which case a failover is noticed when a request
+          gets a StandbyException
+        :param retry_policy: a pywebhdfs.retry.RetryPolicy deciding which
+          failed requests are retried and how long to wait before retrying
+          them, by default up to max_tries times with jittered exponential
+          waits, for connection errors and 503 responses
+        :param json_decoder: how metadata responses are decoded: 'orjson',
+          'ujson', 'json', 'auto' for the fastest of them that is
+          installed, or a function decoding bytes; by default with
+          requests' Response.json
+        :param block_cache: a pywebhdfs.blockcache.BlockCache through which
+          read_file and stream_file read, checking with GETFILESTATUS (or
+          the metadata cache) that cached blocks are still current
+        :param metrics_listeners: functions called with a
+          pywebhdfs.metrics.Event for each namenode request, retry,
+          standby answer and datanode transfer, such as a
+          pywebhdfs.metrics.MetricsAggregator
 
         >>> hdfs = PyWebHdfsClient(host='host',port='50070', user_name='hdfs')
 
@@ -52,14 +124,60 @@ class PyWebHdfsClient(object):
         self.user_name = user_name
         self.max_tries = int(max_tries)
         self.timeout = timeout
+        self.retry_policy = retry_policy
+        if self.retry_policy is None:
+            self.retry_policy = RetryPolicy(max_tries=self.max_tries)
         self.session = requests.Session()
         self.path_to_hosts = path_to_hosts
         if self.path_to_hosts is None:
             self.path_to_hosts = [('.*', [self.host])]
+        self.namenodes = NamenodeState(self.path_to_hosts)
+        self.federation = FederationRouter(
+            [path_regexp for path_regexp, _ in self.path_to_hosts])
+
+        # by port as well, as datanodes often run on namenode machines
+        namenode_uri = base_uri_pattern.format(host='{host}', port=port)
+        namenode_hosts = set(_host_port(host, namenode_uri)
+                             for _, hosts in self.path_to_hosts
+                             for host in hosts)
+        self.adapter = HdfsHTTPAdapter(
+            namenode_hosts=namenode_hosts,
+            namenode_maxsize=namenode_pool_maxsize,
+            idle_timeout=pool_idle_timeout,
+            pool_connections=pool_connections, pool_maxsize=pool_maxsize,
+            pool_block=pool_block)
+        self.session.mount('http://', self.adapter)
+        self.session.mount('https://', self.adapter)
 
         self.base_uri_pattern = base_uri_pattern.format(
             host="{host}", port=port)
+        self._uri_builder = UriBuilder(self.base_uri_pattern, user_name)
+        self._json_loads = None
+        if json_decoder is not None:
+            self._json_loads = get_decoder(json_decoder)
         self.request_extra_opts = request_extra_opts
+        self.upload_chunk_size = upload_chunk_size
+        self.upload_replay_size = upload_replay_size
+        self.metadata_cache = metadata_cache
+        self.block_cache = block_cache
+        self.metrics_listeners = list(metrics_listeners or ())
+        self.noredirect = noredirect
+        self.hedge = hedge
+        self.host_latency = HostLatencyTracker()
+        self._hedge_executor = None
+        self._hedge_primary_executor = None
+        if hedge:
+            self._hedge_executor = ThreadPoolExecutor(
+                max_workers=hedge_workers)
+            # one slot per primary worker, so that primaries never wait in
+            # the queue of the executor
+            self._hedge_primary_executor = ThreadPoolExecutor(
+                max_workers=hedge_primary_workers)
+            self._hedge_primary_slots = threading.BoundedSemaphore(
+                hedge_primary_workers)
+        if ha_probe_interval:
+            self.namenodes.start_probing(self._is_active_namenode,
+                                         ha_probe_interval)
 
     def create_file(self, path, file_data, **kwargs):
         """
@@ -93,46 +211,22 @@ class PyWebHdfsClient(object):
         >>> with open('file.data') as file_data:
         >>>     hdfs.create_file(hdfs_path, data=file_data)
 
+        File like objects and iterators of chunks are streamed with chunked
+        transfer encoding, in chunks of upload_chunk_size bytes for file like
+        objects. If the datanode request fails, seekable files are rewound
+        and sent again, while other sources resume with an APPEND from the
+        length acknowledged by HDFS, as long as it is within the last
+        upload_replay_size bytes sent.
+
+        >>> hdfs.create_file(hdfs_path, (line for line in records))
+
 
         Note: The create_file function does not follows automatic redirects but
         instead uses a two step call to the API as required in the
         WebHDFS documentation
         """
 
-        # make the initial CREATE call to the HDFS namenode
-        optional_args = kwargs
-        tries = 0
-
-        while tries < self.max_tries:
-            init_response = self._resolve_host(self.session.put, False,
-                                               path, operations.CREATE,
-                                               **optional_args)
-            if not init_response.status_code == http_client.TEMPORARY_REDIRECT:
-                _raise_pywebhdfs_exception(
-                    init_response.status_code, init_response.content)
-
-            uri = init_response.headers['location']
-            # Get the address provided in the location header of the
-            # initial response from the namenode and make the CREATE request
-            # to the datanode. If there is a failure here, we should make a new
-            # request to the namenode.
-
-            try:
-                response = self.session.put(
-                    uri, data=file_data,
-                    headers={'content-type': 'application/octet-stream'},
-                    **self.request_extra_opts)
-
-                if not response.status_code == http_client.CREATED:
-                    _raise_pywebhdfs_exception(response.status_code, response.content)
-
-                return True
-            except requests.exceptions.RequestException, e:
-                tries += 1
-                last_error = e
-                sleep(2 ** tries)
-
-        raise last_error
+        return self._upload(path, file_data, operations.CREATE, **kwargs)
 
     def append_file(self, path, file_data, **kwargs):
         """
@@ -160,6 +254,8 @@ class PyWebHdfsClient(object):
 
         >>> hdfs.append_file(my_file, my_data, overwrite=True, buffersize=4096)
 
+        File like objects and iterators are streamed as in create_file.
+
         Note: The append_file function does not follow automatic redirects but
         instead uses a two step call to the API as required in the
         WebHDFS documentation
@@ -167,41 +263,168 @@ class PyWebHdfsClient(object):
         Append is not supported in Hadoop 1.x
         """
 
-        # make the initial APPEND call to the HDFS namenode
-        optional_args = kwargs
-        tries = 0
-
-        while tries < self.max_tries:
-            init_response = self._resolve_host(self.session.post, False,
-                                               path, operations.APPEND,
-                                               **optional_args)
-            if not init_response.status_code == http_client.TEMPORARY_REDIRECT:
-                _raise_pywebhdfs_exception(
-                    init_response.status_code, init_response.content)
-
-            uri = init_response.headers['location']
-
-            # Get the address provided in the location header of the
-            # initial response from the namenode and make the APPEND request
-            # to the datanode. If there is a failure here, we should make a new
-            # request to the namenode.
-            try:
-                response = self.session.post(
-                    uri, data=file_data,
-                    headers={'content-type': 'application/octet-stream'},
-                    **self.request_extra_opts
-                )
+        return self._upload(path, file_data, operations.APPEND, **kwargs)
 
-                if not response.status_code == http_client.OK:
-                    _raise_pywebhdfs_exception(response.status_code, response.content)
+    def create_files(self, files, pipeline=True, **kwargs):
+        """
+        Creates many new files on HDFS, overlapping namenode and datanode
+        calls
 
-                return True
-            except requests.exceptions.RequestException, e:
-                tries += 1
-                last_error = e
-                sleep(2 ** tries)
+        :param files: iterable of (path, file_data) tuples
+        :param pipeline: request the datanode location of the next file
+          from the namenode while the current one is being uploaded
+
+        Every file is written as by create_file with the same optional
+        arguments. With pipelining, the namenode round trip of each file
+        but the first is hidden behind the upload of the previous one,
+        nearly halving the time spent per small file. Files are written in
+        order and the first failure is raised.
+
+        Example:
+
+        >>> hdfs = PyWebHdfsClient(host='host',port='50070', user_name='hdfs',
+        >>>                        noredirect=True)
+        >>> hdfs.create_files(((name, data) for name, data in records),
+        >>>                   overwrite=True)
+        """
+
+        if not pipeline:
+            for path, file_data in files:
+                self.create_file(path, file_data, **kwargs)
+            return True
+
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            files = iter(files)
+            current = next(files, None)
+            next_location = None
+            if current is not None:
+                next_location = executor.submit(
+                    self._datanode_location, current[0], operations.CREATE,
+                    **kwargs)
+
+            while current is not None:
+                location = next_location.result()
+                following = next(files, None)
+                if following is not None:
+                    next_location = executor.submit(
+                        self._datanode_location, following[0],
+                        operations.CREATE, **kwargs)
+                self._upload(current[0], current[1], operations.CREATE,
+                             location=location, **kwargs)
+                current = following
+
+        return True
+
+    def upload_file(self, local_path, path, parallelism=4, part_size=None,
+                    overwrite=False, **kwargs):
+        """
+        Uploads a local file to HDFS by writing several parts concurrently
+        and joining them with CONCAT
+
+        :param local_path: the local file to upload
+        :param path: the HDFS file path
+        :param parallelism: number of parts written concurrently
+        :param part_size: size in bytes of each part, rounded up to a
+          multiple of the block size
+        :param overwrite: replace the HDFS file if it already exists
+
+        Each part is written next to the destination with create_file, with
+        its own retries. The parts are then joined with the WebHDFS REST call:
+
+        POST http://<HOST>:<PORT>/webhdfs/v1/<PATH>?op=CONCAT&sources=<PATHS>
+
+        and the result is renamed into place, atomically replacing an
+        existing file with overwrite. Part files are deleted if any step
+        fails. The remaining arguments are passed to create_file, except for
+        blocksize which defaults to 128MB, as CONCAT requires all but the
+        last part to be made of full blocks.
+
+        Example:
+
+        >>> hdfs = PyWebHdfsClient(host='host',port='50070', user_name='hdfs')
+        >>> my_file = 'user/hdfs/data/myfile.txt'
+        >>> hdfs.upload_file('/tmp/myfile.txt', my_file, parallelism=8)
+        """
+
+        length = os.path.getsize(local_path)
+        block_size = int(kwargs.pop('blocksize', 128 * 1024 * 1024))
+        if part_size is None:
+            part_size = -(-length // max(1, parallelism))
+        # every part but the last must be made of full blocks
+        part_size = max(1, -(-int(part_size) // block_size)) * block_size
+
+        path = '/' + path.lstrip('/')
+        part_prefix = posixpath.join(
+            posixpath.dirname(path), '.{0}.{1}.part'.format(
+                posixpath.basename(path), uuid.uuid4().hex))
+        parts = [(part_prefix + str(i), offset,
+                  min(part_size, length - offset))
+                 for i, offset in enumerate(range(0, length, part_size))]
+        if not parts:
+            parts = [(part_prefix + '0', 0, 0)]
 
-        raise last_error
+        try:
+            with ThreadPoolExecutor(max_workers=max(1, parallelism)) as \
+                    executor:
+                pending = [executor.submit(self._upload_part, local_path,
+                                           part_path, offset, part_length,
+                                           block_size, kwargs)
+                           for part_path, offset, part_length in parts]
+                for future in pending:
+                    future.result()
+
+            target = parts[0][0]
+            if len(parts) > 1:
+                self.concat_files(target, [part[0] for part in parts[1:]])
+
+            # with overwrite, the namenode replaces an existing file in the
+            # same operation, so path is never missing and a failed rename
+            # leaves it as it was
+            renamed = self.rename_file_dir(target, path, overwrite=overwrite)
+            if not renamed.get('boolean', True):
+                raise errors.PyWebHdfsException(
+                    msg="Could not rename {0} to {1}".format(target, path))
+        except Exception:
+            for part_path, _, _ in parts:
+                try:
+                    self.delete_file_dir(part_path)
+                except Exception:
+                    pass
+            raise
+
+        return True
+
+    def concat_files(self, path, sources):
+        """
+        Concatenates existing files on HDFS into a target file, removing the
+        source files
+
+        :param path: the HDFS path of the target file
+        :param sources: list of HDFS paths of the files to append to it,
+          in order
+
+        The function wraps the WebHDFS REST call:
+
+        POST http://<HOST>:<PORT>/webhdfs/v1/<PATH>?op=CONCAT&sources=<PATHS>
+
+        Example:
+
+        >>> hdfs = PyWebHdfsClient(host='host',port='50070', user_name='hdfs')
+        >>> hdfs.concat_files('user/hdfs/data/all.txt',
+        >>>                   ['user/hdfs/data/1.txt', 'user/hdfs/data/2.txt'])
+        """
+
+        sources = ','.join('/' + source.lstrip('/') for source in sources)
+
+        response = self._resolve_host(self.session.post, True,
+                                      path, operations.CONCAT,
+                                      sources=sources)
+        for source in [path] + sources.split(','):
+            self._invalidate_metadata(source)
+        if not response.status_code == http_client.OK:
+            _raise_pywebhdfs_exception(response.status_code, response.content)
+
+        return True
 
     def read_file(self, path, **kwargs):
         """
@@ -230,15 +453,27 @@ class PyWebHdfsClient(object):
 
         optional_args = kwargs
 
+        if self.block_cache is not None:
+            return b''.join(self._read_cached(path, **optional_args))
+
         # The retry logic added to self._resolve_host is enough in this case,
         # as we are following redirects.
-        response = self._resolve_host(self.session.get, True,
-                                      path, operations.OPEN,
+        # streamed, so that a hedged OPEN only waits for the headers of
+        # the datanode response and the losing request sends no data
+        response = self._resolve_host(partial(self.session.get, stream=True),
+                                      True, path, operations.OPEN,
                                       **optional_args)
         if not response.status_code == http_client.OK:
             _raise_pywebhdfs_exception(response.status_code, response.content)
 
-        return response.content
+        started = time()
+        content = response.content
+        if self.metrics_listeners:
+            self._emit(metrics.TRANSFER, operations.OPEN,
+                       host=_response_host(response),
+                       seconds=time() - started, nbytes=len(content),
+                       direction=metrics.RECEIVED)
+        return content
 
     def stream_file(self, path, chunk_size=1024, **kwargs):
         """
@@ -267,15 +502,225 @@ class PyWebHdfsClient(object):
 
         optional_args = kwargs
 
-        response = self._resolve_host(requests.get, True,
-                                      path, operations.OPEN, stream=True,
+        if self.block_cache is not None:
+            for data in self._read_cached(path, **optional_args):
+                for start in range(0, len(data), chunk_size):
+                    yield data[start:start + chunk_size]
+            return
+
+        response = self._resolve_host(partial(self.session.get, stream=True),
+                                      True, path, operations.OPEN,
+                                      **optional_args)
+        if not response.status_code == http_client.OK:
+            _raise_pywebhdfs_exception(response.status_code, response.content)
+
+        started = time()
+        received = 0
+        try:
+            for chunk in response.iter_content(chunk_size):
+                if chunk:
+                    received += len(chunk)
+                    yield chunk
+        finally:
+            if self.metrics_listeners:
+                self._emit(metrics.TRANSFER, operations.OPEN,
+                           host=_response_host(response),
+                           seconds=time() - started, nbytes=received,
+                           direction=metrics.RECEIVED)
+
+    def stream_file_into(self, path, target, chunk_size=1024 * 1024,
+                         **kwargs):
+        """
+        Reads from a file on HDFS into a caller supplied buffer or file
+        object and returns the number of bytes read
+
+        :param path: the HDFS file path
+        :param target: a writable buffer (bytearray, memoryview, ...) or an
+          object with a write method
+        :param chunk_size: maximum number of bytes read from the socket
+          at once
+
+        The function wraps the WebHDFS REST call:
+
+        GET http://<HOST>:<PORT>/webhdfs/v1/<PATH>?op=OPEN
+
+        [&offset=<LONG>][&length=<LONG>][&buffersize=<INT>]
+
+        Data is read from the raw response stream straight into the buffer,
+        or through a single reused chunk_size buffer for file objects, so no
+        intermediate bytes objects are allocated per chunk. When target is a
+        buffer, reading stops once it is full.
+
+        Note: this function follows automatic redirects
+
+        Example:
+
+        >>> hdfs = PyWebHdfsClient(host='host',port='50070', user_name='hdfs')
+        >>> my_file = 'user/hdfs/data/myfile.txt'
+        >>> buf = bytearray(1024)
+        >>> hdfs.stream_file_into(my_file, buf, offset=0, length=1024)
+        1024
+        >>> with open('/tmp/myfile.txt', 'wb') as local_file:
+        >>>     hdfs.stream_file_into(my_file, local_file)
+        """
+
+        optional_args = kwargs
+
+        response = self._resolve_host(partial(self.session.get, stream=True),
+                                      True, path, operations.OPEN,
                                       **optional_args)
         if not response.status_code == http_client.OK:
             _raise_pywebhdfs_exception(response.status_code, response.content)
 
-        for chunk in response.iter_content(chunk_size):
-            if chunk:
-                yield chunk
+        try:
+            return _read_response_into(response, target, chunk_size)
+        finally:
+            response.close()
+
+    def download_file(self, path, local_path, parallelism=4, part_size=None,
+                      chunk_size=1024 * 1024):
+        """
+        Downloads a file from HDFS to the local filesystem using several
+        concurrent ranged reads
+
+        :param path: the HDFS file path
+        :param local_path: the local file to write to
+        :param parallelism: number of ranges fetched concurrently
+        :param part_size: size in bytes of each range, defaults to the
+          HDFS block size of the file
+        :param chunk_size: size of the chunks read from each response
+
+        The length and block size of the file are read with GETFILESTATUS,
+        the file is split into ranges that do not cross block boundaries and
+        each range is fetched with:
+
+        GET http://<HOST>:<PORT>/webhdfs/v1/<PATH>?op=OPEN
+
+        &offset=<LONG>&length=<LONG>
+
+        Each range is written straight into its place in a preallocated
+        local file. A failed range is retried on its own, resuming from the
+        last byte written, without restarting the whole download.
+
+        Example:
+
+        >>> hdfs = PyWebHdfsClient(host='host',port='50070', user_name='hdfs')
+        >>> my_file = 'user/hdfs/data/myfile.txt'
+        >>> hdfs.download_file(my_file, '/tmp/myfile.txt', parallelism=8)
+        """
+
+        status = self.get_file_dir_status(path)['FileStatus']
+        length = status['length']
+        block_size = status.get('blockSize') or length
+        if part_size is None:
+            part_size = block_size
+
+        # preallocate the local file so every range can be written in place
+        with open(local_path, 'wb') as local_file:
+            local_file.truncate(length)
+
+        ranges = _split_ranges(length, int(part_size), block_size)
+        if not ranges:
+            return True
+
+        with ThreadPoolExecutor(max_workers=max(1, parallelism)) as executor:
+            pending = [executor.submit(self._download_range, path, local_path,
+                                       offset, range_length, chunk_size)
+                       for offset, range_length in ranges]
+            for future in pending:
+                future.result()
+
+        return True
+
+    def read_ranges(self, path, ranges, max_gap=64 * 1024,
+                    max_merged_size=8 * 1024 * 1024, max_workers=4):
+        """
+        Reads several ranges of a file on HDFS with as few requests as
+        possible and returns their content as memoryviews
+
+        :param path: the HDFS file path
+        :param ranges: (offset, length) tuples, in any order
+        :param max_gap: ranges separated by at most this many bytes are
+          read with a single request, the bytes between them being
+          discarded
+        :param max_merged_size: ranges are not merged past this size
+        :param max_workers: number of requests sent concurrently
+
+        The ranges are sorted and merged, then each merged range is read
+        with:
+
+        GET http://<HOST>:<PORT>/webhdfs/v1/<PATH>?op=OPEN
+
+        &offset=<LONG>&length=<LONG>
+
+        straight into a buffer, which the memoryviews returned for the
+        requested ranges, in the order they were given, point into without
+        copying. A range that extends past the end of the file is cut
+        short.
+
+        Example:
+
+        >>> hdfs = PyWebHdfsClient(host='host',port='50070', user_name='hdfs')
+        >>> footer, column = hdfs.read_ranges(
+        >>>     'user/hdfs/data.parquet', [(1048000, 576), (4, 65536)])
+        >>> bytes(footer[-4:])
+        b'PAR1'
+        """
+
+        merged = _merge_ranges(ranges, max_gap, max_merged_size)
+        results = [None] * len(ranges)
+
+        def fetch(merged_range):
+            offset, length, members = merged_range
+            buf = bytearray(length)
+            view = memoryview(buf)
+            read = self.stream_file_into(path, view, offset=offset,
+                                         length=length) if length else 0
+            for index, range_offset, range_length in members:
+                start = min(range_offset - offset, read)
+                results[index] = view[start:min(start + range_length, read)]
+
+        if len(merged) == 1:
+            fetch(merged[0])
+            return results
+
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+            for future in [executor.submit(fetch, merged_range)
+                           for merged_range in merged]:
+                future.result()
+
+        return results
+
+    def open_read(self, path, read_ahead=4 * 1024 * 1024):
+        """
+        Opens a file on HDFS for reading and returns a seekable, buffered
+        file-like object
+
+        :param path: the HDFS file path
+        :param read_ahead: the minimum number of bytes fetched by each
+          request to HDFS
+
+        The file length is read with GETFILESTATUS and every read is served
+        by a ranged WebHDFS REST call:
+
+        GET http://<HOST>:<PORT>/webhdfs/v1/<PATH>?op=OPEN
+
+        &offset=<LONG>&length=<LONG>
+
+        Sequential reads are batched into requests of at least read_ahead
+        bytes, while seeking only fetches the bytes around the new position.
+
+        Example:
+
+        >>> hdfs = PyWebHdfsClient(host='host',port='50070', user_name='hdfs')
+        >>> my_file = 'user/hdfs/data/myfile.parquet'
+        >>> with hdfs.open_read(my_file) as f:
+        >>>     f.seek(-8, 2)
+        >>>     footer = f.read(8)
+        """
+
+        return io.BufferedReader(HdfsFileReader(self, path),
+                                 buffer_size=read_ahead)
 
     def make_dir(self, path, **kwargs):
         """
@@ -305,21 +750,26 @@ class PyWebHdfsClient(object):
         response = self._resolve_host(self.session.put, True,
                                       path, operations.MKDIRS,
                                       **optional_args)
+        # missing parent directories are created as well
+        self._invalidate_metadata(path, ancestors=True)
         if not response.status_code == http_client.OK:
             _raise_pywebhdfs_exception(response.status_code, response.content)
 
         return True
 
-    def rename_file_dir(self, path, destination_path):
+    def rename_file_dir(self, path, destination_path, overwrite=False):
         """
         Rename an existing directory or file on HDFS
 
         :param path: the HDFS file path
         :param destination_path: the new file path name
+        :param overwrite: atomically replace destination_path if it exists;
+          a failed rename then raises rather than returning false
 
         The function wraps the WebHDFS REST call:
 
         PUT <HOST>:<PORT>/webhdfs/v1/<PATH>?op=RENAME&destination=<PATH>
+        [&renameoptions=OVERWRITE]
 
         Example:
 
@@ -330,14 +780,23 @@ class PyWebHdfsClient(object):
         """
 
         destination_path = '/' + destination_path.lstrip('/')
+        optional_args = {}
+        if overwrite:
+            optional_args['renameoptions'] = 'OVERWRITE'
 
         response = self._resolve_host(self.session.put, True,
                                       path, operations.RENAME,
-                                      destination=destination_path)
+                                      destination=destination_path,
+                                      **optional_args)
+        self._invalidate_metadata(path, recursive=True)
+        self._invalidate_metadata(destination_path, recursive=True)
         if not response.status_code == http_client.OK:
             _raise_pywebhdfs_exception(response.status_code, response.content)
 
-        return response.json()
+        if overwrite:
+            # a rename with options answers with an empty body
+            return {'boolean': True}
+        return self._json(response)
 
     def delete_file_dir(self, path, recursive=False):
         """
@@ -365,6 +824,7 @@ class PyWebHdfsClient(object):
         response = self._resolve_host(self.session.delete, True,
                                       path, operations.DELETE,
                                       recursive=recursive)
+        self._invalidate_metadata(path, recursive=True)
         if not response.status_code == http_client.OK:
             _raise_pywebhdfs_exception(response.status_code, response.content)
 
@@ -420,12 +880,20 @@ class PyWebHdfsClient(object):
         }
         """
 
+        if self.metadata_cache is not None:
+            status = self.metadata_cache.get(STATUS, path)
+            if status is not None:
+                return status
+
         response = self._resolve_host(self.session.get, True,
                                       path, operations.GETFILESTATUS)
         if not response.status_code == http_client.OK:
             _raise_pywebhdfs_exception(response.status_code, response.content)
 
-        return response.json()
+        status = self._json(response)
+        if self.metadata_cache is not None:
+            self.metadata_cache.put(STATUS, path, status)
+        return status
 
     def get_content_summary(self, path):
         """
@@ -460,7 +928,7 @@ class PyWebHdfsClient(object):
         if not response.status_code == http_client.OK:
             _raise_pywebhdfs_exception(response.status_code, response.content)
 
-        return response.json()
+        return self._json(response)
 
     def get_file_checksum(self, path):
         """
@@ -491,7 +959,7 @@ class PyWebHdfsClient(object):
         if not response.status_code == http_client.OK:
             _raise_pywebhdfs_exception(response.status_code, response.content)
 
-        return response.json()
+        return self._json(response)
 
     def list_dir(self, path):
         """
@@ -541,12 +1009,300 @@ class PyWebHdfsClient(object):
 
         """
 
+        if self.metadata_cache is not None:
+            listing = self.metadata_cache.get(LISTING, path)
+            if listing is not None:
+                return listing
+
         response = self._resolve_host(self.session.get, True,
                                       path, operations.LISTSTATUS)
         if not response.status_code == http_client.OK:
             _raise_pywebhdfs_exception(response.status_code, response.content)
 
-        return response.json()
+        listing = self._json(response)
+        if self.metadata_cache is not None:
+            self.metadata_cache.put(LISTING, path, listing)
+            self._cache_child_statuses(
+                path, listing['FileStatuses']['FileStatus'])
+        return listing
+
+    def iter_dir(self, path, records=False):
+        """
+        Lazily iterate over the file_status of all files and directories
+        inside an HDFS directory, one batch at a time
+
+        :param path: the HDFS file path
+        :param records: yield pywebhdfs.status.FileStatus objects, which
+          take a fraction of the memory of status dicts, instead of dicts
+
+        The function wraps the WebHDFS REST call:
+
+        GET http://<HOST>:<PORT>/webhdfs/v1/<PATH>?op=LISTSTATUS_BATCH
+
+        [&startAfter=<CHILD>]
+
+        Each batch holds up to dfs.ls.limit entries, as configured on the
+        namenode, and the next one is requested only once the previous
+        entries are consumed, so memory stays flat for very large
+        directories. Clusters that do not support LISTSTATUS_BATCH
+        (before Hadoop 2.8) fall back to a single LISTSTATUS call.
+
+        Example for iterating over a directory:
+
+        >>> hdfs = PyWebHdfsClient(host='host',port='50070', user_name='hdfs')
+        >>> for file_status in hdfs.iter_dir('user/hdfs'):
+        >>>     print(file_status['pathSuffix'])
+        example3.txt
+        example2.txt
+        """
+
+        start_after = None
+
+        while True:
+            kwd_params = {}
+            if start_after is not None:
+                kwd_params['startAfter'] = start_after
+
+            response = self._resolve_host(self.session.get, True,
+                                          path, operations.LISTSTATUS_BATCH,
+                                          **kwd_params)
+            if response.status_code == http_client.BAD_REQUEST and \
+                    start_after is None:
+                # the namenode does not know about LISTSTATUS_BATCH
+                listing = self.list_dir(path)
+                for file_status in listing['FileStatuses']['FileStatus']:
+                    if records:
+                        file_status = FileStatus.from_json(file_status)
+                    yield file_status
+                return
+            if not response.status_code == http_client.OK:
+                _raise_pywebhdfs_exception(response.status_code,
+                                           response.content)
+
+            listing = self._json(response)['DirectoryListing']
+            file_statuses = \
+                listing['partialListing']['FileStatuses']['FileStatus']
+            if self.metadata_cache is not None:
+                self._cache_child_statuses(path, file_statuses)
+
+            if not listing['remainingEntries'] or not file_statuses:
+                start_after = None
+            else:
+                start_after = file_statuses[-1]['pathSuffix']
+
+            if records:
+                # let the batch of dicts go before handing out records
+                file_statuses = [FileStatus.from_json(file_status)
+                                 for file_status in file_statuses]
+                del listing
+
+            for file_status in file_statuses:
+                yield file_status
+
+            if start_after is None:
+                return
+
+    def list_dir_columns(self, path):
+        """
+        Get the names, lengths, modification times and types of all files
+        and directories inside an HDFS directory, as columns
+
+        :param path: the HDFS file path
+
+        Returns a pywebhdfs.status.StatusColumns, holding names in a list
+        and the other fields in typed arrays. Statuses are fetched in
+        batches as for iter_dir, so the whole listing never exists as
+        dicts, which keeps memory low for directories with millions of
+        entries.
+
+        Example for finding the largest files of a directory:
+
+        >>> hdfs = PyWebHdfsClient(host='host',port='50070', user_name='hdfs')
+        >>> columns = hdfs.list_dir_columns('user/hdfs/logs')
+        >>> sorted(zip(columns.lengths, columns.names))[-10:]
+        """
+
+        columns = StatusColumns()
+        for file_status in self.iter_dir(path):
+            columns.append(file_status)
+        return columns
+
+    def walk(self, path, max_workers=8, max_depth=None, onerror=None):
+        """
+        Recursively walk a directory tree on HDFS, listing several
+        directories concurrently
+
+        :param path: the HDFS path of the top directory
+        :param max_workers: number of directories listed concurrently
+        :param max_depth: how many levels below path to descend into,
+          unlimited by default
+        :param onerror: function called with the exception raised when a
+          directory can not be listed, after which the walk goes on without
+          it; by default the exception is raised
+
+        Yields a (dirpath, dirs, files) tuple for every directory, where
+        dirs and files are lists of file_status dictionaries as returned
+        by iter_dir. Tuples are yielded as soon as each listing completes,
+        so the order is not deterministic. As with os.walk, removing
+        entries from dirs prevents descending into them. Directories below
+        path that are deleted during the walk are skipped.
+
+        At most 2 * max_workers listings are in flight at any time. The
+        subdirectories of a finished listing are not queued: they are taken
+        one at a time from its dirs as workers free up, depth first, so the
+        memory used besides the listings themselves does not depend on how
+        many subdirectories a directory has.
+
+        Example:
+
+        >>> hdfs = PyWebHdfsClient(host='host',port='50070', user_name='hdfs')
+        >>> for dirpath, dirs, files in hdfs.walk('user/hdfs', max_workers=16):
+        >>>     print(dirpath, len(files))
+        """
+
+        # iterators over the subdirectories left to list, the most recent
+        # listing last, so that the walk goes depth first
+        pending = [iter([(normalize_path(path), 0)])]
+        running = {}
+        executor = ThreadPoolExecutor(max_workers=max(1, max_workers))
+
+        try:
+            while pending or running:
+                while pending and len(running) < 2 * max_workers:
+                    try:
+                        dirpath, depth = next(pending[-1])
+                    except StopIteration:
+                        pending.pop()
+                        continue
+                    future = executor.submit(
+                        lambda dirpath: list(self.iter_dir(dirpath)), dirpath)
+                    running[future] = (dirpath, depth)
+
+                done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+                for future in done:
+                    dirpath, depth = running.pop(future)
+                    try:
+                        listing = future.result()
+                    except Exception as e:
+                        if depth and isinstance(e, errors.FileNotFound):
+                            # deleted since its parent was listed
+                            continue
+                        if onerror is None:
+                            raise
+                        onerror(e)
+                        continue
+
+                    dirs = []
+                    files = []
+                    for file_status in listing:
+                        if file_status['type'] == 'DIRECTORY':
+                            dirs.append(file_status)
+                        else:
+                            files.append(file_status)
+
+                    yield dirpath, dirs, files
+
+                    if max_depth is None or depth < max_depth:
+                        pending.append(_subdirectories(dirpath, dirs,
+                                                       depth + 1))
+        finally:
+            for future in running:
+                future.cancel()
+            executor.shutdown(wait=False)
+
+    def find(self, path, predicate=None, max_workers=8, max_depth=None,
+             onerror=None):
+        """
+        Recursively search a directory tree on HDFS
+
+        :param path: the HDFS path of the top directory
+        :param predicate: function called with the full path and
+          file_status of every entry, only matching entries are yielded
+        :param max_workers: number of directories listed concurrently
+        :param max_depth: how many levels below path to descend into
+        :param onerror: function called with listing errors, see walk
+
+        Yields (path, file_status) tuples, using walk to traverse the tree.
+
+        Example:
+
+        >>> hdfs = PyWebHdfsClient(host='host',port='50070', user_name='hdfs')
+        >>> for path, file_status in hdfs.find(
+        >>>         'user/hdfs', lambda p, s: p.endswith('.parquet')):
+        >>>     print(path, file_status['length'])
+        """
+
+        for dirpath, dirs, files in self.walk(path, max_workers, max_depth,
+                                              onerror):
+            for file_status in dirs + files:
+                entry_path = posixpath.join(dirpath, file_status['pathSuffix'])
+                if predicate is None or predicate(entry_path, file_status):
+                    yield entry_path, file_status
+
+    def du(self, path, max_workers=8, onerror=None):
+        """
+        Compute the disk usage of a directory tree on HDFS on the client
+
+        :param path: the HDFS path of the top directory
+        :param max_workers: number of directories listed concurrently
+        :param onerror: function called with listing errors, see walk
+
+        Walks the tree and only keeps running totals, so memory use does not
+        depend on its size. Unlike get_content_summary, the work is spread
+        over many cheap listing calls instead of one long namenode call.
+
+        Example:
+
+        >>> hdfs = PyWebHdfsClient(host='host',port='50070', user_name='hdfs')
+        >>> hdfs.du('user/hdfs')
+        {
+            "directoryCount": 2,
+            "fileCount": 1,
+            "length": 24930
+        }
+        """
+
+        usage = {'directoryCount': 0, 'fileCount': 0, 'length': 0}
+        for _, dirs, files in self.walk(path, max_workers,
+                                        onerror=onerror):
+            usage['directoryCount'] += 1
+            usage['fileCount'] += len(files)
+            usage['length'] += sum(f['length'] for f in files)
+
+        return usage
+
+    def sync(self, local_dir, hdfs_dir, direction=sync.UPLOAD, delete=False,
+             checksum=False, max_workers=8, dry_run=False):
+        """
+        Mirror a local directory tree to HDFS, or an HDFS tree to the local
+        filesystem, only transferring the files that changed
+
+        :param local_dir: the local directory
+        :param hdfs_dir: the HDFS directory
+        :param direction: pywebhdfs.sync.UPLOAD ('upload') or
+          pywebhdfs.sync.DOWNLOAD ('download')
+        :param delete: remove destination files missing from the source
+        :param checksum: compare files of equal size with
+          get_file_checksum and a checksum computed locally, instead of
+          modification times
+        :param max_workers: number of files compared or copied concurrently
+        :param dry_run: only report what would be done
+
+        Both trees are listed concurrently, files are compared by size then
+        modification time or checksum, and the ones that differ are copied
+        with create_file or stream_file_into. See pywebhdfs.sync.sync.
+
+        Example:
+
+        >>> hdfs = PyWebHdfsClient(host='host',port='50070', user_name='hdfs')
+        >>> result = hdfs.sync('/data/exports', 'user/hdfs/exports',
+        >>>                    delete=True)
+        >>> result.copied
+        ['2016-01-02/part-00000']
+        """
+
+        return sync.sync(self, local_dir, hdfs_dir, direction, delete,
+                         checksum, max_workers, dry_run)
 
     def exists_file_dir(self, path):
         """
@@ -567,9 +1323,15 @@ class PyWebHdfsClient(object):
         >>> hdfs.exists_file_dir(my_file)
         True
         """
+        if self.metadata_cache is not None and \
+                self.metadata_cache.get(STATUS, path) is not None:
+            return True
+
         response = self._resolve_host(self.session.get, True,
                                       path, operations.GETFILESTATUS)
         if response.status_code == http_client.OK:
+            if self.metadata_cache is not None:
+                self.metadata_cache.put(STATUS, path, self._json(response))
             return True
         elif response.status_code == http_client.NOT_FOUND:
             return False
@@ -611,7 +1373,7 @@ class PyWebHdfsClient(object):
 
         if not response.status_code == http_client.OK:
             _raise_pywebhdfs_exception(response.status_code, response.content)
-        return response.json()
+        return self._json(response)
 
     def set_xattr(self, path, xattr, value, replace=False):
         """
@@ -645,6 +1407,7 @@ class PyWebHdfsClient(object):
         response = self._resolve_host(self.session.put, True,
                                       path, operations.SETXATTR,
                                       **kwd_params)
+        self._invalidate_metadata(path)
 
         if not response.status_code == http_client.OK:
             _raise_pywebhdfs_exception(response.status_code, response.content)
@@ -673,7 +1436,7 @@ class PyWebHdfsClient(object):
 
         if not response.status_code == http_client.OK:
             _raise_pywebhdfs_exception(response.status_code, response.content)
-        return response.json()
+        return self._json(response)
 
     def delete_xattr(self, path, xattr):
         """
@@ -700,56 +1463,368 @@ class PyWebHdfsClient(object):
         response = self._resolve_host(self.session.put, True,
                                       path, operations.REMOVEXATTR,
                                       **kwd_params)
+        self._invalidate_metadata(path)
 
         if not response.status_code == http_client.OK:
             _raise_pywebhdfs_exception(response.status_code, response.content)
         return True
 
-    def _create_uri(self, path, operation, **kwargs):
+    def pool_stats(self):
         """
-        internal function used to construct the WebHDFS request uri based on
-        the <PATH>, <OPERATION>, and any provided optional arguments
+        Get statistics on the connection pools of the client
+
+        Returns, for namenode and datanode hosts, the number of open pools,
+        of connections opened, of requests made and of requests that reused
+        an open connection.
+
+        Example:
+
+        >>> hdfs = PyWebHdfsClient(host='host',port='50070', user_name='hdfs')
+        >>> hdfs.pool_stats()
+        {
+            "namenode": {"pools": 1, "connections": 2, "requests": 120,
+                         "reused": 118},
+            "datanode": {"pools": 12, "connections": 40, "requests": 60,
+                         "reused": 20}
+        }
+        """
+
+        return self.adapter.stats()
+
+    def batch(self):
+        """
+        Start a batch of metadata operations to run concurrently
+
+        Returns a pywebhdfs.batch.Batch, whose chainable methods queue
+        operations and whose execute method runs them on a thread pool,
+        returning a result or exception for each of them.
+
+        Example:
+
+        >>> hdfs = PyWebHdfsClient(host='host',port='50070', user_name='hdfs')
+        >>> batch = hdfs.batch()
+        >>> for partition in expired_partitions:
+        >>>     batch.delete(partition, recursive=True)
+        >>> results = batch.execute(max_workers=16, max_rate=200)
+        """
+
+        return Batch(self)
+
+    def close(self):
+        """
+        Stop the background namenode checks and hedging threads of the
+        client and close its connections
         """
 
-        no_root_path = (path[1:] if path[0] == '/' else path)
-        path_param = quote(no_root_path.encode('utf8'))
+        self.namenodes.stop_probing()
+        if self._hedge_executor is not None:
+            self._hedge_executor.shutdown(wait=False)
+            self._hedge_primary_executor.shutdown(wait=False)
+        self.session.close()
 
-        # setup the parameter represent the WebHDFS operation
-        operation_param = '?op={operation}'.format(operation=operation)
+    def _upload(self, path, file_data, operation, location=None, **kwargs):
+        """
+        internal function used to CREATE or APPEND to a file with the two
+        step namenode/datanode calls, retrying datanode failures. A datanode
+        location already obtained from the namenode can be given for the
+        first attempt.
+        """
+        try:
+            return self._upload_source(path, file_data, operation, location,
+                                       **kwargs)
+        finally:
+            # CREATE makes missing parent directories as well
+            self._invalidate_metadata(
+                path, ancestors=operation == operations.CREATE)
+
+    def _upload_source(self, path, file_data, operation, location,
+                       **kwargs):
+        """
+        internal function implementing _upload
+        """
+        source = UploadSource(file_data, self.upload_chunk_size,
+                              self.upload_replay_size)
 
-        # configure authorization based on provided credentials
-        auth_param = str()
-        if self.user_name:
-            auth_param = '&user.name={user_name}'.format(
-                user_name=self.user_name)
+        # without a way to rewind the data, the length of the file before
+        # appending is needed to know how much of it HDFS acknowledged
+        base_length = 0
+        if operation == operations.APPEND and not source.rewindable:
+            base_length = self._file_length(path) or 0
 
-        # setup any optional parameters
-        keyword_params = str()
-        for key in kwargs:
+        optional_args = kwargs
+        attempts = self.retry_policy.begin()
+
+        while True:
+            if operation == operations.CREATE:
+                req_func = self.session.put
+                expected_status = http_client.CREATED
+            else:
+                req_func = self.session.post
+                expected_status = http_client.OK
+
+            # Get the datanode address from the namenode and make the
+            # request to the datanode. If there is a failure here, we should
+            # make a new request to the namenode.
+            uri = location or self._datanode_location(path, operation,
+                                                      **optional_args)
+            location = None
+
+            body = source.body()
+            counter = None
+            if self.metrics_listeners:
+                body, counter = _count_body(body)
+                started = time()
             try:
-                value = quote_plus(kwargs[key].encode('utf8'))
-            except:
-                value = str(kwargs[key]).lower()
-            keyword_params = '{params}&{key}={value}'.format(
-                params=keyword_params, key=key, value=value)
+                response = req_func(
+                    uri, data=body,
+                    headers={'content-type': 'application/octet-stream'},
+                    **self.request_extra_opts)
+            except requests.exceptions.RequestException as e:
+                if counter is not None:
+                    self._emit_upload(operation, uri, started, counter,
+                                      error=e)
+                if not self.retry_policy.is_retryable(e):
+                    raise
+                last_error = e
+            else:
+                if counter is not None:
+                    self._emit_upload(operation, uri, started, counter,
+                                      status=response.status_code)
+                if response.status_code == expected_status:
+                    return True
+                if not self.retry_policy.is_retryable_status(
+                        response.status_code):
+                    _raise_pywebhdfs_exception(response.status_code,
+                                               response.content)
+                last_error = _pywebhdfs_exception(response.status_code,
+                                                  response.content)
+
+            delay = attempts.backoff()
+            if delay is None:
+                raise last_error
+            if self.metrics_listeners:
+                self._emit(metrics.RETRY, operation, seconds=delay,
+                           attempt=attempts.tries, error=last_error)
+            sleep(delay)
+
+            if source.rewindable:
+                continue
+
+            length = self._file_length(path)
+            acknowledged = 0 if length is None else length - base_length
+            if not source.resume(acknowledged):
+                raise last_error
+            if length is not None and operation == operations.CREATE:
+                # part of the data made it to HDFS, keep appending to it
+                operation = operations.APPEND
+                optional_args = dict(
+                    (key, value) for key, value in kwargs.items()
+                    if key == 'buffersize')
+
+    def _json(self, response):
+        """
+        internal function used to decode the JSON body of a response
+        """
+        if self._json_loads is None:
+            return response.json()
+        return self._json_loads(response.content)
+
+    def _datanode_location(self, path, operation, **kwargs):
+        """
+        internal function used to make the initial CREATE or APPEND call to
+        the HDFS namenode and return the datanode location it answers with
+        """
+        req_func = self.session.put
+        if operation == operations.APPEND:
+            req_func = self.session.post
+        if self.noredirect:
+            kwargs['noredirect'] = True
+
+        init_response = self._resolve_host(req_func, False,
+                                           path, operation, **kwargs)
+        if init_response.status_code == http_client.TEMPORARY_REDIRECT:
+            return init_response.headers['location']
+        if self.noredirect and init_response.status_code == http_client.OK:
+            return init_response.json()['Location']
+
+        _raise_pywebhdfs_exception(
+            init_response.status_code, init_response.content)
+
+    def _upload_part(self, local_path, path, offset, length, block_size,
+                     optional_args):
+        """
+        internal function used to write one part of a local file to HDFS
+        """
+        with FileSlice(local_path, offset, length) as part:
+            return self.create_file(path, part, overwrite=True,
+                                    blocksize=block_size, **optional_args)
+
+    def _file_length(self, path):
+        """
+        internal function used to get the length of a file, or None if it
+        does not exist
+        """
+        self._invalidate_metadata(path)
+        try:
+            return self.get_file_dir_status(path)['FileStatus']['length']
+        except errors.FileNotFound:
+            return None
+
+    def _invalidate_metadata(self, path, recursive=False, ancestors=False):
+        """
+        internal function used to drop cached metadata for a path that is
+        being modified, along with the listing of its parent, or of every
+        ancestor when the operation may create them
+        """
+        if self.metadata_cache is None:
+            return
+        path = normalize_path(path)
+        self.metadata_cache.invalidate(path, recursive=recursive)
+        parent = posixpath.dirname(path)
+        self.metadata_cache.invalidate(parent)
+        while ancestors and parent != '/':
+            parent = posixpath.dirname(parent)
+            self.metadata_cache.invalidate(parent)
+
+    def _cache_child_statuses(self, path, file_statuses):
+        """
+        internal function used to seed the metadata cache with the status
+        of every entry of a directory listing
+        """
+        for file_status in file_statuses:
+            child_status = dict(file_status, pathSuffix='')
+            child_path = posixpath.join(normalize_path(path),
+                                        file_status['pathSuffix'])
+            self.metadata_cache.put(STATUS, child_path,
+                                    {'FileStatus': child_status})
+
+    def _download_range(self, path, local_path, offset, length, chunk_size):
+        """
+        internal function used to fetch one range of a file into its place
+        in a local file, retrying from the last written byte on failure
+        """
+        written = 0
+        attempts = self.retry_policy.begin()
 
-        base_uri = self.base_uri_pattern.format(host="{host}")
+        with open(local_path, 'r+b') as local_file:
+            while written < length:
+                local_file.seek(offset + written)
+                try:
+                    response = self._resolve_host(
+                        partial(self.session.get, stream=True), True,
+                        path, operations.OPEN, offset=offset + written,
+                        length=length - written)
+                    if not response.status_code == http_client.OK:
+                        _raise_pywebhdfs_exception(response.status_code,
+                                                   response.content)
+
+                    for chunk in response.iter_content(chunk_size):
+                        local_file.write(chunk)
+                        written += len(chunk)
+                    if written >= length:
+                        break
+                    last_error = errors.PyWebHdfsException(
+                        msg="Incomplete read of /{0} at offset {1}".format(
+                            path.lstrip('/'), offset + written))
+                except requests.exceptions.RequestException as e:
+                    if not self.retry_policy.is_retryable(e):
+                        raise
+                    last_error = e
+
+                delay = attempts.backoff()
+                if delay is None:
+                    raise last_error
+                sleep(delay)
+
+        return written
+
+    def _read_cached(self, path, offset=0, length=None, **kwargs):
+        """
+        internal function used to read a range of a file through the block
+        cache, yielding the bytes of the range one block at a time. Runs of
+        blocks missing from the cache are fetched with a single request.
+        """
+        cache = self.block_cache
+        block_size = cache.block_size
+        status = self.get_file_dir_status(path)['FileStatus']
+        file_length = status['length']
+        modification_time = status['modificationTime']
+
+        offset = int(offset)
+        end = file_length
+        if length is not None:
+            end = min(end, offset + int(length))
+        if offset >= end:
+            return
+
+        def key(block):
+            return cache.key(path, modification_time, file_length, block)
+
+        block = offset // block_size
+        last = (end - 1) // block_size
+        while block <= last:
+            cached = cache.get(key(block))
+            if cached is not None:
+                with closing(cached):
+                    data = cached[max(0, offset - block * block_size):
+                                  end - block * block_size]
+                cache.record_saved(len(data))
+                yield data
+                block += 1
+                continue
+
+            run_end = block + 1
+            while run_end <= last and key(run_end) not in cache:
+                run_end += 1
+            fetch_offset = block * block_size
+            fetch_end = min(run_end * block_size, file_length)
+            response = self._resolve_host(
+                partial(self.session.get, stream=True), True, path,
+                operations.OPEN, offset=fetch_offset,
+                length=fetch_end - fetch_offset, **kwargs)
+            try:
+                if not response.status_code == http_client.OK:
+                    _raise_pywebhdfs_exception(response.status_code,
+                                               response.content)
+                for block_offset in range(fetch_offset, fetch_end,
+                                          block_size):
+                    data = bytearray(min(block_size,
+                                         file_length - block_offset))
+                    read = _read_response_into(response, data, 1024 * 1024)
+                    if read < len(data):
+                        raise errors.PyWebHdfsException(
+                            msg="Incomplete read of /{0} at offset {1}"
+                            .format(path.lstrip('/'), block_offset + read))
+                    cache.put(key(block), data)
+                    yield bytes(data[max(0, offset - block_offset):
+                                     end - block_offset])
+                    block += 1
+            finally:
+                response.close()
 
-        # build the complete uri from the base uri and all configured params
-        uri = '{base_uri}{path}{operation}{keyword_args}{auth}'.format(
-            base_uri=base_uri, path=path_param,
-            operation=operation_param, keyword_args=keyword_params,
-            auth=auth_param)
+    def _create_uri(self, path, operation, **kwargs):
+        """
+        internal function used to construct the WebHDFS request uri based on
+        the <PATH>, <OPERATION>, and any provided optional arguments
+        """
 
-        return uri
+        return self.base_uri_pattern + \
+            self._uri_builder.request(path, operation, kwargs)
 
     def _resolve_federation(self, path):
         """
         internal function used to resolve federation
         """
-        for path_regexp, hosts in self.path_to_hosts:
-            if re.match(path_regexp, path):
-                return hosts
+        return self.namenodes.hosts(self._resolve_nameservice(path))
+
+    def _resolve_nameservice(self, path):
+        """
+        internal function returning the index in path_to_hosts of the
+        nameservice serving path
+        """
+        nameservice = self.federation.resolve(path)
+        if nameservice is not None:
+            return nameservice
         raise errors.CorrespondHostsNotFound(
             msg="Could not find hosts corresponds to /{0}".format(path))
 
@@ -759,47 +1834,405 @@ class PyWebHdfsClient(object):
         internal function used to resolve federation and HA and
         return response of resolved host.
         """
-        uri_without_host = self._create_uri(path, operation, **kwargs)
-        hosts = self._resolve_federation(path)
-
+        request_uri = self._uri_builder.request(path, operation, kwargs)
+        nameservice = self._resolve_nameservice(path)
+        hosts = self.namenodes.hosts(nameservice)
+
+        if self.hedge and operation in HEDGED_OPERATIONS:
+            response = self._hedged_request(req_func, allow_redirect,
+                                            request_uri, operation,
+                                            nameservice)
+            if response is not None:
+                return response
+
+        policy = self.retry_policy
+        attempts = policy.begin()
+        last_error = None
+        failed_response = None
+        tried = False
         for host in hosts:
-            tries = 0
-            uri = uri_without_host.format(host=host)
-            while tries < self.max_tries:
+            if attempts.expired():
+                break
+            if not policy.allow(host):
+                continue
+            tried = True
+            attempts.restart()
+            uri = self._uri_builder.prefix(host) + request_uri
+            while True:
                 try:
                     # When allow_redirects is True, control flow doesn't leave
                     # this branch, so a failure will mean a new request to the
                     # namenode, as required.
+                    started = time()
                     response = req_func(uri, allow_redirects=allow_redirect,
                                         timeout=self.timeout,
                                         **self.request_extra_opts)
+                except requests.exceptions.RequestException as e:
+                    if self.metrics_listeners:
+                        self._emit(metrics.REQUEST, operation, host=host,
+                                   seconds=time() - started,
+                                   attempt=attempts.tries + 1, error=e)
+                    if not policy.is_retryable(e):
+                        raise
+                    policy.record_failure(host)
+                    last_error = e
+                else:
+                    elapsed = time() - started
+                    if self.metrics_listeners:
+                        self._emit_response(operation, host, elapsed,
+                                            response, attempts.tries + 1)
                     last_error = None
-                    if not _is_standby_exception(response):
-                        _move_active_host_to_head(hosts, host)
+                    if _is_standby_exception(response):
+                        # a standby namenode will not answer differently if
+                        # asked again, move on to the next host
+                        if self.metrics_listeners:
+                            self._emit(metrics.STANDBY, operation, host=host)
+                        policy.record_success(host)
+                        self.host_latency.record_standby(host)
+                        break
+                    if not policy.is_retryable_status(response.status_code):
+                        policy.record_success(host)
+                        self.host_latency.record(host, operation, elapsed)
+                        self.namenodes.mark_active(nameservice, host)
+                        _close_failed_response(failed_response)
                         return response
-                except requests.exceptions.RequestException, e:
-                    last_error = e
-                    tries += 1
-                    sleep(2 ** tries)
+                    policy.record_failure(host)
+                    _close_failed_response(failed_response)
+                    failed_response = response
+
+                delay = attempts.backoff()
+                if delay is None:
+                    break
+                if self.metrics_listeners:
+                    self._emit(metrics.RETRY, operation, host=host,
+                               seconds=delay, attempt=attempts.tries,
+                               error=last_error)
+                sleep(delay)
 
         if last_error:
             raise last_error
 
+        if failed_response is not None:
+            # let the caller raise the error matching its status code
+            return failed_response
+
+        if not tried:
+            raise errors.ActiveHostNotFound(
+                msg="Could not find active host, the circuit breaker of "
+                    "every host is open")
+
         raise errors.ActiveHostNotFound(msg="Could not find active host")
 
+    def _hedged_request(self, req_func, allow_redirect, request_uri,
+                        operation, nameservice):
+        """
+        internal function used to send a read-only request to the fastest
+        host, and a backup request to the next one if it is slow. Returns
+        None if neither request succeeded, or if every primary worker is
+        busy, so that the caller can fall back to trying every host in turn.
+        """
+        if not self._hedge_primary_slots.acquire(False):
+            return None
+
+        ordered_hosts = self.host_latency.order(
+            self.namenodes.hosts(nameservice))
+        primary = ordered_hosts[0]
+        backup = ordered_hosts[1] if len(ordered_hosts) > 1 else primary
+
+        def send(host):
+            started = time()
+            try:
+                response = req_func(
+                    self._uri_builder.prefix(host) + request_uri,
+                    allow_redirects=allow_redirect, timeout=self.timeout,
+                    **self.request_extra_opts)
+            except requests.exceptions.RequestException as e:
+                if self.metrics_listeners:
+                    self._emit(metrics.REQUEST, operation, host=host,
+                               seconds=time() - started, attempt=1, error=e)
+                raise
+            elapsed = time() - started
+            if self.metrics_listeners:
+                self._emit_response(operation, host, elapsed, response, 1)
+            if _is_standby_exception(response):
+                if self.metrics_listeners:
+                    self._emit(metrics.STANDBY, operation, host=host)
+                self.host_latency.record_standby(host)
+                response.close()
+                return host, None
+            self.host_latency.record(host, operation, elapsed)
+            return host, response
+
+        def send_backup(primary_future):
+            if primary_future.done() and primary_future.exception() is None \
+                    and primary_future.result()[1] is not None:
+                # the primary answered while the backup was queued
+                return backup, None
+            return send(backup)
+
+        def send_primary():
+            try:
+                return send(primary)
+            finally:
+                self._hedge_primary_slots.release()
+
+        # primaries have their own executor, with a free worker for each
+        # slot, so that they never wait behind backups and the calling
+        # thread stays free to return whichever response comes first
+        primary_future = self._hedge_primary_executor.submit(send_primary)
+
+        pending = {primary_future: False}
+        done, _ = wait(list(pending),
+                       timeout=self.host_latency.hedge_delay(primary,
+                                                             operation))
+        if not done:
+            pending[self._hedge_executor.submit(
+                send_backup, primary_future)] = True
+            self.host_latency.record_hedge()
+
+        response = None
+        for future in as_completed(list(pending)):
+            try:
+                host, response = future.result()
+            except requests.exceptions.RequestException:
+                continue
+            if response is None:
+                continue
+            if pending[future]:
+                self.host_latency.record_hedge_won()
+            for other in pending:
+                if other is not future:
+                    other.add_done_callback(_close_response)
+            self.namenodes.mark_active(nameservice, host)
+            return response
+
+        return None
+
+    def _emit(self, kind, operation, **fields):
+        """
+        internal function used to pass an event to the metrics listeners
+        """
+        event = metrics.Event(kind, operation, **fields)
+        for listener in self.metrics_listeners:
+            try:
+                listener(event)
+            except Exception:
+                # a broken listener must not fail requests
+                pass
+
+    def _emit_response(self, operation, host, seconds, response, attempt):
+        """
+        internal function used to report a response to a namenode request,
+        separating the namenode request from the datanode request when a
+        redirect was followed
+        """
+        history = response.history
+        if not isinstance(history, list) or not history:
+            self._emit(metrics.REQUEST, operation, host=host, seconds=seconds,
+                       status=response.status_code, attempt=attempt)
+            return
+        self._emit(metrics.REQUEST, operation, host=host,
+                   seconds=history[0].elapsed.total_seconds(),
+                   status=history[0].status_code, attempt=attempt)
+        self._emit(metrics.DATANODE, operation,
+                   host=_response_host(response),
+                   seconds=response.elapsed.total_seconds(),
+                   status=response.status_code, attempt=attempt)
+
+    def _emit_upload(self, operation, uri, started, counter, **fields):
+        """
+        internal function used to report a datanode upload
+        """
+        self._emit(metrics.TRANSFER, operation, host=urlparse(uri).netloc,
+                   seconds=time() - started, nbytes=counter[0],
+                   direction=metrics.SENT, **fields)
+
+    def _is_active_namenode(self, host):
+        """
+        internal function used to check whether host is an active namenode,
+        with a GETFILESTATUS of the root directory
+        """
+        uri = self._uri_builder.uri(host, '/', operations.GETFILESTATUS, {})
+        response = self.session.get(uri,
+                                    timeout=self.timeout,
+                                    **self.request_extra_opts)
+        try:
+            return not _is_standby_exception(response)
+        finally:
+            response.close()
+
+
+def _count_body(body):
+    """
+    returns a request body sending the same data as body, and a list whose
+    first item counts the bytes of it that were sent
+    """
+    if isinstance(body, six.text_type):
+        return body, [len(body.encode('utf8'))]
+    if isinstance(body, (six.binary_type, bytearray)):
+        return body, [len(body)]
+
+    counter = [0]
+
+    def counted():
+        for chunk in body:
+            counter[0] += len(chunk)
+            yield chunk
+
+    return counted(), counter
+
+
+def _host_port(host, base_uri_pattern):
+    """
+    returns host:port of a namenode host, with the port of the base uri
+    when the host has none
+    """
+    if ':' in host:
+        return host
+    uri = urlparse(base_uri_pattern.format(host=host))
+    try:
+        port = uri.port
+    except ValueError:
+        port = None
+    if port is None:
+        port = 443 if uri.scheme == 'https' else 80
+    return '{0}:{1}'.format(uri.hostname, port)
+
+
+def _subdirectories(dirpath, dirs, depth):
+    """
+    yields the path and depth of the directories of a listing, read from
+    dirs as they are needed so that pruning dirs is honoured
+    """
+    for file_status in dirs:
+        yield posixpath.join(dirpath, file_status['pathSuffix']), depth
+
+
+def _response_host(response):
+    """
+    returns the host and port that sent a response, the datanode when the
+    redirect of the namenode was followed
+    """
+    if isinstance(response.url, six.string_types):
+        return urlparse(response.url).netloc
+    return None
+
+
+def _close_response(future):
+    """
+    close the response of a hedged request that lost the race
+    """
+    try:
+        _, response = future.result()
+    except Exception:
+        return
+    if response is not None:
+        response.close()
+
+
+def _close_failed_response(response):
+    """
+    close a response that is not returned because the request was retried
+    """
+    if response is not None:
+        response.close()
+
 
 def _raise_pywebhdfs_exception(resp_code, message=None):
 
+    raise _pywebhdfs_exception(resp_code, message)
+
+
+def _pywebhdfs_exception(resp_code, message=None):
+
     if resp_code == http_client.BAD_REQUEST:
-        raise errors.BadRequest(msg=message)
+        return errors.BadRequest(msg=message)
     elif resp_code == http_client.UNAUTHORIZED:
-        raise errors.Unauthorized(msg=message)
+        return errors.Unauthorized(msg=message)
     elif resp_code == http_client.NOT_FOUND:
-        raise errors.FileNotFound(msg=message)
+        return errors.FileNotFound(msg=message)
     elif resp_code == http_client.METHOD_NOT_ALLOWED:
-        raise errors.MethodNotAllowed(msg=message)
+        return errors.MethodNotAllowed(msg=message)
     else:
-        raise errors.PyWebHdfsException(msg=message)
+        return errors.PyWebHdfsException(msg=message)
+
+
+def _read_response_into(response, target, chunk_size):
+    """
+    read the body of a streamed response into a buffer or file object
+    without allocating a new bytes object per chunk
+    """
+    raw = response.raw
+    total = 0
+
+    if hasattr(target, 'write'):
+        buf = bytearray(chunk_size)
+        view = memoryview(buf)
+        while True:
+            read = raw.readinto(buf)
+            if not read:
+                return total
+            target.write(view[:read])
+            total += read
+
+    view = memoryview(target)
+    while total < len(view):
+        read = raw.readinto(view[total:total + chunk_size])
+        if not read:
+            break
+        total += read
+    return total
+
+
+def _split_ranges(length, part_size, block_size):
+    """
+    split a file of the given length into (offset, length) ranges of at most
+    part_size bytes that never cross an HDFS block boundary
+    """
+    if part_size <= 0:
+        part_size = length
+    if not block_size or block_size <= 0:
+        block_size = length
+
+    ranges = []
+    if part_size >= block_size:
+        # whole blocks per range
+        part_size -= part_size % block_size
+        for offset in range(0, length, part_size):
+            ranges.append((offset, min(part_size, length - offset)))
+        return ranges
+
+    for block_offset in range(0, length, block_size):
+        block_end = min(block_offset + block_size, length)
+        for offset in range(block_offset, block_end, part_size):
+            ranges.append((offset, min(part_size, block_end - offset)))
+    return ranges
+
+
+def _merge_ranges(ranges, max_gap, max_size):
+    """
+    sort (offset, length) ranges and merge those less than max_gap bytes
+    apart, returning (offset, length, members) tuples where members are the
+    (index, offset, length) of the original ranges covered
+    """
+    merged = []
+    for index, (offset, length) in sorted(
+            enumerate(ranges), key=lambda indexed: indexed[1]):
+        offset, length = int(offset), int(length)
+        if offset < 0 or length < 0:
+            raise ValueError(
+                "Invalid range ({0}, {1})".format(offset, length))
+        end = offset + length
+        if merged:
+            merged_offset, merged_end, members = merged[-1]
+            if offset - merged_end <= max_gap and \
+                    max(end, merged_end) - merged_offset <= max_size:
+                merged[-1] = (merged_offset, max(end, merged_end), members)
+                members.append((index, offset, length))
+                continue
+        merged.append((offset, end, [(index, offset, length)]))
+    return [(offset, end - offset, members)
+            for offset, end, members in merged]
 
 
 def _is_standby_exception(response):
@@ -815,11 +2248,3 @@ def _is_standby_exception(response):
         except:
             pass
     return False
-
-
-def _move_active_host_to_head(hosts, active_host):
-    """
-    to improve efficiency move active host to head
-    """
-    hosts.remove(active_host)
-    hosts.insert(0, active_host)
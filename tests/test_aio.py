@@ -0,0 +1,169 @@
+import threading
+import unittest
+
+from six.moves import http_client
+
+from pywebhdfs import errors, operations
+
+try:
+    import asyncio
+
+    import aiohttp
+    from mock import AsyncMock, MagicMock, patch
+    from pywebhdfs.aio import AsyncPyWebHdfsClient
+except (ImportError, SyntaxError):
+    AsyncPyWebHdfsClient = None
+
+
+def _response(status, content=b'', json=None, headers=None):
+    response = MagicMock()
+    response.status = status
+    response.read = AsyncMock(return_value=content)
+    response.json = AsyncMock(return_value=json)
+    response.headers = headers or {}
+    return response
+
+
+class _Chunks(object):
+
+    def __init__(self, chunks):
+        self.chunks = list(chunks)
+
+    def __aiter__(self):
+        return self
+
+    def __anext__(self):
+        if not self.chunks:
+            raise StopAsyncIteration
+        return asyncio.sleep(0, result=self.chunks.pop(0))
+
+
+@unittest.skipIf(AsyncPyWebHdfsClient is None,
+                 'requires Python 3.6+ and aiohttp')
+class WhenTestingAsyncClient(unittest.TestCase):
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.session = MagicMock()
+        self.webhdfs = AsyncPyWebHdfsClient(host='hostname', port='00000',
+                                            user_name='username',
+                                            session=self.session)
+        self.path = 'user/hdfs'
+
+    def tearDown(self):
+        self.loop.close()
+
+    def run_async(self, coroutine):
+        return self.loop.run_until_complete(coroutine)
+
+    def collect(self, async_iterator):
+        results = []
+        while True:
+            try:
+                results.append(self.run_async(async_iterator.__anext__()))
+            except StopAsyncIteration:
+                return results
+
+    def test_uri_matches_sync_client(self):
+        self.session.get = AsyncMock(return_value=_response(
+            http_client.OK, json={'FileStatus': {}}))
+        result = self.run_async(self.webhdfs.get_file_dir_status(self.path))
+        self.assertEqual({'FileStatus': {}}, result)
+        uri = self.webhdfs._create_uri(self.path, operations.GETFILESTATUS)
+        self.session.get.assert_called_with(uri.format(host='hostname'),
+                                            allow_redirects=True)
+
+    def test_errors_are_raised(self):
+        self.session.get = AsyncMock(return_value=_response(
+            http_client.NOT_FOUND, b'missing'))
+        with self.assertRaises(errors.FileNotFound):
+            self.run_async(self.webhdfs.list_dir(self.path))
+        self.assertFalse(self.run_async(
+            self.webhdfs.exists_file_dir(self.path)))
+
+    def test_create_uses_two_step_calls(self):
+        init_response = _response(http_client.TEMPORARY_REDIRECT,
+                                  headers={'location': 'redirect_uri'})
+        self.session.put = AsyncMock(side_effect=[
+            init_response, _response(http_client.CREATED)])
+        result = self.run_async(self.webhdfs.create_file(self.path, b'0101'))
+        self.assertTrue(result)
+        self.session.put.assert_called_with(
+            'redirect_uri', data=b'0101',
+            headers={'content-type': 'application/octet-stream'})
+
+    def test_create_retries_datanode_failures(self):
+        init_response = _response(http_client.TEMPORARY_REDIRECT,
+                                  headers={'location': 'redirect_uri'})
+        self.session.put = AsyncMock(side_effect=[
+            init_response, aiohttp.ClientConnectionError(),
+            init_response, _response(http_client.CREATED)])
+        with patch('asyncio.sleep', AsyncMock()):
+            result = self.run_async(
+                self.webhdfs.create_file(self.path, b'0101'))
+        self.assertTrue(result)
+        self.assertEqual(4, self.session.put.call_count)
+
+    def test_stream_file_yields_chunks(self):
+        response = _response(http_client.OK)
+        response.content.iter_chunked.return_value = _Chunks([b'01', b'10'])
+        self.session.get = AsyncMock(return_value=response)
+        result = self.collect(self.webhdfs.stream_file(self.path))
+        self.assertEqual([b'01', b'10'], result)
+        self.assertTrue(response.release.called)
+
+    def test_iter_dir_pages(self):
+        def batch(names, remaining):
+            return _response(http_client.OK, json={'DirectoryListing': {
+                'partialListing': {'FileStatuses': {'FileStatus': [
+                    {'pathSuffix': name} for name in names]}},
+                'remainingEntries': remaining}})
+        self.session.get = AsyncMock(side_effect=[batch(['a'], 1),
+                                                  batch(['b'], 0)])
+        result = self.collect(self.webhdfs.iter_dir(self.path))
+        self.assertEqual([{'pathSuffix': 'a'}, {'pathSuffix': 'b'}], result)
+        self.assertIn('startAfter=a', self.session.get.call_args[0][0])
+
+    def test_standby_host_is_skipped(self):
+        webhdfs = AsyncPyWebHdfsClient(
+            path_to_hosts=[('.*', ['standby', 'active'])],
+            session=self.session)
+        standby = _response(http_client.FORBIDDEN, json={
+            'RemoteException': {'exception': 'StandbyException'}})
+        self.session.put = AsyncMock(side_effect=[
+            standby, _response(http_client.OK)])
+        self.assertTrue(self.run_async(webhdfs.make_dir(self.path)))
+        self.assertTrue(standby.release.called)
+        self.assertEqual(('active', 'standby'), webhdfs.namenodes.hosts(0))
+
+    def test_requests_have_no_total_timeout(self):
+        webhdfs = AsyncPyWebHdfsClient(timeout=5)
+        with patch('aiohttp.TCPConnector'), \
+                patch('aiohttp.ClientSession') as session:
+            webhdfs.session
+        self.assertIsNone(session.call_args[1]['timeout'].total)
+        timeout = webhdfs._request_opts()['timeout']
+        self.assertIsNone(timeout.total)
+        self.assertEqual(5, timeout.sock_connect)
+        self.assertEqual(5, timeout.sock_read)
+
+    def test_file_uploads_are_read_in_the_executor(self):
+        threads = []
+
+        class File(object):
+            def __init__(self):
+                self.chunks = [b'01', b'10', b'']
+
+            def read(self, size=-1):
+                threads.append(threading.current_thread())
+                return self.chunks.pop(0)
+
+        self.session.put = AsyncMock(side_effect=[
+            _response(http_client.TEMPORARY_REDIRECT,
+                      headers={'location': 'redirect_uri'}),
+            _response(http_client.CREATED)])
+        self.assertTrue(self.run_async(
+            self.webhdfs.create_file(self.path, File())))
+        data = self.session.put.call_args[1]['data']
+        self.assertEqual([b'01', b'10'], self.collect(data))
+        self.assertNotIn(threading.current_thread(), threads)
@@ -0,0 +1,45 @@
+import unittest
+
+from mock import MagicMock
+
+from pywebhdfs import errors
+from pywebhdfs.batch import Batch, RateLimiter
+
+
+class WhenTestingBatch(unittest.TestCase):
+
+    def setUp(self):
+        self.client = MagicMock()
+        self.client.delete_file_dir.return_value = True
+        self.client.make_dir.side_effect = errors.Unauthorized(msg='denied')
+
+    def test_operations_are_chainable(self):
+        batch = Batch(self.client).delete('a').mkdir('b').set_xattr(
+            'c', 'user.x', '1')
+        self.assertEqual(3, len(batch))
+
+    def test_results_are_returned_in_order(self):
+        results = Batch(self.client) \
+            .delete('a', recursive=True) \
+            .mkdir('b', permission=755) \
+            .rename('c', 'd') \
+            .execute(max_workers=2)
+        self.assertEqual(['delete_file_dir', 'make_dir', 'rename_file_dir'],
+                         [result.method for result in results])
+        self.assertTrue(results[0].ok)
+        self.assertTrue(results[0].result)
+        self.assertFalse(results[1].ok)
+        self.assertIsInstance(results[1].exception, errors.Unauthorized)
+        self.assertTrue(results[2].ok)
+        self.client.delete_file_dir.assert_called_with('a', recursive=True)
+        self.client.make_dir.assert_called_with('b', permission=755)
+        self.client.rename_file_dir.assert_called_with('c', 'd')
+
+    def test_rate_limits_operations(self):
+        sleeps = []
+        limiter = RateLimiter(10, clock=lambda: 100.0, sleep=sleeps.append)
+        for _ in range(3):
+            limiter.acquire()
+        self.assertEqual(2, len(sleeps))
+        self.assertAlmostEqual(0.1, sleeps[0])
+        self.assertAlmostEqual(0.2, sleeps[1])
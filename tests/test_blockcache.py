@@ -0,0 +1,69 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from pywebhdfs.blockcache import BlockCache
+
+
+class WhenTestingBlockCache(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.cache = BlockCache(self.directory, max_bytes=10, block_size=4)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_key_depends_on_file_version(self):
+        key = self.cache.key('user/hdfs/a', 100, 10, 0)
+        self.assertEqual(key, self.cache.key('/user/hdfs/a', 100, 10, 0))
+        self.assertNotEqual(key, self.cache.key('user/hdfs/a', 101, 10, 0))
+        self.assertNotEqual(key, self.cache.key('user/hdfs/a', 100, 11, 0))
+        self.assertNotEqual(key, self.cache.key('user/hdfs/a', 100, 10, 1))
+
+    def test_blocks_are_served_from_mmap(self):
+        key = self.cache.key('a', 1, 4, 0)
+        self.assertIsNone(self.cache.get(key))
+        self.cache.put(key, b'0123')
+        block = self.cache.get(key)
+        try:
+            self.assertEqual(b'12', block[1:3])
+        finally:
+            block.close()
+        stats = self.cache.stats()
+        self.assertEqual(1, stats['hits'])
+        self.assertEqual(1, stats['misses'])
+        self.assertEqual(0.5, stats['hit_ratio'])
+        self.assertEqual(4, stats['bytes'])
+
+    def test_least_recently_used_blocks_are_evicted(self):
+        keys = [self.cache.key('a', 1, 12, block) for block in range(3)]
+        self.cache.put(keys[0], b'0123')
+        self.cache.put(keys[1], b'4567')
+        self.cache.get(keys[0]).close()
+        self.cache.put(keys[2], b'89ab')
+        self.assertIn(keys[0], self.cache)
+        self.assertNotIn(keys[1], self.cache)
+        self.assertFalse(os.path.exists(os.path.join(self.directory,
+                                                     keys[1])))
+        self.assertEqual(8, self.cache.size)
+        self.assertEqual(1, self.cache.stats()['evictions'])
+
+    def test_blocks_are_reused_across_instances(self):
+        key = self.cache.key('a', 1, 4, 0)
+        self.cache.put(key, b'0123')
+        open(os.path.join(self.directory, 'unrelated'), 'w').close()
+        cache = BlockCache(self.directory, max_bytes=10, block_size=4)
+        self.assertEqual(4, cache.size)
+        block = cache.get(key)
+        self.assertEqual(b'0123', block[:])
+        block.close()
+
+    def test_clear_removes_blocks(self):
+        key = self.cache.key('a', 1, 4, 0)
+        self.cache.put(key, b'0123')
+        self.cache.clear()
+        self.assertEqual(0, self.cache.size)
+        self.assertIsNone(self.cache.get(key))
+        self.assertEqual([], os.listdir(self.directory))
@@ -0,0 +1,72 @@
+import unittest
+
+from pywebhdfs.cache import LISTING, STATUS, MetadataCache
+
+
+class WhenTestingMetadataCache(unittest.TestCase):
+
+    def setUp(self):
+        self.now = 0
+        self.cache = MetadataCache(max_entries=3, ttl=10,
+                                   clock=lambda: self.now)
+
+    def test_get_counts_hits_and_misses(self):
+        self.assertIsNone(self.cache.get(STATUS, 'user/hdfs'))
+        self.cache.put(STATUS, 'user/hdfs', {'FileStatus': {}})
+        self.assertEqual({'FileStatus': {}},
+                         self.cache.get(STATUS, '/user/hdfs/'))
+        self.assertEqual({'hits': 1, 'misses': 1, 'entries': 1},
+                         self.cache.stats())
+
+    def test_entries_expire_after_ttl(self):
+        self.cache.put(STATUS, 'user/hdfs', 1)
+        self.now = 9
+        self.assertEqual(1, self.cache.get(STATUS, 'user/hdfs'))
+        self.now = 10
+        self.assertIsNone(self.cache.get(STATUS, 'user/hdfs'))
+        self.assertEqual(0, len(self.cache))
+
+    def test_least_recently_used_entry_is_evicted(self):
+        self.cache.put(STATUS, 'a', 1)
+        self.cache.put(STATUS, 'b', 2)
+        self.cache.put(STATUS, 'c', 3)
+        self.cache.get(STATUS, 'a')
+        self.cache.put(STATUS, 'd', 4)
+        self.assertIsNone(self.cache.get(STATUS, 'b'))
+        self.assertEqual(1, self.cache.get(STATUS, 'a'))
+        self.assertEqual(3, len(self.cache))
+
+    def test_invalidate_drops_all_kinds(self):
+        self.cache.put(STATUS, 'user/hdfs', 1)
+        self.cache.put(LISTING, 'user/hdfs', 2)
+        self.cache.put(STATUS, 'user/hdfs/file', 3)
+        self.cache.invalidate('/user/hdfs')
+        self.assertEqual(1, len(self.cache))
+
+    def test_invalidate_recursive_drops_children_only(self):
+        self.cache.put(STATUS, 'user/hdfs', 1)
+        self.cache.put(STATUS, 'user/hdfs/file', 2)
+        self.cache.put(STATUS, 'user/hdfs2', 3)
+        self.cache.invalidate('user/hdfs', recursive=True)
+        self.assertEqual(3, self.cache.get(STATUS, 'user/hdfs2'))
+        self.assertEqual(1, len(self.cache))
+
+    def test_invalidate_recursive_reaches_uncached_directories(self):
+        self.cache.put(STATUS, 'user/hdfs/a/b/c', 1)
+        self.cache.put(LISTING, 'user/hdfs/a/d', 2)
+        self.cache.put(STATUS, 'user/other', 3)
+        self.cache.invalidate('user/hdfs', recursive=True)
+        self.assertEqual(1, len(self.cache))
+        self.assertEqual(3, self.cache.get(STATUS, 'user/other'))
+
+    def test_directory_index_is_emptied_with_the_cache(self):
+        self.cache.put(STATUS, 'user/hdfs/a/b', 1)
+        self.cache.put(STATUS, 'user/hdfs/c', 2)
+        self.cache.put(STATUS, 'user/hdfs/d', 3)
+        self.cache.put(STATUS, 'user/hdfs/e', 4)
+        self.assertIsNone(self.cache.get(STATUS, 'user/hdfs/a/b'))
+        self.cache.invalidate('user/hdfs/c')
+        self.cache.invalidate('user/hdfs/d', recursive=True)
+        self.now = 100
+        self.assertIsNone(self.cache.get(STATUS, 'user/hdfs/e'))
+        self.assertEqual({}, self.cache._children)
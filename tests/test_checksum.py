@@ -0,0 +1,227 @@
+import binascii
+import hashlib
+import io
+import os
+import shutil
+import struct
+import tempfile
+import unittest
+import zlib
+
+from mock import patch
+
+from pywebhdfs.checksum import (CRC32, CRC32C, CRC_FUNCTIONS, ChecksumReader,
+                                CompositeCrc, MD5MD5CRC32, checksum_matches,
+                                for_algorithm, local_file_checksum,
+                                parse_algorithm, _crc32c_python)
+from pywebhdfs.testing import COMPOSITE_CRC, DATANODE, FakeWebHdfs
+
+
+def reference_checksum(data, block_size, bytes_per_crc=512, crc=zlib.crc32):
+    blocks = [data[start:start + block_size]
+              for start in range(0, len(data), block_size)]
+    block_digests = b''.join(
+        hashlib.md5(b''.join(
+            struct.pack('>I', crc(block[start:start + bytes_per_crc]) &
+                        0xffffffff)
+            for start in range(0, len(block), bytes_per_crc))).digest()
+        for block in blocks)
+    crc_per_block = block_size // bytes_per_crc if len(blocks) > 1 else 0
+    return struct.pack('>iq', bytes_per_crc, crc_per_block) + \
+        hashlib.md5(block_digests).digest()
+
+
+class WhenTestingMD5MD5CRC32(unittest.TestCase):
+
+    def setUp(self):
+        self.data = os.urandom(5000)
+
+    def test_single_block(self):
+        checksum = MD5MD5CRC32(block_size=8192)
+        checksum.update(self.data)
+        self.assertEqual(reference_checksum(self.data, 8192),
+                         checksum.digest())
+        self.assertEqual('MD5-of-0MD5-of-512CRC32', checksum.algorithm())
+        self.assertEqual(28, checksum.file_checksum()['length'])
+
+    def test_chunking_does_not_change_the_result(self):
+        checksum = MD5MD5CRC32(block_size=1024)
+        for start in range(0, len(self.data), 700):
+            checksum.update(memoryview(self.data[start:start + 700]))
+        self.assertEqual(reference_checksum(self.data, 1024),
+                         checksum.digest())
+        self.assertEqual('MD5-of-2MD5-of-512CRC32', checksum.algorithm())
+
+    def test_crc32c(self):
+        checksum = MD5MD5CRC32(block_size=1024, crc_type=CRC32C)
+        checksum.update(self.data[:1000])
+        checksum.update(self.data[1000:])
+        self.assertEqual(
+            reference_checksum(self.data, 1024, crc=_crc32c_python),
+            checksum.digest())
+        self.assertEqual('MD5-of-2MD5-of-512CRC32C', checksum.algorithm())
+
+    def test_empty_file(self):
+        self.assertEqual(reference_checksum(b'', 1024),
+                         MD5MD5CRC32(block_size=1024).digest())
+
+    def test_invalid_parameters(self):
+        with self.assertRaises(ValueError):
+            MD5MD5CRC32(block_size=1000)
+        with self.assertRaises(ValueError):
+            MD5MD5CRC32(crc_type='ADLER32')
+
+
+class WhenTestingCrcs(unittest.TestCase):
+
+    def test_check_values(self):
+        self.assertEqual(0xe3069283, _crc32c_python(b'123456789'))
+        self.assertEqual(0xe3069283, CRC_FUNCTIONS[CRC32C](b'123456789'))
+        self.assertEqual(
+            0xe3069283, _crc32c_python(b'6789', _crc32c_python(b'12345')))
+
+    def test_composite_crc_is_the_crc_of_the_data(self):
+        checksum = CompositeCrc(CRC32)
+        checksum.update(b'12345')
+        checksum.update(memoryview(b'6789'))
+        self.assertEqual({'algorithm': 'COMPOSITE-CRC32',
+                          'bytes': 'cbf43926', 'length': 4},
+                         checksum.file_checksum())
+
+    def test_for_algorithm(self):
+        checksum = for_algorithm('MD5-of-262144MD5-of-512CRC32C')
+        self.assertEqual(128 * 1024 * 1024, checksum.block_size)
+        self.assertEqual(CRC32C, checksum.crc_type)
+        self.assertIsNone(for_algorithm('MD5-of-0MD5-of-512CRC32').block_size)
+        self.assertEqual(CRC32C, for_algorithm('COMPOSITE-CRC32C').crc_type)
+        with self.assertRaises(ValueError):
+            for_algorithm('COMPOSITE-CRC64')
+
+
+class WhenTestingChecksumReader(unittest.TestCase):
+
+    def test_rereads_are_not_counted_twice(self):
+        checksum = CompositeCrc(CRC32)
+        data = io.BytesIO(b'xx123456789')
+        data.seek(2)
+        reader = ChecksumReader(data, checksum)
+        self.assertEqual(b'1234', reader.read(4))
+        self.assertEqual(4, reader.tell())
+        reader.seek(0)
+        self.assertEqual(b'123456789', reader.read())
+        self.assertEqual('cbf43926', checksum.hexdigest())
+
+    def test_skipped_bytes_can_not_be_checksummed(self):
+        reader = ChecksumReader(io.BytesIO(b'0123'), CompositeCrc())
+        reader.seek(2)
+        with self.assertRaises(IOError):
+            reader.read()
+
+    def test_iterators_of_chunks_are_not_seekable(self):
+        class Pipe(object):
+            def __init__(self, data):
+                self.data = io.BytesIO(data)
+
+            def read(self, size=-1):
+                return self.data.read(size)
+
+        reader = ChecksumReader(Pipe(b'123456789'), CompositeCrc(CRC32))
+        self.assertFalse(reader.seekable())
+        with self.assertRaises(IOError):
+            reader.tell()
+        self.assertEqual(b'123456789', reader.read())
+        self.assertEqual('cbf43926', reader.checksums[0].hexdigest())
+
+
+class WhenTestingLocalFileChecksum(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'data')
+        self.data = os.urandom(3000)
+        with open(self.path, 'wb') as local_file:
+            local_file.write(self.data)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_block_size_comes_from_the_algorithm(self):
+        checksum = local_file_checksum(self.path, 'MD5-of-2MD5-of-512CRC32')
+        self.assertEqual(reference_checksum(self.data, 1024),
+                         bytes(bytearray.fromhex(checksum['bytes'])))
+
+    def test_checksum_matches(self):
+        remote = {'FileChecksum': {
+            'algorithm': 'MD5-of-0MD5-of-512CRC32',
+            'bytes': binascii.hexlify(
+                reference_checksum(self.data, 4096)).decode().upper(),
+            'length': 28}}
+        self.assertTrue(checksum_matches(self.path, remote))
+        with open(self.path, 'ab') as local_file:
+            local_file.write(b'0')
+        self.assertFalse(checksum_matches(self.path, remote))
+
+    def test_crc32c_needs_an_extension_unless_slow_is_allowed(self):
+        algorithm = 'MD5-of-0MD5-of-512CRC32C'
+        with patch.dict(CRC_FUNCTIONS, {CRC32C: _crc32c_python}):
+            with self.assertRaises(ValueError):
+                local_file_checksum(self.path, algorithm)
+            with self.assertRaises(ValueError):
+                checksum_matches(self.path, {'algorithm': 'COMPOSITE-CRC32C',
+                                             'bytes': '00000000'})
+            checksum = local_file_checksum(self.path, algorithm,
+                                           allow_slow=True)
+        self.assertEqual(
+            reference_checksum(self.data, 4096, crc=_crc32c_python),
+            bytes(bytearray.fromhex(checksum['bytes'])))
+
+        def extension(data, crc=0):
+            return _crc32c_python(data, crc)
+        with patch.dict(CRC_FUNCTIONS, {CRC32C: extension}):
+            self.assertEqual(checksum, local_file_checksum(self.path,
+                                                           algorithm))
+
+    def test_parse_algorithm(self):
+        self.assertEqual((262144, 512, 'CRC32'),
+                         parse_algorithm('MD5-of-262144MD5-of-512CRC32'))
+        with self.assertRaises(ValueError):
+            parse_algorithm('COMPOSITE-CRC32C')
+
+
+class WhenTestingUploadChecksums(unittest.TestCase):
+
+    def setUp(self):
+        self.data = os.urandom(3000)
+        self.path = 'user/hdfs/data'
+
+    def upload(self, cluster, *checksums, **kwargs):
+        webhdfs = cluster.client()
+        try:
+            webhdfs.create_file(
+                self.path, ChecksumReader(io.BytesIO(self.data), *checksums),
+                **kwargs)
+            return webhdfs.get_file_checksum(self.path)
+        finally:
+            webhdfs.close()
+
+    def test_checksum_computed_during_a_retried_upload(self):
+        with FakeWebHdfs(checksum_type=CRC32C) as cluster:
+            cluster.fail_next(role=DATANODE)
+            checksum = MD5MD5CRC32(block_size=1024, crc_type=CRC32C)
+            composite = CompositeCrc()
+            remote = self.upload(cluster, checksum, composite,
+                                 blocksize=1024)
+        self.assertEqual('MD5-of-2MD5-of-512CRC32C',
+                         remote['FileChecksum']['algorithm'])
+        self.assertTrue(checksum.matches(remote))
+        self.assertFalse(composite.matches(remote))
+        self.assertEqual(3000, checksum.length)
+
+    def test_composite_crc(self):
+        with FakeWebHdfs(checksum_combine_mode=COMPOSITE_CRC,
+                         checksum_type=CRC32C) as cluster:
+            composite = CompositeCrc()
+            remote = self.upload(cluster, composite)
+        self.assertEqual({'algorithm': 'COMPOSITE-CRC32C', 'length': 4,
+                          'bytes': composite.hexdigest()},
+                         remote['FileChecksum'])
@@ -0,0 +1,58 @@
+import re
+import unittest
+
+from pywebhdfs import errors
+from pywebhdfs.federation import FederationRouter, literal_prefix
+from pywebhdfs.webhdfs import PyWebHdfsClient
+
+
+class WhenTestingFederationRouter(unittest.TestCase):
+
+    def setUp(self):
+        self.patterns = ['user/hdfs/tmp.*', 'user/hdfs', r'data/\d+/.*',
+                         'data/1', r'logs\.old.*', '.*']
+        self.router = FederationRouter(self.patterns)
+
+    def _first_match(self, path):
+        for index, pattern in enumerate(self.patterns):
+            if re.match(pattern, path):
+                return index
+        return None
+
+    def test_literal_prefix(self):
+        self.assertEqual('user/hdfs', literal_prefix('user/hdfs.*'))
+        self.assertEqual('user/hdfs', literal_prefix('user/hdfs'))
+        self.assertEqual('', literal_prefix('.*'))
+        self.assertEqual('logs.old', literal_prefix(r'logs\.old'))
+        self.assertIsNone(literal_prefix(r'data/\d+'))
+        self.assertIsNone(literal_prefix('user/.*/tmp'))
+        self.assertIsNone(literal_prefix('user$'))
+
+    def test_same_first_match_as_re_match(self):
+        paths = ['user/hdfs/tmp/x', 'user/hdfs/data', 'user/hd', 'data/12/x',
+                 'data/1', 'data/1x', 'logs.old/a', 'logsXold', '', 'other']
+        for path in paths:
+            self.assertEqual(self._first_match(path),
+                             self.router.resolve(path), path)
+
+    def test_unmatched_path(self):
+        router = FederationRouter(['user/.*', 'data'])
+        self.assertIsNone(router.resolve('tmp/x'))
+        self.assertEqual(1, router.resolve('database'))
+
+    def test_resolutions_are_cached(self):
+        router = FederationRouter(['user.*', r'\w+'], cache_size=2)
+        self.assertEqual(1, router.resolve('data'))
+        self.assertEqual({'data': 1}, router._cache)
+        router.resolve('user')
+        router.resolve('tmp')
+        self.assertEqual({'tmp': 1}, router._cache)
+
+    def test_client_routes_to_nameservice_hosts(self):
+        webhdfs = PyWebHdfsClient(path_to_hosts=[
+            ('user/.*', ['nn1', 'nn2']), ('data', ['nn3'])])
+        self.assertEqual(('nn3',), webhdfs._resolve_federation('data/x'))
+        self.assertEqual(('nn1', 'nn2'),
+                         webhdfs._resolve_federation('user/x'))
+        with self.assertRaises(errors.CorrespondHostsNotFound):
+            webhdfs._resolve_federation('tmp')
@@ -0,0 +1,63 @@
+import threading
+import unittest
+
+from pywebhdfs.ha import NamenodeState
+
+
+class WhenTestingNamenodeState(unittest.TestCase):
+
+    def setUp(self):
+        self.path_to_hosts = [('user/a.*', ['nn1', 'nn2']),
+                              ('.*', ['nn3'])]
+        self.state = NamenodeState(self.path_to_hosts)
+
+    def tearDown(self):
+        self.state.stop_probing()
+
+    def test_hosts_are_per_nameservice(self):
+        self.assertEqual(('nn1', 'nn2'), self.state.hosts(0))
+        self.assertEqual(('nn3',), self.state.hosts(1))
+
+    def test_mark_active_moves_host_to_head(self):
+        hosts = self.state.hosts(0)
+        self.state.mark_active(0, 'nn2')
+        self.assertEqual(('nn2', 'nn1'), self.state.hosts(0))
+        # earlier snapshots and the configuration are left untouched
+        self.assertEqual(('nn1', 'nn2'), hosts)
+        self.assertEqual(['nn1', 'nn2'], self.path_to_hosts[0][1])
+
+    def test_mark_active_keeps_head(self):
+        hosts = self.state.hosts(0)
+        self.state.mark_active(0, 'nn1')
+        self.assertIs(hosts, self.state.hosts(0))
+
+    def test_probe_marks_first_active_host(self):
+        active = {'nn1': False, 'nn2': True}
+        self.state.probe(lambda host: active[host])
+        self.assertEqual(('nn2', 'nn1'), self.state.hosts(0))
+
+    def test_probe_skips_unreachable_hosts(self):
+        def is_active(host):
+            if host == 'nn1':
+                raise IOError('connection refused')
+            return True
+
+        self.state.probe(is_active)
+        self.assertEqual(('nn2', 'nn1'), self.state.hosts(0))
+
+    def test_probe_ignores_single_host_nameservices(self):
+        probed = []
+        self.state.probe(lambda host: probed.append(host) or host == 'nn1')
+        self.assertEqual(['nn1'], probed)
+
+    def test_background_probing(self):
+        probed = threading.Event()
+
+        def is_active(host):
+            probed.set()
+            return host == 'nn2'
+
+        self.state.start_probing(is_active, 0.01)
+        self.assertTrue(probed.wait(5))
+        self.state.stop_probing()
+        self.assertEqual(('nn2', 'nn1'), self.state.hosts(0))
@@ -0,0 +1,84 @@
+import unittest
+
+import requests
+
+from pywebhdfs import metrics
+from pywebhdfs.metrics import (Event, Histogram, MetricsAggregator,
+                               prometheus_text)
+
+
+class WhenTestingHistogram(unittest.TestCase):
+
+    def test_observations_are_bucketed(self):
+        histogram = Histogram((0.1, 1.0))
+        for value in (0.05, 0.1, 0.5, 2.0):
+            histogram.observe(value)
+        self.assertEqual([(0.1, 2), (1.0, 3), (float('inf'), 4)],
+                         histogram.cumulative())
+        self.assertEqual(4, histogram.count)
+        self.assertAlmostEqual(2.65, histogram.sum)
+        self.assertEqual(0.1, histogram.quantile(0.5))
+        self.assertEqual(float('inf'), histogram.quantile(0.99))
+
+    def test_empty_histogram_has_no_quantile(self):
+        self.assertIsNone(Histogram().quantile(0.5))
+
+
+class WhenTestingMetricsAggregator(unittest.TestCase):
+
+    def setUp(self):
+        self.aggregator = MetricsAggregator(buckets=(0.1, 1.0))
+        self.aggregator(Event(metrics.REQUEST, 'OPEN', host='nn1',
+                              seconds=0.05, status=307, attempt=1))
+        self.aggregator(Event(metrics.REQUEST, 'OPEN', host='nn2',
+                              seconds=0.5, attempt=1,
+                              error=requests.exceptions.ConnectionError()))
+        self.aggregator(Event(metrics.RETRY, 'OPEN', seconds=1.0))
+        self.aggregator(Event(metrics.STANDBY, 'OPEN', host='nn1'))
+        self.aggregator(Event(metrics.TRANSFER, 'OPEN', host='dn1:1022',
+                              seconds=0.2, nbytes=42,
+                              direction=metrics.RECEIVED))
+
+    def test_snapshot(self):
+        snapshot = self.aggregator.snapshot()
+        self.assertEqual({('OPEN', 'nn1', 307): 1}, snapshot['requests'])
+        self.assertEqual({('OPEN', 'nn2', 'ConnectionError'): 1},
+                         snapshot['errors'])
+        self.assertEqual({'OPEN': 1}, snapshot['retries'])
+        self.assertEqual({'nn1': 1}, snapshot['standbys'])
+        self.assertEqual({('OPEN', metrics.RECEIVED): 42},
+                         snapshot['transfer_bytes'])
+        self.assertEqual(2, snapshot['request_seconds']['OPEN']['count'])
+        self.assertEqual(1.0, snapshot['transfer_seconds']['OPEN']['p50'])
+
+    def test_prometheus_text(self):
+        lines = prometheus_text(self.aggregator).splitlines()
+        self.assertIn('# TYPE pywebhdfs_request_seconds histogram', lines)
+        self.assertIn('pywebhdfs_request_seconds_bucket'
+                      '{operation="OPEN",le="0.1"} 1', lines)
+        self.assertIn('pywebhdfs_request_seconds_bucket'
+                      '{operation="OPEN",le="+Inf"} 2', lines)
+        self.assertIn('pywebhdfs_request_seconds_count{operation="OPEN"} 2',
+                      lines)
+        self.assertIn('pywebhdfs_requests_total'
+                      '{operation="OPEN",host="nn1",code="307"} 1', lines)
+        self.assertIn('pywebhdfs_retries_total{operation="OPEN"} 1', lines)
+        self.assertIn('pywebhdfs_transfer_bytes_total'
+                      '{operation="OPEN",direction="received"} 42', lines)
+
+    def test_datanode_requests_have_their_own_histogram(self):
+        self.aggregator(Event(metrics.DATANODE, 'OPEN', host='dn1:1022',
+                              seconds=0.5, status=200, attempt=1))
+        snapshot = self.aggregator.snapshot()
+        self.assertEqual(1, snapshot['datanode_seconds']['OPEN']['count'])
+        self.assertEqual(2, snapshot['request_seconds']['OPEN']['count'])
+        self.assertEqual(1, snapshot['requests'][('OPEN', 'dn1:1022', 200)])
+        self.assertIn('pywebhdfs_datanode_request_seconds_count'
+                      '{operation="OPEN"} 1',
+                      prometheus_text(self.aggregator).splitlines())
+
+    def test_labels_are_escaped(self):
+        aggregator = MetricsAggregator()
+        aggregator(Event(metrics.STANDBY, 'OPEN', host='a"b'))
+        self.assertIn('pywebhdfs_standby_total{host="a\\"b"} 1',
+                      prometheus_text(aggregator).splitlines())
@@ -0,0 +1,71 @@
+import unittest
+
+from pywebhdfs.pool import DATANODE, NAMENODE, HdfsHTTPAdapter
+
+
+class WhenTestingHdfsHTTPAdapter(unittest.TestCase):
+
+    def setUp(self):
+        self.now = 0
+        self.adapter = HdfsHTTPAdapter(namenode_hosts=['nn1'],
+                                       namenode_maxsize=32, idle_timeout=60,
+                                       pool_connections=4, pool_maxsize=8,
+                                       pool_block=True)
+        self.manager = self.adapter.poolmanager
+        self.manager._clock = lambda: self.now
+        self.manager._last_reap = 0
+
+    def test_pools_are_sized_by_host_kind(self):
+        namenode_pool = self.manager.connection_from_host('nn1', 50070)
+        datanode_pool = self.manager.connection_from_host('dn1', 50075)
+        self.assertEqual(32, namenode_pool.pool.maxsize)
+        self.assertEqual(8, datanode_pool.pool.maxsize)
+        self.assertTrue(datanode_pool.block)
+
+    def test_datanodes_on_namenode_machines_are_told_apart(self):
+        adapter = HdfsHTTPAdapter(namenode_hosts=['nn1:50070'],
+                                  namenode_maxsize=32, pool_maxsize=8)
+        manager = adapter.poolmanager
+        self.assertEqual(32, manager.connection_from_host(
+            'nn1', 50070).pool.maxsize)
+        self.assertEqual(8, manager.connection_from_host(
+            'nn1', 50075).pool.maxsize)
+        self.assertEqual(1, adapter.stats()[DATANODE]['pools'])
+
+    def test_idle_pools_are_reaped(self):
+        self.manager.connection_from_host('dn1', 50075)
+        self.now = 40
+        self.manager.connection_from_host('dn2', 50075)
+        self.now = 70
+        self.assertEqual(1, self.adapter.reap_idle())
+        self.assertEqual(1, len(self.manager.pools))
+
+    def test_idle_pools_are_reaped_on_access(self):
+        self.manager.connection_from_host('dn1', 50075)
+        self.now = 100
+        self.manager.connection_from_host('dn2', 50075)
+        self.assertEqual(1, len(self.manager.pools))
+
+    def test_stats_count_connection_reuse(self):
+        pool = self.manager.connection_from_host('dn1', 50075)
+        pool.num_connections = 2
+        pool.num_requests = 5
+        self.manager.connection_from_host('nn1', 50070)
+        stats = self.adapter.stats()
+        self.assertEqual({'pools': 1, 'connections': 2, 'requests': 5,
+                          'reused': 3}, stats[DATANODE])
+        self.assertEqual(1, stats[NAMENODE]['pools'])
+
+    def test_stats_include_reaped_pools(self):
+        pool = self.manager.connection_from_host('dn1', 50075)
+        pool.num_connections = 1
+        pool.num_requests = 3
+        self.now = 100
+        self.adapter.reap_idle()
+        self.assertEqual({'pools': 0, 'connections': 1, 'requests': 3,
+                          'reused': 2}, self.adapter.stats()[DATANODE])
+
+    def test_reap_is_disabled_without_timeout(self):
+        adapter = HdfsHTTPAdapter()
+        adapter.poolmanager.connection_from_host('dn1', 50075)
+        self.assertEqual(0, adapter.reap_idle())
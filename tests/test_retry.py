@@ -0,0 +1,99 @@
+import unittest
+
+import requests
+
+from pywebhdfs.retry import CircuitBreaker, RetryPolicy
+
+
+class FakeClock(object):
+
+    def __init__(self, now=100.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class WhenTestingRetryPolicy(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.bounds = []
+
+        def uniform(low, high):
+            self.bounds.append((low, high))
+            return high
+
+        self.policy = RetryPolicy(max_tries=4, base_delay=1.0, max_delay=5.0,
+                                  clock=self.clock, uniform=uniform)
+
+    def test_backoff_uses_decorrelated_jitter_up_to_max_delay(self):
+        attempts = self.policy.begin()
+        self.assertEqual(3.0, attempts.backoff())
+        self.assertEqual(5.0, attempts.backoff())
+        self.assertEqual([(1.0, 3.0), (1.0, 9.0)], self.bounds)
+
+    def test_backoff_gives_up_after_max_tries(self):
+        attempts = self.policy.begin()
+        delays = [attempts.backoff() for _ in range(4)]
+        self.assertEqual([3.0, 5.0, 5.0, None], delays)
+
+    def test_restart_counts_tries_again(self):
+        attempts = self.policy.begin()
+        for _ in range(3):
+            attempts.backoff()
+        attempts.restart()
+        self.assertEqual(3.0, attempts.backoff())
+
+    def test_backoff_stops_at_deadline(self):
+        self.policy.deadline = 10
+        attempts = self.policy.begin()
+        self.assertEqual(3.0, attempts.backoff())
+        self.clock.now += 6
+        self.assertIsNone(attempts.backoff())
+        self.assertFalse(attempts.expired())
+        self.clock.now += 4
+        self.assertTrue(attempts.expired())
+
+    def test_retryable_errors(self):
+        self.assertTrue(self.policy.is_retryable(
+            requests.exceptions.ConnectionError()))
+        self.assertTrue(self.policy.is_retryable(
+            requests.exceptions.ReadTimeout()))
+        self.assertFalse(self.policy.is_retryable(
+            requests.exceptions.InvalidURL()))
+        self.assertFalse(self.policy.is_retryable(ValueError()))
+        self.assertTrue(self.policy.is_retryable_status(503))
+        self.assertFalse(self.policy.is_retryable_status(500))
+
+
+class WhenTestingCircuitBreaker(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10,
+                                      clock=self.clock)
+
+    def test_opens_after_consecutive_failures(self):
+        self.breaker.record_failure('nn1')
+        self.assertTrue(self.breaker.allow('nn1'))
+        self.breaker.record_failure('nn1')
+        self.assertFalse(self.breaker.allow('nn1'))
+        self.assertTrue(self.breaker.is_open('nn1'))
+        self.assertTrue(self.breaker.allow('nn2'))
+
+    def test_success_resets_failures(self):
+        self.breaker.record_failure('nn1')
+        self.breaker.record_success('nn1')
+        self.breaker.record_failure('nn1')
+        self.assertTrue(self.breaker.allow('nn1'))
+
+    def test_half_open_lets_one_request_through(self):
+        self.breaker.record_failure('nn1')
+        self.breaker.record_failure('nn1')
+        self.clock.now += 10
+        self.assertTrue(self.breaker.allow('nn1'))
+        self.assertFalse(self.breaker.allow('nn1'))
+        self.breaker.record_success('nn1')
+        self.assertTrue(self.breaker.allow('nn1'))
+        self.assertEqual({'failures': {}, 'open': []}, self.breaker.stats())
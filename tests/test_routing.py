@@ -0,0 +1,50 @@
+import unittest
+
+from pywebhdfs import operations
+from pywebhdfs.routing import HostLatencyTracker
+
+
+class WhenTestingHostLatencyTracker(unittest.TestCase):
+
+    def setUp(self):
+        self.tracker = HostLatencyTracker(alpha=0.5, window=20,
+                                          percentile=90, default_delay=0.5,
+                                          min_delay=0.01, min_samples=10)
+
+    def test_ewma_weights_new_samples(self):
+        self.tracker.record('nn1', operations.LISTSTATUS, 1.0)
+        self.tracker.record('nn1', operations.LISTSTATUS, 3.0)
+        self.assertEqual(2.0, self.tracker.ewma('nn1'))
+
+    def test_open_does_not_affect_ewma(self):
+        self.tracker.record('nn1', operations.OPEN, 5.0)
+        self.assertIsNone(self.tracker.ewma('nn1'))
+
+    def test_hedge_delay_uses_percentile_of_operation(self):
+        self.assertEqual(0.5, self.tracker.hedge_delay(
+            'nn1', operations.GETFILESTATUS))
+        for i in range(20):
+            self.tracker.record('nn1', operations.GETFILESTATUS, i / 100.0)
+        self.assertEqual(0.18, self.tracker.hedge_delay(
+            'nn1', operations.GETFILESTATUS))
+        self.assertEqual(0.5, self.tracker.hedge_delay(
+            'nn1', operations.OPEN))
+
+    def test_order_prefers_fast_hosts(self):
+        self.tracker.record('nn1', operations.LISTSTATUS, 0.2)
+        self.tracker.record('nn2', operations.LISTSTATUS, 0.1)
+        self.assertEqual(['nn3', 'nn2', 'nn1'],
+                         self.tracker.order(['nn1', 'nn2', 'nn3']))
+
+    def test_standby_hosts_sort_last(self):
+        self.tracker.record('nn1', operations.LISTSTATUS, 0.2)
+        self.tracker.record_standby('nn2')
+        self.assertEqual(['nn1', 'nn2'], self.tracker.order(['nn2', 'nn1']))
+
+    def test_hedges_are_counted(self):
+        self.tracker.record_hedge()
+        self.tracker.record_hedge()
+        self.tracker.record_hedge_won()
+        stats = self.tracker.stats()
+        self.assertEqual(2, stats['hedges'])
+        self.assertEqual(1, stats['hedges_won'])
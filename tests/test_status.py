@@ -0,0 +1,81 @@
+import json
+import unittest
+
+from mock import patch
+
+from pywebhdfs.status import FileStatus, StatusColumns, get_decoder
+
+
+class WhenTestingFileStatus(unittest.TestCase):
+
+    def setUp(self):
+        self.status = {
+            'accessTime': 1371737704282, 'blockSize': 134217728,
+            'group': 'hdfs', 'length': 90,
+            'modificationTime': 1371737704595, 'owner': 'hdfs',
+            'pathSuffix': 'example.txt', 'permission': '755',
+            'replication': 3, 'type': 'FILE', 'ecPolicy': 'RS-6-3'}
+
+    def test_from_json_maps_fields(self):
+        record = FileStatus.from_json(self.status)
+        self.assertEqual('example.txt', record.path_suffix)
+        self.assertEqual(1371737704595, record.modification_time)
+        self.assertFalse(record.is_dir)
+        self.assertIsNone(record.children_num)
+        self.assertEqual({'ecPolicy': 'RS-6-3'}, record.extra)
+
+    def test_webhdfs_keys_can_be_used(self):
+        record = FileStatus.from_json(self.status)
+        self.assertEqual(90, record['length'])
+        self.assertEqual('RS-6-3', record['ecPolicy'])
+        self.assertIn('pathSuffix', record)
+        self.assertNotIn('childrenNum', record)
+        self.assertIsNone(record.get('childrenNum'))
+        with self.assertRaises(KeyError):
+            record['childrenNum']
+
+    def test_round_trip(self):
+        record = FileStatus.from_json(self.status)
+        self.assertEqual(self.status, record.to_dict())
+        self.assertEqual(record, FileStatus.from_json(record.to_dict()))
+
+    def test_records_have_no_dict(self):
+        record = FileStatus(path_suffix='a', type='DIRECTORY')
+        self.assertTrue(record.is_dir)
+        self.assertFalse(hasattr(record, '__dict__'))
+        with self.assertRaises(TypeError):
+            FileStatus(name='a')
+
+
+class WhenTestingStatusColumns(unittest.TestCase):
+
+    def test_append_dicts_and_records(self):
+        columns = StatusColumns()
+        columns.append({'pathSuffix': 'a', 'length': 5,
+                        'modificationTime': 7, 'type': 'FILE'})
+        columns.append(FileStatus(path_suffix='b', length=0,
+                                  modification_time=8, type='DIRECTORY'))
+        self.assertEqual(2, len(columns))
+        self.assertEqual([('a', 5, 7, False), ('b', 0, 8, True)],
+                         list(columns))
+        self.assertEqual(8, columns.lengths.itemsize)
+
+
+class WhenTestingGetDecoder(unittest.TestCase):
+
+    def test_named_decoders(self):
+        self.assertIs(json.loads, get_decoder('json'))
+        self.assertEqual({'a': 1}, get_decoder('auto')(b'{"a": 1}'))
+        with self.assertRaises(ValueError):
+            get_decoder('yaml')
+
+    def test_stdlib_decoder_accepts_bytes(self):
+        with patch('pywebhdfs.status._JSON_LOADS_BYTES', False):
+            loads = get_decoder('json')
+        self.assertEqual({'a': u'\xe9'},
+                         loads(u'{"a": "\xe9"}'.encode('utf-8')))
+
+    def test_functions_are_used_as_they_are(self):
+        def loads(content):
+            return content
+        self.assertIs(loads, get_decoder(loads))
@@ -0,0 +1,139 @@
+import io
+import itertools
+import os
+import tempfile
+import unittest
+
+from mock import MagicMock
+
+from pywebhdfs.streams import FileSlice, HdfsFileReader, UploadSource
+
+
+class WhenTestingHdfsFileReader(unittest.TestCase):
+
+    def setUp(self):
+        self.path = 'user/hdfs/file'
+        self.file_data = b'0123456789abcdefghij'
+        self.client = MagicMock()
+        self.client.read_file.side_effect = self._read_file
+        self.client.stream_file_into.side_effect = self._stream_file_into
+        self.client.get_file_dir_status.return_value = {
+            'FileStatus': {'length': len(self.file_data)}}
+
+    def _read_file(self, path, offset, length):
+        return self.file_data[offset:offset + length]
+
+    def _stream_file_into(self, path, target, offset, length):
+        data = self._read_file(path, offset, length)
+        target[:len(data)] = data
+        return len(data)
+
+    def test_length_is_read_from_status(self):
+        reader = HdfsFileReader(self.client, self.path)
+        self.assertEqual(len(self.file_data), reader.length)
+        self.client.get_file_dir_status.assert_called_with(self.path)
+
+    def test_read_issues_ranged_request(self):
+        reader = HdfsFileReader(self.client, self.path)
+        reader.seek(5)
+        self.assertEqual(b'5678', reader.read(4))
+        self.assertEqual(9, reader.tell())
+        args, kwargs = self.client.stream_file_into.call_args
+        self.assertEqual(self.path, args[0])
+        self.assertEqual({'offset': 5, 'length': 4}, kwargs)
+
+    def test_read_past_end_returns_empty(self):
+        reader = HdfsFileReader(self.client, self.path)
+        reader.seek(0, io.SEEK_END)
+        self.assertEqual(b'', reader.read(4))
+        self.assertFalse(self.client.stream_file_into.called)
+
+    def test_seek_relative(self):
+        reader = HdfsFileReader(self.client, self.path)
+        reader.seek(-4, io.SEEK_END)
+        reader.seek(1, io.SEEK_CUR)
+        self.assertEqual(17, reader.tell())
+        with self.assertRaises(ValueError):
+            reader.seek(-1)
+
+    def test_readall_uses_one_request(self):
+        reader = HdfsFileReader(self.client, self.path, length=20)
+        reader.seek(2)
+        self.assertEqual(self.file_data[2:], reader.read())
+        self.assertEqual(1, self.client.read_file.call_count)
+        self.assertFalse(self.client.get_file_dir_status.called)
+
+    def test_buffered_reads_are_batched(self):
+        reader = io.BufferedReader(HdfsFileReader(self.client, self.path),
+                                   buffer_size=8)
+        self.assertEqual(b'01', reader.read(2))
+        self.assertEqual(b'23', reader.read(2))
+        self.assertEqual(1, self.client.stream_file_into.call_count)
+        reader.seek(-2, io.SEEK_END)
+        self.assertEqual(b'ij', reader.read(2))
+        self.assertEqual(2, self.client.stream_file_into.call_count)
+
+
+class WhenTestingUploadSource(unittest.TestCase):
+
+    def test_strings_are_sent_as_is(self):
+        source = UploadSource(b'010101')
+        self.assertTrue(source.rewindable)
+        self.assertEqual(b'010101', source.body())
+        self.assertEqual(b'010101', source.body())
+
+    def test_seekable_files_are_rewound(self):
+        data = io.BytesIO(b'xx0123456789')
+        data.seek(2)
+        source = UploadSource(data, chunk_size=4)
+        self.assertTrue(source.rewindable)
+        self.assertEqual([b'0123', b'4567'],
+                         list(itertools.islice(source.body(), 2)))
+        self.assertEqual([b'0123', b'4567', b'89'], list(source.body()))
+
+    def test_iterators_resume_from_acknowledged_length(self):
+        source = UploadSource(iter([b'0123', u'4567', b'', b'89']))
+        self.assertFalse(source.rewindable)
+        body = source.body()
+        self.assertEqual([b'0123', b'4567'], list(itertools.islice(body, 2)))
+        self.assertEqual(8, source.sent)
+        self.assertTrue(source.resume(5))
+        self.assertEqual([b'567', b'89'], list(source.body()))
+
+    def test_resume_is_bounded_by_replay_size(self):
+        source = UploadSource(iter([b'0123', b'4567', b'89']),
+                              replay_size=6)
+        list(source.body())
+        self.assertFalse(source.resume(2))
+        self.assertTrue(source.resume(4))
+        self.assertFalse(source.resume(11))
+
+    def test_unseekable_files_are_read_in_chunks(self):
+        data = MagicMock()
+        data.seekable.return_value = False
+        data.read.side_effect = [b'0123', b'45', b'']
+        source = UploadSource(data, chunk_size=4)
+        self.assertFalse(source.rewindable)
+        self.assertEqual([b'0123', b'45'], list(source.body()))
+        data.read.assert_called_with(4)
+
+
+class WhenTestingFileSlice(unittest.TestCase):
+
+    def setUp(self):
+        handle, self.path = tempfile.mkstemp()
+        os.write(handle, b'0123456789')
+        os.close(handle)
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def test_reads_are_limited_to_the_slice(self):
+        with FileSlice(self.path, 2, 5) as part:
+            self.assertEqual(b'234', part.read(3))
+            self.assertEqual(3, part.tell())
+            self.assertEqual(b'56', part.read(10))
+            self.assertEqual(b'', part.read())
+            part.seek(1)
+            self.assertEqual(b'3456', part.read())
+            self.assertEqual(5, part.seek(0, io.SEEK_END))
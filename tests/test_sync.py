@@ -0,0 +1,146 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from mock import patch
+
+from pywebhdfs import errors
+from pywebhdfs.checksum import CRC32C, CRC_FUNCTIONS, _crc32c_python
+from pywebhdfs.sync import DOWNLOAD
+from pywebhdfs.testing import DATANODE, FakeWebHdfs
+
+
+class WhenTestingSync(unittest.TestCase):
+
+    def setUp(self):
+        self.cluster = FakeWebHdfs().start()
+        self.webhdfs = self.cluster.client()
+        self.directory = tempfile.mkdtemp()
+        self.local_dir = os.path.join(self.directory, 'local')
+        self.write('a.txt', b'aaa')
+        self.write('sub/b.txt', b'bbbb')
+        os.makedirs(os.path.join(self.local_dir, 'empty'))
+
+    def tearDown(self):
+        self.webhdfs.close()
+        self.cluster.close()
+        shutil.rmtree(self.directory)
+
+    def write(self, relative_path, data, mtime=None):
+        path = os.path.join(self.local_dir, *relative_path.split('/'))
+        if not os.path.isdir(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        with open(path, 'wb') as local_file:
+            local_file.write(data)
+        if mtime is not None:
+            os.utime(path, (mtime, mtime))
+
+    def uploads(self):
+        return len(self.cluster.requests('CREATE', DATANODE))
+
+    def test_upload_only_copies_changes(self):
+        result = self.webhdfs.sync(self.local_dir, 'user/hdfs/mirror')
+        self.assertEqual(['a.txt', 'sub/b.txt'], result.copied)
+        self.assertEqual(['empty', 'sub'], result.created_dirs)
+        self.assertEqual(7, result.bytes_copied)
+        self.assertEqual(b'bbbb',
+                         self.webhdfs.read_file('user/hdfs/mirror/sub/b.txt'))
+        self.assertTrue(self.webhdfs.exists_file_dir('user/hdfs/mirror/empty'))
+
+        result = self.webhdfs.sync(self.local_dir, 'user/hdfs/mirror')
+        self.assertEqual([], result.copied)
+        self.assertEqual(2, result.unchanged)
+        self.assertEqual(2, self.uploads())
+
+        self.write('a.txt', b'changed')
+        self.write('c.txt', b'c')
+        result = self.webhdfs.sync(self.local_dir, 'user/hdfs/mirror')
+        self.assertEqual(['a.txt', 'c.txt'], result.copied)
+        self.assertEqual(b'changed',
+                         self.webhdfs.read_file('user/hdfs/mirror/a.txt'))
+
+    def test_delete_removes_extra_files(self):
+        self.webhdfs.create_file('user/hdfs/mirror/old/x', b'x')
+        self.webhdfs.create_file('user/hdfs/mirror/y', b'y')
+        result = self.webhdfs.sync(self.local_dir, 'user/hdfs/mirror',
+                                   dry_run=True, delete=True)
+        self.assertEqual(['old', 'y'], result.deleted)
+        self.assertTrue(self.webhdfs.exists_file_dir('user/hdfs/mirror/y'))
+
+        self.webhdfs.sync(self.local_dir, 'user/hdfs/mirror', delete=True)
+        self.assertFalse(self.webhdfs.exists_file_dir('user/hdfs/mirror/y'))
+        self.assertFalse(self.webhdfs.exists_file_dir('user/hdfs/mirror/old'))
+
+    def test_checksum_finds_changes_keeping_size_and_mtime(self):
+        self.webhdfs.sync(self.local_dir, 'user/hdfs/mirror')
+        # same size, and older than the uploaded file
+        self.write('a.txt', b'AAA', mtime=time.time() - 3600)
+        self.assertEqual([], self.webhdfs.sync(
+            self.local_dir, 'user/hdfs/mirror', dry_run=True).copied)
+        result = self.webhdfs.sync(self.local_dir, 'user/hdfs/mirror',
+                                   checksum=True)
+        self.assertEqual(['a.txt'], result.copied)
+        self.assertEqual(1, result.unchanged)
+
+    def test_checksum_falls_back_to_mtime_without_fast_crc32c(self):
+        self.webhdfs.close()
+        self.cluster.close()
+        self.cluster = FakeWebHdfs(checksum_type=CRC32C).start()
+        self.webhdfs = self.cluster.client()
+        self.webhdfs.sync(self.local_dir, 'user/hdfs/mirror')
+        self.write('a.txt', b'AAA', mtime=time.time() - 3600)
+        with patch.dict(CRC_FUNCTIONS, {CRC32C: _crc32c_python}):
+            result = self.webhdfs.sync(self.local_dir, 'user/hdfs/mirror',
+                                       checksum=True)
+        # compared by modification time, the local file is older
+        self.assertEqual([], result.copied)
+        self.assertEqual(2, result.unchanged)
+
+    def test_download(self):
+        self.webhdfs.sync(self.local_dir, 'user/hdfs/mirror')
+        target = os.path.join(self.directory, 'target')
+        result = self.webhdfs.sync(target, 'user/hdfs/mirror',
+                                   direction=DOWNLOAD)
+        self.assertEqual(['a.txt', 'sub/b.txt'], result.copied)
+        with open(os.path.join(target, 'sub', 'b.txt'), 'rb') as local_file:
+            self.assertEqual(b'bbbb', local_file.read())
+        self.assertTrue(os.path.isdir(os.path.join(target, 'empty')))
+
+        result = self.webhdfs.sync(target, 'user/hdfs/mirror',
+                                   direction=DOWNLOAD)
+        self.assertEqual([], result.copied)
+        self.assertEqual(2, result.unchanged)
+
+        open(os.path.join(target, 'extra'), 'w').close()
+        self.webhdfs.create_file('user/hdfs/mirror/a.txt', b'new',
+                                 overwrite=True)
+        result = self.webhdfs.sync(target, 'user/hdfs/mirror',
+                                   direction=DOWNLOAD, delete=True)
+        self.assertEqual(['a.txt'], result.copied)
+        self.assertEqual(['extra'], result.deleted)
+        self.assertEqual(['a.txt', 'empty', 'sub'], sorted(os.listdir(target)))
+
+    def test_destination_directory_is_created(self):
+        shutil.rmtree(os.path.join(self.local_dir, 'sub'))
+        self.webhdfs.sync(self.local_dir, 'user/hdfs/mirror')
+        target = os.path.join(self.directory, 'new', 'target')
+        result = self.webhdfs.sync(target, 'user/hdfs/mirror',
+                                   direction=DOWNLOAD)
+        self.assertEqual(['a.txt'], result.copied)
+        self.assertEqual(['a.txt', 'empty'], sorted(os.listdir(target)))
+
+        shutil.rmtree(self.local_dir)
+        os.makedirs(self.local_dir)
+        self.webhdfs.sync(self.local_dir, 'user/hdfs/empty')
+        self.assertEqual('DIRECTORY', self.webhdfs.get_file_dir_status(
+            'user/hdfs/empty')['FileStatus']['type'])
+
+    def test_missing_source(self):
+        with self.assertRaises(errors.FileNotFound):
+            self.webhdfs.sync(self.local_dir, 'user/hdfs/missing',
+                              direction=DOWNLOAD)
+        with self.assertRaises(ValueError):
+            self.webhdfs.sync(self.local_dir, 'user/hdfs/mirror',
+                              direction='sideways')
@@ -0,0 +1,208 @@
+import io
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from pywebhdfs import errors, metrics
+from pywebhdfs.retry import RetryPolicy
+from pywebhdfs.testing import DATANODE, DROP, NAMENODE, FakeWebHdfs
+
+
+class WhenTestingAgainstFakeWebHdfs(unittest.TestCase):
+
+    def setUp(self):
+        self.cluster = FakeWebHdfs(namenodes=2, list_limit=2).start()
+        self.webhdfs = self.cluster.client()
+        self.path = 'user/hdfs/example.txt'
+
+    def tearDown(self):
+        self.webhdfs.close()
+        self.cluster.close()
+
+    def test_files_are_written_and_read_through_redirects(self):
+        self.assertTrue(self.webhdfs.create_file(self.path, b'0123'))
+        self.assertTrue(self.webhdfs.append_file(self.path,
+                                                 io.BytesIO(b'4567')))
+        self.assertTrue(self.webhdfs.append_file(
+            self.path, (chunk for chunk in [b'8', b'9'])))
+        self.assertEqual(b'0123456789', self.webhdfs.read_file(self.path))
+        self.assertEqual(b'234', b''.join(self.webhdfs.stream_file(
+            self.path, offset=2, length=3)))
+        self.assertEqual(
+            [(NAMENODE, 'PUT', 'CREATE', '/' + self.path),
+             (DATANODE, 'PUT', 'CREATE', '/' + self.path)],
+            self.cluster.requests('CREATE'))
+
+    def test_existing_files_are_not_overwritten(self):
+        self.webhdfs.create_file(self.path, b'0123')
+        with self.assertRaises(errors.PyWebHdfsException):
+            self.webhdfs.create_file(self.path, b'4567')
+        self.webhdfs.create_file(self.path, b'4567', overwrite=True)
+        self.assertEqual(b'4567', self.webhdfs.read_file(self.path))
+
+    def test_metadata_operations(self):
+        self.webhdfs.make_dir('user/hdfs/dir')
+        for name in ('c', 'a', 'b'):
+            self.webhdfs.create_file('user/hdfs/dir/' + name, name * 3)
+        status = self.webhdfs.get_file_dir_status('user/hdfs/dir/a')
+        self.assertEqual(3, status['FileStatus']['length'])
+        self.assertEqual('FILE', status['FileStatus']['type'])
+        self.assertEqual(
+            ['a', 'b', 'c'],
+            [file_status['pathSuffix'] for file_status in
+             self.webhdfs.iter_dir('user/hdfs/dir')])
+        self.assertEqual(2, len(self.cluster.requests('LISTSTATUS_BATCH')))
+        summary = self.webhdfs.get_content_summary('user/hdfs')
+        self.assertEqual(3, summary['ContentSummary']['fileCount'])
+        self.assertEqual(9, summary['ContentSummary']['length'])
+
+        self.assertTrue(self.webhdfs.rename_file_dir(
+            'user/hdfs/dir/a', '/user/hdfs/d')['boolean'])
+        self.assertFalse(self.webhdfs.exists_file_dir('user/hdfs/dir/a'))
+        with self.assertRaises(errors.PyWebHdfsException):
+            self.webhdfs.delete_file_dir('user/hdfs/dir')
+        self.webhdfs.delete_file_dir('user/hdfs/dir', recursive=True)
+        self.assertFalse(self.webhdfs.exists_file_dir('user/hdfs/dir'))
+        with self.assertRaises(errors.FileNotFound):
+            self.webhdfs.read_file('user/hdfs/dir/b')
+
+    def test_upload_file_overwrites_atomically(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        local_path = os.path.join(directory, 'upload')
+        with open(local_path, 'wb') as local_file:
+            local_file.write(b'0123456789')
+        self.webhdfs.create_file(self.path, b'old')
+        self.webhdfs.upload_file(local_path, self.path, parallelism=2,
+                                 blocksize=4, overwrite=True)
+        self.assertEqual(b'0123456789', self.webhdfs.read_file(self.path))
+        self.assertEqual([], self.cluster.requests('DELETE'))
+        with self.assertRaises(errors.FileNotFound):
+            self.webhdfs.rename_file_dir('missing', self.path,
+                                         overwrite=True)
+        self.assertEqual(b'0123456789', self.webhdfs.read_file(self.path))
+
+    def test_redirected_requests_are_reported_per_host(self):
+        self.webhdfs.create_file(self.path, b'0123')
+        events = []
+        self.webhdfs.metrics_listeners.append(events.append)
+        self.webhdfs.read_file(self.path)
+        namenode = [event for event in events
+                    if event.kind == metrics.REQUEST and event.status == 307]
+        datanode = [event for event in events
+                    if event.kind == metrics.DATANODE]
+        self.assertEqual(1, len(namenode))
+        self.assertIn(namenode[0].host, self.cluster.namenode_hosts)
+        self.assertEqual(1, len(datanode))
+        self.assertEqual(self.cluster.datanode_host, datanode[0].host)
+        self.assertEqual(200, datanode[0].status)
+
+    def test_pool_stats_tell_datanode_requests_apart(self):
+        # the datanode listens on the address of the namenodes
+        self.webhdfs.create_file(self.path, b'0123')
+        self.webhdfs.read_file(self.path)
+        stats = self.webhdfs.pool_stats()
+        self.assertEqual(2, stats['datanode']['requests'])
+        self.assertGreater(stats['namenode']['requests'], 0)
+
+    def test_xattrs(self):
+        self.webhdfs.create_file(self.path, b'0123')
+        self.webhdfs.set_xattr(self.path, 'user.kind', 'example')
+        self.assertEqual(
+            {'XAttrs': [{'name': 'user.kind', 'value': 'example'}]},
+            self.webhdfs.get_xattr(self.path, 'user.kind'))
+        self.assertEqual({'XAttrNames': '["user.kind"]'},
+                         self.webhdfs.list_xattrs(self.path))
+        self.webhdfs.delete_xattr(self.path, 'user.kind')
+        with self.assertRaises(errors.PyWebHdfsException):
+            self.webhdfs.get_xattr(self.path, 'user.kind')
+
+    def test_checksum_depends_on_content(self):
+        self.webhdfs.create_file(self.path, b'0123')
+        self.webhdfs.create_file('user/hdfs/other.txt', b'0124')
+        checksum = self.webhdfs.get_file_checksum(self.path)['FileChecksum']
+        self.assertEqual('MD5-of-0MD5-of-512CRC32', checksum['algorithm'])
+        self.assertEqual(56, len(checksum['bytes']))
+        self.assertNotEqual(checksum, self.webhdfs.get_file_checksum(
+            'user/hdfs/other.txt')['FileChecksum'])
+
+    def test_parallel_upload_and_download(self):
+        directory = tempfile.mkdtemp()
+        try:
+            local_path = os.path.join(directory, 'source')
+            data = os.urandom(100000)
+            with open(local_path, 'wb') as local_file:
+                local_file.write(data)
+            self.webhdfs.upload_file(local_path, self.path, parallelism=3,
+                                     blocksize=32768)
+            self.assertEqual(1, len(self.cluster.requests('CONCAT')))
+            self.assertEqual(data, self.webhdfs.read_file(self.path))
+            self.assertEqual(
+                [data[10:20], data[99990:]],
+                self.webhdfs.read_ranges(self.path,
+                                         [(10, 10), (99990, 10)]))
+            target = os.path.join(directory, 'target')
+            self.webhdfs.download_file(self.path, target, parallelism=3,
+                                       part_size=40000)
+            with open(target, 'rb') as local_file:
+                self.assertEqual(data, local_file.read())
+        finally:
+            shutil.rmtree(directory)
+
+    def test_standby_namenodes_are_skipped(self):
+        self.webhdfs.create_file(self.path, b'0123')
+        self.cluster.failover()
+        self.assertEqual(b'0123', self.webhdfs.read_file(self.path))
+        self.assertEqual(tuple(reversed(self.cluster.namenode_hosts)),
+                         self.webhdfs.namenodes.hosts(0))
+
+    def test_injected_failures_are_retried(self):
+        self.webhdfs.retry_policy = RetryPolicy(base_delay=0.01,
+                                                max_delay=0.01)
+        self.cluster.fail_next(status=DROP)
+        self.cluster.fail_next(role=DATANODE)
+        self.assertTrue(self.webhdfs.create_file(self.path, b'0123'))
+        self.assertEqual(2, len(self.cluster.requests(role=DATANODE)))
+        self.cluster.fail_next(3)
+        with self.assertRaises(errors.PyWebHdfsException):
+            self.webhdfs.get_file_dir_status(self.path)
+
+    def test_noredirect_locations(self):
+        webhdfs = self.cluster.client(noredirect=True)
+        try:
+            self.assertTrue(webhdfs.create_file(self.path, b'0123'))
+        finally:
+            webhdfs.close()
+        self.assertEqual(b'0123', self.webhdfs.read_file(self.path))
+
+
+class WhenTestingFakeWebHdfsFaults(unittest.TestCase):
+
+    def test_latency_and_bandwidth(self):
+        with FakeWebHdfs(latency=0.05, bandwidth=100000) as cluster:
+            webhdfs = cluster.client()
+            started = time.time()
+            webhdfs.create_file('a', b'0' * 10000)
+            # two requests, and 0.1s to send the data
+            self.assertGreaterEqual(time.time() - started, 0.19)
+            webhdfs.close()
+
+    def test_random_failures(self):
+        with FakeWebHdfs(failure_rate=1.0) as cluster:
+            webhdfs = cluster.client(max_tries=1)
+            with self.assertRaises(errors.PyWebHdfsException):
+                webhdfs.make_dir('a')
+            webhdfs.close()
+
+    def test_hedged_reads_transfer_the_file_once(self):
+        with FakeWebHdfs(bandwidth=4 * 1024 * 1024) as cluster:
+            webhdfs = cluster.client(hedge=True)
+            webhdfs.create_file('a', b'0' * 1024 * 1024)
+            for _ in range(3):
+                self.assertEqual(1024 * 1024, len(webhdfs.read_file('a')))
+            # the datanode sends the headers before the throttled data,
+            # so slow transfers are not hedged
+            self.assertEqual(3, len(cluster.requests('OPEN', DATANODE)))
+            webhdfs.close()
@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+import unittest
+
+from pywebhdfs.uri import UriBuilder, encode_param
+
+
+class WhenTestingUriBuilder(unittest.TestCase):
+
+    def setUp(self):
+        self.builder = UriBuilder('http://{host}:50070/webhdfs/v1/',
+                                  'username')
+
+    def test_uri_with_params(self):
+        uri = self.builder.uri('nn1', '/user/hdfs', 'CREATE',
+                               {'overwrite': True})
+        self.assertEqual(
+            'http://nn1:50070/webhdfs/v1/user/hdfs?op=CREATE&overwrite=true'
+            '&user.name=username', uri)
+
+    def test_request_without_user(self):
+        builder = UriBuilder('http://{host}:50070/webhdfs/v1/')
+        self.assertEqual('user/hdfs?op=OPEN',
+                         builder.request('user/hdfs', 'OPEN', {}))
+
+    def test_prefix_is_cached_per_host(self):
+        prefix = self.builder.prefix('nn1')
+        self.assertEqual('http://nn1:50070/webhdfs/v1/', prefix)
+        self.assertIs(prefix, self.builder.prefix('nn1'))
+        self.assertEqual('http://nn2:50070/webhdfs/v1/',
+                         self.builder.prefix('nn2'))
+
+    def test_path_is_quoted(self):
+        self.assertEqual(
+            'user/h%C3%A9llo%20w?op=OPEN&user.name=username',
+            self.builder.request(u'/user/héllo w', 'OPEN', {}))
+
+    def test_param_encoding(self):
+        self.assertEqual('true', encode_param(True))
+        self.assertEqual('false', encode_param(False))
+        self.assertEqual('1024', encode_param(1024))
+        self.assertEqual('a+b%2Fc', encode_param(u'a b/c'))
+        self.assertEqual('a+b', encode_param(b'a b'))
+        self.assertEqual('%C3%A9', encode_param(u'é'))
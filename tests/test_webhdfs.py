@@ -1,5 +1,12 @@
 from six.moves import http_client
+import io
+import json
+import os
+import shutil
+import tempfile
+import threading
 import unittest
+import time
 import types
 
 import requests
@@ -8,7 +15,15 @@ from mock import MagicMock
 from mock import patch
 
 from pywebhdfs import errors
-from pywebhdfs.webhdfs import PyWebHdfsClient, _raise_pywebhdfs_exception
+from pywebhdfs import metrics
+from pywebhdfs.batch import Batch
+from pywebhdfs.blockcache import BlockCache
+from pywebhdfs.cache import MetadataCache
+from pywebhdfs.metrics import MetricsAggregator
+from pywebhdfs.retry import CircuitBreaker, RetryPolicy
+from pywebhdfs.status import FileStatus
+from pywebhdfs.webhdfs import (PyWebHdfsClient, _merge_ranges,
+                               _raise_pywebhdfs_exception, _split_ranges)
 from pywebhdfs import operations
 
 
@@ -39,6 +54,29 @@ class WhenTestingPyWebHdfsConstructor(unittest.TestCase):
         webhdfs = PyWebHdfsClient(path_to_hosts=path_to_hosts)
         self.assertIsNotNone(webhdfs.path_to_hosts)
 
+    def test_init_mounts_pool_adapter(self):
+        webhdfs = PyWebHdfsClient(
+            path_to_hosts=[('.*', ['nn1', 'nn2:50070'])],
+            pool_maxsize=20, namenode_pool_maxsize=40)
+        self.assertIs(webhdfs.adapter,
+                      webhdfs.session.get_adapter('http://dn1:50075/'))
+        self.assertEqual(['nn1:50070', 'nn2:50070'],
+                         sorted(webhdfs.adapter.namenode_hosts))
+        self.assertEqual(40, webhdfs.adapter.namenode_maxsize)
+        self.assertIn('datanode', webhdfs.pool_stats())
+
+    def test_namenode_pools_default_to_the_port_of_the_scheme(self):
+        webhdfs = PyWebHdfsClient(
+            path_to_hosts=[('.*', ['nn1'])],
+            base_uri_pattern='https://{host}/webhdfs/v1/')
+        self.assertEqual(['nn1:443'], webhdfs.adapter.namenode_hosts)
+
+    def test_batch_uses_client(self):
+        webhdfs = PyWebHdfsClient()
+        batch = webhdfs.batch()
+        self.assertIsInstance(batch, Batch)
+        self.assertIs(webhdfs, batch.client)
+
 
 class WhenTestingCreateOperation(unittest.TestCase):
 
@@ -120,6 +158,172 @@ class WhenTestingCreateOperation(unittest.TestCase):
             with self.assertRaises(requests.exceptions.ConnectionError):
                 self.webhdfs.create_file(self.path, self.file_data)
 
+    def test_create_retries_unavailable_datanodes(self):
+        self.init_response.status_code = http_client.TEMPORARY_REDIRECT
+        unavailable = MagicMock()
+        unavailable.status_code = http_client.SERVICE_UNAVAILABLE
+        self.response.status_code = http_client.CREATED
+        self.requests.side_effect = [
+            self.init_response, unavailable,
+            self.init_response, self.response]
+        with patch('pywebhdfs.webhdfs.sleep'):
+            with patch('requests.sessions.Session.put', self.requests):
+                result = self.webhdfs.create_file(self.path, self.file_data)
+        self.assertTrue(result)
+        self.assertEqual(4, self.requests.call_count)
+
+    def test_create_reports_metrics_events(self):
+        self.webhdfs.metrics_listeners.append(MetricsAggregator())
+        events = []
+        self.webhdfs.metrics_listeners.append(events.append)
+        self.init_response.status_code = http_client.TEMPORARY_REDIRECT
+        unavailable = MagicMock()
+        unavailable.status_code = http_client.SERVICE_UNAVAILABLE
+        self.response.status_code = http_client.CREATED
+        self.requests.side_effect = [
+            self.init_response, unavailable,
+            self.init_response, self.response]
+        with patch('pywebhdfs.webhdfs.sleep'):
+            with patch('requests.sessions.Session.put', self.requests):
+                self.webhdfs.create_file(self.path, self.file_data)
+        self.assertEqual(
+            [metrics.REQUEST, metrics.TRANSFER, metrics.RETRY,
+             metrics.REQUEST, metrics.TRANSFER],
+            [event.kind for event in events])
+        self.assertEqual(self.host, events[0].host)
+        self.assertEqual(http_client.TEMPORARY_REDIRECT, events[0].status)
+        self.assertEqual(6, events[-1].nbytes)
+        self.assertEqual(metrics.SENT, events[-1].direction)
+        self.assertEqual(
+            {('CREATE', metrics.SENT): 12},
+            self.webhdfs.metrics_listeners[0].snapshot()['transfer_bytes'])
+
+    def test_failing_metrics_listeners_are_ignored(self):
+        def listener(event):
+            raise ValueError
+        self.webhdfs.metrics_listeners.append(listener)
+        self.init_response.status_code = http_client.TEMPORARY_REDIRECT
+        self.response.status_code = http_client.CREATED
+        self.requests.side_effect = [self.init_response, self.response]
+        with patch('requests.sessions.Session.put', self.requests):
+            self.assertTrue(
+                self.webhdfs.create_file(self.path, self.file_data))
+
+    def test_create_streams_file_objects(self):
+        self.init_response.status_code = http_client.TEMPORARY_REDIRECT
+        self.response.status_code = http_client.CREATED
+        bodies = []
+
+        def put(uri, data=None, **kwargs):
+            if uri == self.location:
+                bodies.append(b''.join(data))
+                if len(bodies) == 1:
+                    raise requests.exceptions.ConnectionError
+                return self.response
+            return self.init_response
+
+        file_data = io.BytesIO(b'0123456789')
+        self.webhdfs.upload_chunk_size = 4
+        with patch('pywebhdfs.webhdfs.sleep'):
+            with patch('requests.sessions.Session.put',
+                       MagicMock(side_effect=put)):
+                result = self.webhdfs.create_file(self.path, file_data)
+        self.assertTrue(result)
+        self.assertEqual([b'0123456789', b'0123456789'], bodies)
+
+    def test_create_resumes_iterators_with_append(self):
+        self.init_response.status_code = http_client.TEMPORARY_REDIRECT
+        self.response.status_code = http_client.OK
+        status_response = MagicMock()
+        status_response.status_code = http_client.OK
+        status_response.json.return_value = {'FileStatus': {'length': 4}}
+        sent = []
+
+        def put(uri, data=None, **kwargs):
+            if uri == self.location:
+                for chunk in data:
+                    sent.append(chunk)
+                    if len(sent) == 2:
+                        raise requests.exceptions.ConnectionError
+            return self.init_response
+
+        def post(uri, data=None, **kwargs):
+            if uri == self.location:
+                sent.extend(data)
+                return self.response
+            self.assertIn('op=APPEND', uri)
+            self.assertNotIn('overwrite', uri)
+            return self.init_response
+
+        with patch('pywebhdfs.webhdfs.sleep'):
+            with patch('requests.sessions.Session.put',
+                       MagicMock(side_effect=put)):
+                with patch('requests.sessions.Session.post',
+                           MagicMock(side_effect=post)):
+                    with patch('requests.sessions.Session.get',
+                               MagicMock(return_value=status_response)):
+                        result = self.webhdfs.create_file(
+                            self.path, iter([b'0123', b'4567', b'89']),
+                            overwrite=True)
+        self.assertTrue(result)
+        self.assertEqual([b'0123', b'4567', b'4567', b'89'], sent)
+
+    def test_create_with_noredirect_reads_location_from_body(self):
+        self.webhdfs.noredirect = True
+        self.init_response.status_code = http_client.OK
+        self.init_response.json.return_value = {'Location': 'json_uri'}
+        self.response.status_code = http_client.CREATED
+        self.requests.side_effect = [self.init_response, self.response]
+        with patch('requests.sessions.Session.put', self.requests):
+            result = self.webhdfs.create_file(self.path, self.file_data)
+        self.assertTrue(result)
+        self.assertIn('noredirect=true',
+                      self.requests.call_args_list[0][0][0])
+        self.requests.assert_called_with(
+            'json_uri', headers=self.expected_headers, data=self.file_data)
+
+    def test_create_with_noredirect_accepts_redirects(self):
+        self.webhdfs.noredirect = True
+        self.init_response.status_code = http_client.TEMPORARY_REDIRECT
+        self.response.status_code = http_client.CREATED
+        self.requests.side_effect = [self.init_response, self.response]
+        with patch('requests.sessions.Session.put', self.requests):
+            self.assertTrue(
+                self.webhdfs.create_file(self.path, self.file_data))
+
+    def test_create_files_prefetches_next_location(self):
+        calls = []
+        requested = dict((name, threading.Event()) for name in 'abc')
+        overlapped = []
+
+        def put(uri, data=None, **kwargs):
+            if data is None:
+                name = uri.split('?')[0].rsplit('/', 1)[1]
+                calls.append(('namenode', name))
+                requested[name].set()
+                response = MagicMock()
+                response.status_code = http_client.TEMPORARY_REDIRECT
+                response.headers = {'location': 'datanode/' + name}
+                return response
+            name = uri.rsplit('/', 1)[1]
+            calls.append(('datanode', name))
+            if name != 'c':
+                # the next location is requested during this upload
+                following = chr(ord(name) + 1)
+                overlapped.append(requested[following].wait(5))
+            return self.response
+
+        self.response.status_code = http_client.CREATED
+        files = [('user/a', b'1'), ('user/b', b'2'), ('user/c', b'3')]
+        with patch('requests.sessions.Session.put',
+                   MagicMock(side_effect=put)):
+            result = self.webhdfs.create_files(iter(files), overwrite=True)
+        self.assertTrue(result)
+        self.assertEqual(['a', 'b', 'c'],
+                         [name for kind, name in calls if kind == 'datanode'])
+        self.assertEqual([True, True], overlapped)
+        self.assertEqual(6, len(calls))
+
 
 class WhenTestingAppendOperation(unittest.TestCase):
 
@@ -197,6 +401,86 @@ class WhenTestingAppendOperation(unittest.TestCase):
                 self.webhdfs.append_file(self.path, self.file_data)
 
 
+class WhenTestingUploadOperation(unittest.TestCase):
+
+    def setUp(self):
+
+        self.webhdfs = PyWebHdfsClient(host='hostname', port='00000',
+                                       user_name='username')
+        self.path = 'user/hdfs/file'
+        self.file_data = b'0123456789abcdefghij'
+        self.tmp_dir = tempfile.mkdtemp()
+        self.local_path = os.path.join(self.tmp_dir, 'file')
+        with open(self.local_path, 'wb') as local_file:
+            local_file.write(self.file_data)
+        self.parts = {}
+
+        def create_file(path, data, **kwargs):
+            self.parts[path] = data.read()
+            return True
+        self.webhdfs.create_file = MagicMock(side_effect=create_file)
+        self.webhdfs.concat_files = MagicMock(return_value=True)
+        self.webhdfs.rename_file_dir = MagicMock(
+            return_value={'boolean': True})
+        self.webhdfs.delete_file_dir = MagicMock(return_value=True)
+        self.webhdfs.exists_file_dir = MagicMock(return_value=False)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_upload_writes_parts_and_concats(self):
+        result = self.webhdfs.upload_file(self.local_path, self.path,
+                                          parallelism=3, blocksize=4)
+        self.assertTrue(result)
+        names = sorted(self.parts,
+                       key=lambda name: int(name.split('part')[-1]))
+        self.assertEqual(self.file_data,
+                         b''.join(self.parts[name] for name in names))
+        self.assertEqual([b'01234567', b'89abcdef', b'ghij'],
+                         [self.parts[name] for name in names])
+        for name in names:
+            self.assertTrue(name.startswith('/user/hdfs/.file.'))
+        self.webhdfs.concat_files.assert_called_with(names[0], names[1:])
+        self.webhdfs.rename_file_dir.assert_called_with(
+            names[0], '/' + self.path, overwrite=False)
+        _, kwargs = self.webhdfs.create_file.call_args
+        self.assertEqual({'overwrite': True, 'blocksize': 4}, kwargs)
+
+    def test_upload_single_part_skips_concat(self):
+        self.webhdfs.upload_file(self.local_path, self.path, parallelism=1)
+        self.assertEqual(1, len(self.parts))
+        self.assertFalse(self.webhdfs.concat_files.called)
+
+    def test_upload_overwrite_renames_over_existing_file(self):
+        self.webhdfs.exists_file_dir.return_value = True
+        self.webhdfs.upload_file(self.local_path, self.path, overwrite=True)
+        self.assertFalse(self.webhdfs.delete_file_dir.called)
+        args, kwargs = self.webhdfs.rename_file_dir.call_args
+        self.assertEqual('/' + self.path, args[1])
+        self.assertEqual({'overwrite': True}, kwargs)
+
+    def test_upload_cleans_up_parts_on_failure(self):
+        self.webhdfs.concat_files.side_effect = errors.BadRequest
+        with self.assertRaises(errors.BadRequest):
+            self.webhdfs.upload_file(self.local_path, self.path,
+                                     parallelism=2, blocksize=8)
+        deleted = set(args[0] for args, _ in
+                      self.webhdfs.delete_file_dir.call_args_list)
+        self.assertEqual(set(self.parts), deleted)
+        self.assertFalse(self.webhdfs.rename_file_dir.called)
+
+    def test_concat_sends_absolute_sources(self):
+        webhdfs = PyWebHdfsClient(host='hostname', port='00000')
+        response = MagicMock()
+        response.status_code = http_client.OK
+        requests_post = MagicMock(return_value=response)
+        with patch('requests.sessions.Session.post', requests_post):
+            result = webhdfs.concat_files('user/a', ['user/b', '/user/c'])
+        self.assertTrue(result)
+        uri = requests_post.call_args[0][0]
+        self.assertIn('op=CONCAT&sources=%2Fuser%2Fb%2C%2Fuser%2Fc', uri)
+
+
 class WhenTestingOpenOperation(unittest.TestCase):
 
     def setUp(self):
@@ -237,6 +521,303 @@ class WhenTestingOpenOperation(unittest.TestCase):
             result = self.webhdfs.stream_file(self.path)
         self.assertIsInstance(result, types.GeneratorType)
 
+    def test_stream_reports_bytes_received(self):
+        events = []
+        self.webhdfs.metrics_listeners.append(events.append)
+        self.response.status_code = http_client.OK
+        self.response.iter_content.return_value = [b'0101', b'', b'10']
+        self.requests.return_value = self.response
+        with patch('requests.sessions.Session.get', self.requests):
+            list(self.webhdfs.stream_file(self.path))
+        self.assertEqual([metrics.REQUEST, metrics.TRANSFER],
+                         [event.kind for event in events])
+        self.assertEqual(6, events[1].nbytes)
+        self.assertEqual(metrics.RECEIVED, events[1].direction)
+
+    def test_read_reports_the_datanode_transfer(self):
+        events = []
+        self.webhdfs.metrics_listeners.append(events.append)
+        self.response.status_code = http_client.OK
+        self.response.url = 'http://dn1:1022/webhdfs/v1/user/hdfs?op=OPEN'
+
+        def get(*args, **kwargs):
+            # namenode and redirect time, not part of the transfer
+            time.sleep(0.2)
+            return self.response
+        with patch('requests.sessions.Session.get',
+                   MagicMock(side_effect=get)):
+            self.webhdfs.read_file(self.path)
+        self.assertEqual([metrics.REQUEST, metrics.TRANSFER],
+                         [event.kind for event in events])
+        self.assertEqual('dn1:1022', events[1].host)
+        self.assertLess(events[1].seconds, 0.1)
+
+    def test_stream_uses_session(self):
+
+        self.response.status_code = http_client.OK
+        self.response.iter_content.return_value = [b'0101', b'', b'10']
+        self.requests.return_value = self.response
+        with patch('requests.sessions.Session.get', self.requests):
+            result = list(self.webhdfs.stream_file(self.path))
+        self.assertEqual([b'0101', b'10'], result)
+        args, kwargs = self.requests.call_args
+        self.assertTrue(kwargs['stream'])
+        self.assertNotIn('stream=', args[0])
+
+    def _raw(self, data):
+        stream = io.BytesIO(data)
+        raw = MagicMock()
+        raw.readinto.side_effect = stream.readinto
+        return raw
+
+    def test_stream_into_buffer(self):
+
+        self.response.status_code = http_client.OK
+        self.response.raw = self._raw(b'0123456789')
+        self.requests.return_value = self.response
+        buf = bytearray(8)
+        with patch('requests.sessions.Session.get', self.requests):
+            result = self.webhdfs.stream_file_into(self.path, buf,
+                                                   chunk_size=3)
+        self.assertEqual(8, result)
+        self.assertEqual(b'01234567', bytes(buf))
+        self.assertTrue(self.response.close.called)
+
+    def test_stream_into_file(self):
+
+        self.response.status_code = http_client.OK
+        self.response.raw = self._raw(b'0123456789')
+        self.requests.return_value = self.response
+        target = io.BytesIO()
+        with patch('requests.sessions.Session.get', self.requests):
+            result = self.webhdfs.stream_file_into(self.path, target,
+                                                   chunk_size=4)
+        self.assertEqual(10, result)
+        self.assertEqual(b'0123456789', target.getvalue())
+
+    def test_stream_into_throws_exception_for_not_ok(self):
+
+        self.response.status_code = http_client.BAD_REQUEST
+        self.requests.return_value = self.response
+        with patch('requests.sessions.Session.get', self.requests):
+            with self.assertRaises(errors.PyWebHdfsException):
+                self.webhdfs.stream_file_into(self.path, bytearray(4))
+
+    def test_open_read_returns_buffered_reader(self):
+
+        self.response.status_code = http_client.OK
+        self.response.json.return_value = {'FileStatus': {'length': 6}}
+        self.requests.return_value = self.response
+        with patch('requests.sessions.Session.get', self.requests):
+            result = self.webhdfs.open_read(self.path)
+        self.assertIsInstance(result, io.BufferedReader)
+        self.assertTrue(result.seekable())
+
+
+class WhenTestingBlockCacheReads(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.cache = BlockCache(self.directory, max_bytes=1024, block_size=4)
+        self.webhdfs = PyWebHdfsClient(host='hostname', port='00000',
+                                       block_cache=self.cache)
+        self.path = 'user/hdfs/data.bin'
+        self.data = b'0123456789'
+        self.modification_time = 1
+        self.opens = []
+        self.requests = MagicMock(side_effect=self._get)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def _get(self, uri, **kwargs):
+        response = MagicMock()
+        response.status_code = http_client.OK
+        params = dict(param.split('=') for param in
+                      uri.split('?', 1)[1].split('&'))
+        if params['op'] == 'GETFILESTATUS':
+            response.json.return_value = {'FileStatus': {
+                'length': len(self.data),
+                'modificationTime': self.modification_time}}
+            return response
+        offset, length = int(params['offset']), int(params['length'])
+        self.opens.append((offset, length))
+        response.raw = io.BytesIO(self.data[offset:offset + length])
+        return response
+
+    def test_read_file_fetches_missing_blocks_once(self):
+        with patch('requests.sessions.Session.get', self.requests):
+            first = self.webhdfs.read_file(self.path)
+            second = self.webhdfs.read_file(self.path)
+        self.assertEqual(self.data, first)
+        self.assertEqual(self.data, second)
+        self.assertEqual([(0, 10)], self.opens)
+        stats = self.cache.stats()
+        self.assertEqual(3, stats['blocks'])
+        self.assertEqual(10, stats['bytes_saved'])
+
+    def test_ranges_only_fetch_missing_blocks(self):
+        with patch('requests.sessions.Session.get', self.requests):
+            self.assertEqual(b'56', self.webhdfs.read_file(
+                self.path, offset=5, length=2))
+            self.assertEqual(b'3456789', self.webhdfs.read_file(
+                self.path, offset=3))
+        self.assertEqual([(4, 4), (0, 4), (8, 2)], self.opens)
+
+    def test_stream_file_reads_through_cache(self):
+        with patch('requests.sessions.Session.get', self.requests):
+            list(self.webhdfs.stream_file(self.path))
+            chunks = list(self.webhdfs.stream_file(self.path, chunk_size=3))
+        self.assertEqual([b'012', b'3', b'456', b'7', b'89'], chunks)
+        self.assertEqual(1, len(self.opens))
+
+    def test_changed_files_are_fetched_again(self):
+        with patch('requests.sessions.Session.get', self.requests):
+            self.webhdfs.read_file(self.path)
+            self.data = b'abcdefghij'
+            self.modification_time = 2
+            self.assertEqual(self.data, self.webhdfs.read_file(self.path))
+        self.assertEqual(2, len(self.opens))
+
+
+class WhenTestingDownloadOperation(unittest.TestCase):
+
+    def setUp(self):
+
+        self.host = 'hostname'
+        self.port = '00000'
+        self.user_name = 'username'
+        self.webhdfs = PyWebHdfsClient(host=self.host, port=self.port,
+                                       user_name=self.user_name)
+        self.path = 'user/hdfs/file'
+        self.file_data = b'0123456789abcdefghij'
+        self.tmp_dir = tempfile.mkdtemp()
+        self.local_path = os.path.join(self.tmp_dir, 'file')
+        self.ranges = []
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def _status_response(self, block_size):
+        response = MagicMock()
+        response.status_code = http_client.OK
+        response.json.return_value = {'FileStatus': {
+            'length': len(self.file_data), 'blockSize': block_size}}
+        return response
+
+    def _open_response(self, uri):
+        params = dict(p.split('=') for p in uri.split('?')[1].split('&'))
+        offset = int(params['offset'])
+        length = int(params['length'])
+        self.ranges.append((offset, length))
+        response = MagicMock()
+        response.status_code = http_client.OK
+        data = self.file_data[offset:offset + length]
+        response.iter_content.return_value = [data[:3], data[3:]]
+        return response
+
+    def _get(self, block_size):
+        def get(uri, **kwargs):
+            if 'op=GETFILESTATUS' in uri:
+                return self._status_response(block_size)
+            return self._open_response(uri)
+        return get
+
+    def test_download_writes_file(self):
+        with patch('requests.sessions.Session.get',
+                   MagicMock(side_effect=self._get(8))):
+            result = self.webhdfs.download_file(
+                self.path, self.local_path, parallelism=3, part_size=4)
+        self.assertTrue(result)
+        with open(self.local_path, 'rb') as local_file:
+            self.assertEqual(self.file_data, local_file.read())
+        self.assertEqual(sorted(self.ranges),
+                         [(0, 4), (4, 4), (8, 4), (12, 4), (16, 4)])
+
+    def test_download_defaults_to_block_sized_ranges(self):
+        with patch('requests.sessions.Session.get',
+                   MagicMock(side_effect=self._get(8))):
+            self.webhdfs.download_file(self.path, self.local_path)
+        self.assertEqual(sorted(self.ranges), [(0, 8), (8, 8), (16, 4)])
+
+    def test_download_retries_failed_range_from_last_byte(self):
+        failures = [requests.exceptions.ConnectionError]
+
+        def get(uri, **kwargs):
+            if 'op=GETFILESTATUS' in uri:
+                return self._status_response(32)
+            response = self._open_response(uri)
+            if failures:
+                chunks = response.iter_content.return_value
+
+                def iter_content(chunk_size):
+                    yield chunks[0]
+                    raise failures.pop()
+                response.iter_content = iter_content
+            return response
+
+        with patch('pywebhdfs.webhdfs.sleep'):
+            with patch('requests.sessions.Session.get',
+                       MagicMock(side_effect=get)):
+                self.webhdfs.download_file(self.path, self.local_path)
+        with open(self.local_path, 'rb') as local_file:
+            self.assertEqual(self.file_data, local_file.read())
+        self.assertEqual(self.ranges, [(0, 20), (3, 17)])
+
+    def test_download_throws_exception_for_not_ok(self):
+        response = MagicMock()
+        response.status_code = http_client.NOT_FOUND
+        with patch('requests.sessions.Session.get',
+                   MagicMock(return_value=response)):
+            with self.assertRaises(errors.FileNotFound):
+                self.webhdfs.download_file(self.path, self.local_path)
+
+    def test_split_ranges_do_not_cross_blocks(self):
+        self.assertEqual(_split_ranges(10, 3, 5),
+                         [(0, 3), (3, 2), (5, 3), (8, 2)])
+        self.assertEqual(_split_ranges(10, 7, 5), [(0, 5), (5, 5)])
+        self.assertEqual(_split_ranges(0, 3, 5), [])
+
+
+class WhenTestingReadRangesOperation(unittest.TestCase):
+
+    def setUp(self):
+        self.webhdfs = PyWebHdfsClient(host='hostname', port='00000',
+                                       user_name='username')
+        self.path = 'user/hdfs/file'
+        self.file_data = b'0123456789abcdefghij'
+        self.fetched = []
+
+    def _get(self, uri, **kwargs):
+        params = dict(p.split('=') for p in uri.split('?')[1].split('&'))
+        offset = int(params['offset'])
+        length = int(params['length'])
+        self.fetched.append((offset, length))
+        response = MagicMock()
+        response.status_code = http_client.OK
+        response.raw = io.BytesIO(self.file_data[offset:offset + length])
+        return response
+
+    def test_merge_ranges(self):
+        merged = _merge_ranges([(10, 2), (0, 2), (3, 2), (30, 1)], 1, 100)
+        self.assertEqual([
+            (0, 5, [(1, 0, 2), (2, 3, 2)]),
+            (10, 2, [(0, 10, 2)]),
+            (30, 1, [(3, 30, 1)])], merged)
+        self.assertEqual(2, len(_merge_ranges([(0, 4), (4, 4)], 0, 6)))
+        with self.assertRaises(ValueError):
+            _merge_ranges([(-1, 2)], 0, 10)
+
+    def test_read_ranges_returns_views_in_order(self):
+        with patch('requests.sessions.Session.get',
+                   MagicMock(side_effect=self._get)):
+            result = self.webhdfs.read_ranges(
+                self.path, [(16, 2), (1, 2), (4, 3), (18, 10)], max_gap=1)
+        self.assertTrue(all(isinstance(view, memoryview) for view in result))
+        self.assertEqual([b'gh', b'12', b'456', b'ij'],
+                         [view.tobytes() for view in result])
+        self.assertEqual([(1, 6), (16, 12)], sorted(self.fetched))
+
 
 class WhenTestingMkdirOperation(unittest.TestCase):
 
@@ -302,6 +883,18 @@ class WhenTestingRenameOperation(unittest.TestCase):
             result = self.webhdfs.rename_file_dir(self.path, self.new_path)
         self.assertEqual(result, {"boolean": True})
 
+    def test_rename_with_overwrite(self):
+
+        self.response.status_code = http_client.OK
+        self.response.json.side_effect = ValueError
+        self.requests.return_value = self.response
+        with patch('requests.sessions.Session.put', self.requests):
+            result = self.webhdfs.rename_file_dir(self.path, self.new_path,
+                                                  overwrite=True)
+        self.assertEqual(result, {"boolean": True})
+        self.assertIn('renameoptions=OVERWRITE',
+                      self.requests.call_args[0][0])
+
 
 class WhenTestingDeleteOperation(unittest.TestCase):
 
@@ -532,6 +1125,265 @@ class WhenTestingListDirOperation(unittest.TestCase):
             self.assertEqual(result[key], self.file_status[key])
 
 
+class WhenTestingIterDirOperation(unittest.TestCase):
+
+    def setUp(self):
+
+        self.webhdfs = PyWebHdfsClient(host='hostname', port='00000',
+                                       user_name='username')
+        self.path = 'user/hdfs'
+        self.requests = MagicMock()
+
+    def _batch(self, names, remaining):
+        response = MagicMock()
+        response.status_code = http_client.OK
+        response.json.return_value = {'DirectoryListing': {
+            'partialListing': {'FileStatuses': {'FileStatus': [
+                {'pathSuffix': name} for name in names]}},
+            'remainingEntries': remaining}}
+        return response
+
+    def test_iter_dir_pages_with_start_after(self):
+        self.requests.side_effect = [self._batch(['a', 'b'], 1),
+                                     self._batch(['c'], 0)]
+        with patch('requests.sessions.Session.get', self.requests):
+            result = self.webhdfs.iter_dir(self.path)
+            self.assertIsInstance(result, types.GeneratorType)
+            self.assertEqual({'pathSuffix': 'a'}, next(result))
+            self.assertEqual(1, self.requests.call_count)
+            names = [entry['pathSuffix'] for entry in result]
+        self.assertEqual(['b', 'c'], names)
+        first_uri = self.requests.call_args_list[0][0][0]
+        second_uri = self.requests.call_args_list[1][0][0]
+        self.assertIn('op=LISTSTATUS_BATCH', first_uri)
+        self.assertNotIn('startAfter', first_uri)
+        self.assertIn('startAfter=b', second_uri)
+
+    def test_iter_dir_falls_back_to_liststatus(self):
+        unsupported = MagicMock()
+        unsupported.status_code = http_client.BAD_REQUEST
+        listing = MagicMock()
+        listing.status_code = http_client.OK
+        listing.json.return_value = {'FileStatuses': {'FileStatus': [
+            {'pathSuffix': 'a'}]}}
+        self.requests.side_effect = [unsupported, listing]
+        with patch('requests.sessions.Session.get', self.requests):
+            result = list(self.webhdfs.iter_dir(self.path))
+        self.assertEqual([{'pathSuffix': 'a'}], result)
+        self.assertIn('op=LISTSTATUS&',
+                      self.requests.call_args_list[1][0][0])
+
+    def test_iter_dir_throws_exception_for_not_ok(self):
+        response = MagicMock()
+        response.status_code = http_client.NOT_FOUND
+        self.requests.return_value = response
+        with patch('requests.sessions.Session.get', self.requests):
+            with self.assertRaises(errors.FileNotFound):
+                list(self.webhdfs.iter_dir(self.path))
+
+    def test_iter_dir_yields_records(self):
+        self.requests.side_effect = [self._batch(['a'], 0)]
+        with patch('requests.sessions.Session.get', self.requests):
+            result = list(self.webhdfs.iter_dir(self.path, records=True))
+        self.assertIsInstance(result[0], FileStatus)
+        self.assertEqual('a', result[0].path_suffix)
+
+    def test_list_dir_columns(self):
+        response = MagicMock()
+        response.status_code = http_client.OK
+        response.content = json.dumps({'DirectoryListing': {
+            'partialListing': {'FileStatuses': {'FileStatus': [
+                {'pathSuffix': 'a', 'length': 10, 'type': 'FILE',
+                 'modificationTime': 100},
+                {'pathSuffix': 'b', 'length': 0, 'type': 'DIRECTORY',
+                 'modificationTime': 200}]}},
+            'remainingEntries': 0}}).encode('utf8')
+        self.requests.return_value = response
+        webhdfs = PyWebHdfsClient(host='hostname', port='00000',
+                                  json_decoder='json')
+        with patch('requests.sessions.Session.get', self.requests):
+            columns = webhdfs.list_dir_columns(self.path)
+        self.assertFalse(response.json.called)
+        self.assertEqual(['a', 'b'], columns.names)
+        self.assertEqual([10, 0], list(columns.lengths))
+        self.assertEqual([(u'a', 10, 100, False), (u'b', 0, 200, True)],
+                         list(columns))
+
+
+class WhenTestingWalkOperation(unittest.TestCase):
+
+    def setUp(self):
+
+        self.webhdfs = PyWebHdfsClient(host='hostname', port='00000',
+                                       user_name='username')
+        self.tree = {
+            '/user': [self._dir('a'), self._dir('b'), self._file('x', 1)],
+            '/user/a': [self._dir('c'), self._file('y', 2)],
+            '/user/b': [],
+            '/user/a/c': [self._file('z', 4)],
+        }
+        self.webhdfs.iter_dir = MagicMock(
+            side_effect=lambda path: iter(self.tree[path]))
+
+    def _dir(self, name):
+        return {'pathSuffix': name, 'type': 'DIRECTORY', 'length': 0}
+
+    def _file(self, name, length):
+        return {'pathSuffix': name, 'type': 'FILE', 'length': length}
+
+    def test_walk_visits_every_directory(self):
+        result = dict((dirpath, (dirs, files)) for dirpath, dirs, files
+                      in self.webhdfs.walk('user/', max_workers=2))
+        self.assertEqual(sorted(self.tree), sorted(result))
+        dirs, files = result['/user']
+        self.assertEqual(['a', 'b'], [d['pathSuffix'] for d in dirs])
+        self.assertEqual(['x'], [f['pathSuffix'] for f in files])
+
+    def test_walk_respects_max_depth(self):
+        result = [dirpath for dirpath, _, _
+                  in self.webhdfs.walk('user', max_depth=1)]
+        self.assertEqual(['/user', '/user/a', '/user/b'], sorted(result))
+
+    def test_walk_does_not_descend_into_pruned_dirs(self):
+        result = []
+        for dirpath, dirs, files in self.webhdfs.walk('user'):
+            result.append(dirpath)
+            dirs[:] = [d for d in dirs if d['pathSuffix'] != 'a']
+        self.assertEqual(['/user', '/user/b'], sorted(result))
+
+    def test_find_yields_matching_paths(self):
+        result = [path for path, _ in self.webhdfs.find(
+            'user', lambda path, status: status['type'] == 'FILE')]
+        self.assertEqual(['/user/a/c/z', '/user/a/y', '/user/x'],
+                         sorted(result))
+
+    def test_du_aggregates_sizes(self):
+        self.assertEqual(
+            {'directoryCount': 4, 'fileCount': 3, 'length': 7},
+            self.webhdfs.du('user'))
+
+    def test_walk_propagates_listing_errors(self):
+        self.tree['/user/b'] = None
+        with self.assertRaises(TypeError):
+            list(self.webhdfs.walk('user'))
+
+    def test_walk_passes_listing_errors_to_onerror(self):
+        self.tree['/user/b'] = None
+        failures = []
+        result = [dirpath for dirpath, _, _ in self.webhdfs.walk(
+            'user', onerror=failures.append)]
+        self.assertEqual(['/user', '/user/a', '/user/a/c'], sorted(result))
+        self.assertEqual([TypeError], [type(e) for e in failures])
+        self.assertEqual({'directoryCount': 3, 'fileCount': 3, 'length': 7},
+                         self.webhdfs.du('user', onerror=failures.append))
+
+    def test_walk_does_not_queue_every_subdirectory(self):
+        self.tree = {'/wide': [self._dir(str(i)) for i in range(1000)]}
+        self.tree.update(('/wide/{0}'.format(i), []) for i in range(1000))
+        walker = self.webhdfs.walk('wide', max_workers=2)
+        visited = 0
+        largest = 0
+        for _ in walker:
+            visited += 1
+            largest = max(largest, len(walker.gi_frame.f_locals['pending']))
+        self.assertEqual(1001, visited)
+        self.assertLessEqual(largest, 6)
+
+    def test_walk_skips_deleted_directories(self):
+        del self.tree['/user/a']
+
+        def iter_dir(path):
+            if path not in self.tree:
+                raise errors.FileNotFound
+            return iter(self.tree[path])
+        self.webhdfs.iter_dir = MagicMock(side_effect=iter_dir)
+        result = [dirpath for dirpath, _, _ in self.webhdfs.walk('user')]
+        self.assertEqual(['/user', '/user/b'], sorted(result))
+        with self.assertRaises(errors.FileNotFound):
+            list(self.webhdfs.walk('missing'))
+
+
+class WhenTestingMetadataCache(unittest.TestCase):
+
+    def setUp(self):
+
+        self.webhdfs = PyWebHdfsClient(host='hostname', port='00000',
+                                       user_name='username',
+                                       metadata_cache=MetadataCache())
+        self.path = 'user/hdfs'
+        self.response = MagicMock()
+        self.response.status_code = http_client.OK
+        self.requests = MagicMock(return_value=self.response)
+
+    def test_status_is_cached(self):
+        self.response.json.return_value = {'FileStatus': {'length': 1}}
+        with patch('requests.sessions.Session.get', self.requests):
+            first = self.webhdfs.get_file_dir_status(self.path)
+            second = self.webhdfs.get_file_dir_status('/' + self.path)
+            self.assertTrue(self.webhdfs.exists_file_dir(self.path))
+        self.assertEqual(first, second)
+        self.assertEqual(1, self.requests.call_count)
+        self.assertEqual(2, self.webhdfs.metadata_cache.hits)
+
+    def test_listing_seeds_child_statuses(self):
+        self.response.json.return_value = {'FileStatuses': {'FileStatus': [
+            {'pathSuffix': 'a.txt', 'type': 'FILE', 'length': 2}]}}
+        with patch('requests.sessions.Session.get', self.requests):
+            self.webhdfs.list_dir(self.path)
+            self.webhdfs.list_dir(self.path)
+            status = self.webhdfs.get_file_dir_status('user/hdfs/a.txt')
+        self.assertEqual(1, self.requests.call_count)
+        self.assertEqual(
+            {'FileStatus': {'pathSuffix': '', 'type': 'FILE', 'length': 2}},
+            status)
+
+    def test_modifications_invalidate_cache(self):
+        self.response.json.return_value = {'FileStatuses': {'FileStatus': [
+            {'pathSuffix': 'a.txt', 'type': 'FILE', 'length': 2}]}}
+        with patch('requests.sessions.Session.get', self.requests):
+            self.webhdfs.list_dir(self.path)
+        with patch('requests.sessions.Session.delete', self.requests):
+            self.webhdfs.delete_file_dir('user/hdfs/a.txt')
+        self.assertEqual(0, len(self.webhdfs.metadata_cache))
+
+    def test_rename_invalidates_both_trees(self):
+        cache = self.webhdfs.metadata_cache
+        cache.put('status', 'user/a/x', 1)
+        cache.put('status', 'user/b/y', 2)
+        cache.put('listing', 'user', 3)
+        self.response.json.return_value = {'boolean': True}
+        with patch('requests.sessions.Session.put', self.requests):
+            self.webhdfs.rename_file_dir('user/a', 'user/b')
+        self.assertEqual(0, len(cache))
+
+    def test_create_invalidates_parent_listing(self):
+        cache = self.webhdfs.metadata_cache
+        cache.put('listing', 'user/hdfs', 1)
+        cache.put('status', 'user/hdfs/new', 2)
+        init_response = MagicMock()
+        init_response.status_code = http_client.TEMPORARY_REDIRECT
+        init_response.headers = {'location': 'redirect_uri'}
+        self.response.status_code = http_client.CREATED
+        self.requests.side_effect = [init_response, self.response]
+        with patch('requests.sessions.Session.put', self.requests):
+            self.webhdfs.create_file('user/hdfs/new', b'0101')
+        self.assertEqual(0, len(cache))
+
+    def test_create_invalidates_listings_of_created_ancestors(self):
+        cache = self.webhdfs.metadata_cache
+        cache.put('listing', 'a', {'FileStatuses': {'FileStatus': []}})
+        cache.put('listing', 'other', 1)
+        init_response = MagicMock()
+        init_response.status_code = http_client.TEMPORARY_REDIRECT
+        init_response.headers = {'location': 'redirect_uri'}
+        self.response.status_code = http_client.CREATED
+        self.requests.side_effect = [init_response, self.response]
+        with patch('requests.sessions.Session.put', self.requests):
+            self.webhdfs.create_file('a/b/c', b'x')
+        self.assertIsNone(cache.get('listing', 'a'))
+        self.assertEqual(1, cache.get('listing', 'other'))
+
+
 class WhenTestingFileExistsOperation(unittest.TestCase):
 
     def setUp(self):
@@ -849,6 +1701,83 @@ class WhenTestingResolveHost(unittest.TestCase):
                 self.webhdfs._resolve_host(
                     self.session.put, True, self.path, 'CREATE')
 
+    def test_standby_host_is_skipped(self):
+        webhdfs = PyWebHdfsClient(path_to_hosts=[('.*', ['nn1', 'nn2'])])
+        standby = MagicMock()
+        standby.status_code = http_client.FORBIDDEN
+        standby.json.return_value = {
+            'RemoteException': {'exception': 'StandbyException'}}
+        self.requests.side_effect = [standby, self.response]
+        with patch('requests.sessions.Session.put', self.requests):
+            result = webhdfs._resolve_host(
+                self.session.put, True, self.path, 'CREATE')
+        self.assertIs(self.response, result)
+        self.assertEqual(('nn2', 'nn1'), webhdfs.namenodes.hosts(0))
+        self.assertEqual(['nn1', 'nn2'], webhdfs.path_to_hosts[0][1])
+
+    def test_probed_active_host_is_tried_first(self):
+        webhdfs = PyWebHdfsClient(path_to_hosts=[('.*', ['nn1', 'nn2'])])
+        standby = MagicMock()
+        standby.status_code = http_client.FORBIDDEN
+        standby.json.return_value = {
+            'RemoteException': {'exception': 'StandbyException'}}
+        self.requests.side_effect = [standby, self.response, self.response]
+        with patch('requests.sessions.Session.get', self.requests):
+            webhdfs.namenodes.probe(webhdfs._is_active_namenode)
+            result = webhdfs._resolve_host(
+                self.session.get, True, self.path, 'GETFILESTATUS')
+        self.assertIs(self.response, result)
+        self.assertEqual(('nn2', 'nn1'), webhdfs.namenodes.hosts(0))
+        probe_uri = self.requests.call_args_list[0][0][0]
+        self.assertIn('nn1', probe_uri)
+        self.assertIn('op=GETFILESTATUS', probe_uri)
+        self.assertIn('nn2', self.requests.call_args_list[2][0][0])
+
+    def test_unavailable_responses_are_retried(self):
+        unavailable = MagicMock()
+        unavailable.status_code = http_client.SERVICE_UNAVAILABLE
+        self.requests.side_effect = [unavailable, self.response]
+        with patch('pywebhdfs.webhdfs.sleep') as sleep:
+            with patch('requests.sessions.Session.put', self.requests):
+                result = self.webhdfs._resolve_host(
+                    self.session.put, True, self.path, 'CREATE')
+        self.assertIs(self.response, result)
+        self.assertEqual(1, sleep.call_count)
+        self.assertTrue(unavailable.close.called)
+
+    def test_non_retryable_errors_are_not_retried(self):
+        self.requests.side_effect = requests.exceptions.InvalidURL
+        with self.assertRaises(requests.exceptions.InvalidURL):
+            with patch('requests.sessions.Session.put', self.requests):
+                self.webhdfs._resolve_host(
+                    self.session.put, True, self.path, 'CREATE')
+        self.assertEqual(1, self.requests.call_count)
+
+    def test_hosts_with_open_circuit_are_skipped(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+        webhdfs = PyWebHdfsClient(
+            path_to_hosts=[('.*', ['nn1', 'nn2'])],
+            retry_policy=RetryPolicy(max_tries=1, circuit_breaker=breaker))
+        breaker.record_failure('nn1')
+        with patch('requests.sessions.Session.put', self.requests):
+            result = webhdfs._resolve_host(
+                self.session.put, True, self.path, 'CREATE')
+        self.assertIs(self.response, result)
+        self.assertEqual(1, self.requests.call_count)
+        self.assertIn('nn2', self.requests.call_args[0][0])
+
+        breaker.record_failure('nn2')
+        with self.assertRaises(errors.ActiveHostNotFound):
+            webhdfs._resolve_host(
+                self.session.put, True, self.path, 'CREATE')
+
+    def test_close_stops_probing(self):
+        webhdfs = PyWebHdfsClient(path_to_hosts=[('.*', ['nn1', 'nn2'])],
+                                  ha_probe_interval=60)
+        self.assertIsNotNone(webhdfs.namenodes._thread)
+        webhdfs.close()
+        self.assertIsNone(webhdfs.namenodes._thread)
+
     def test_non_requests_exceptions_bubble_up(self):
         self.requests.side_effect = errors.FileNotFound
         with self.assertRaises(errors.FileNotFound):
@@ -857,6 +1786,94 @@ class WhenTestingResolveHost(unittest.TestCase):
                     self.session.put, True, self.path, 'CREATE')
 
 
+class WhenTestingHedgedRequests(unittest.TestCase):
+
+    def setUp(self):
+        self.webhdfs = PyWebHdfsClient(
+            path_to_hosts=[('.*', ['nn1', 'nn2'])], hedge=True)
+        self.webhdfs.host_latency.default_delay = 0.01
+        self.path = 'user/hdfs'
+        self.release = threading.Event()
+
+    def tearDown(self):
+        self.release.set()
+
+    def _response(self, host):
+        response = MagicMock()
+        response.status_code = http_client.OK
+        response.json.return_value = {'host': host}
+        return response
+
+    def test_slow_primary_is_hedged(self):
+        def get(uri, **kwargs):
+            host = uri.split('/')[2].split(':')[0]
+            if host == 'nn1':
+                self.release.wait(5)
+            return self._response(host)
+
+        with patch('requests.sessions.Session.get',
+                   MagicMock(side_effect=get)):
+            result = self.webhdfs.get_file_dir_status(self.path)
+        self.assertEqual({'host': 'nn2'}, result)
+        self.assertEqual(('nn2', 'nn1'), self.webhdfs.namenodes.hosts(0))
+        stats = self.webhdfs.host_latency.stats()
+        self.assertEqual(1, stats['hedges'])
+        self.assertEqual(1, stats['hedges_won'])
+
+    def test_fast_primary_is_not_hedged(self):
+        self.webhdfs.host_latency.default_delay = 5
+        requests_get = MagicMock(return_value=self._response('nn1'))
+        with patch('requests.sessions.Session.get', requests_get):
+            self.webhdfs.list_dir(self.path)
+        self.assertEqual(1, requests_get.call_count)
+        self.assertEqual(0, self.webhdfs.host_latency.hedges)
+
+    def test_primary_does_not_wait_for_the_backup_workers(self):
+        self.webhdfs.host_latency.default_delay = 5
+        for _ in range(8):
+            self.webhdfs._hedge_executor.submit(self.release.wait, 5)
+        requests_get = MagicMock(return_value=self._response('nn1'))
+        started = time.time()
+        with patch('requests.sessions.Session.get', requests_get):
+            result = self.webhdfs.get_file_dir_status(self.path)
+        self.assertEqual({'host': 'nn1'}, result)
+        self.assertLess(time.time() - started, 1)
+
+    def test_requests_are_not_hedged_when_primary_workers_are_busy(self):
+        webhdfs = PyWebHdfsClient(path_to_hosts=[('.*', ['nn1', 'nn2'])],
+                                  hedge=True, hedge_primary_workers=1)
+        self.addCleanup(webhdfs.close)
+        webhdfs._hedge_primary_slots.acquire()
+        threads = []
+
+        def get(uri, **kwargs):
+            threads.append(threading.current_thread())
+            return self._response('nn1')
+
+        with patch('requests.sessions.Session.get',
+                   MagicMock(side_effect=get)):
+            result = webhdfs.get_file_dir_status(self.path)
+        self.assertEqual({'host': 'nn1'}, result)
+        self.assertEqual([threading.current_thread()], threads)
+        self.assertEqual(0, webhdfs.host_latency.hedges)
+
+    def test_writes_are_not_hedged(self):
+        self.webhdfs._hedged_request = MagicMock()
+        requests_put = MagicMock(return_value=self._response('nn1'))
+        with patch('requests.sessions.Session.put', requests_put):
+            self.webhdfs.make_dir(self.path)
+        self.assertFalse(self.webhdfs._hedged_request.called)
+
+    def test_falls_back_when_hedged_requests_fail(self):
+        requests_get = MagicMock(side_effect=[
+            requests.exceptions.ConnectionError,
+            self._response('nn1')])
+        self.webhdfs.host_latency.default_delay = 5
+        with patch('requests.sessions.Session.get', requests_get):
+            result = self.webhdfs.get_file_dir_status(self.path)
+        self.assertEqual({'host': 'nn1'}, result)
+
+
 class WhenTestingRaiseExceptions(unittest.TestCase):
 
     def test_400_raises_bad_request(self):